@@ -0,0 +1,483 @@
+"""
+Mean-variance optimizer with a cached, incrementally updated covariance.
+
+- ReturnMoments keeps running sums of the return rows (relative to a fixed
+  shift, for numerical stability). New rows are a rank-k update, so neither
+  the covariance nor the Ledoit–Wolf shrinkage ever needs a full recompute,
+  and each estimate is cached until the next update.
+- FactorCovariance is a low-rank + diagonal approximation (top-k eigenpairs
+  plus the residual variances) for large N.
+- MeanVarianceOptimizer solves min w'Σw s.t. sum(w) = 1, μ'w = target,
+  lower <= w <= upper with a primal-dual active-set method: each iteration
+  is one equality-constrained solve on the free assets (Woodbury for
+  FactorCovariance). Every point of the frontier is warm-started from the
+  previous point's bound sets, so it usually settles in 1-5 iterations; a
+  primal active-set method (one bound change per step, cannot cycle) takes
+  over for the few points where it does not.
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+TRADING_DAYS = 252
+
+
+# === Covariance ===
+class ReturnMoments:
+    """Running first/second moments of (rows x assets) returns."""
+
+    def __init__(self, n_assets: int):
+        self.n_assets = n_assets
+        self.count = 0
+        self.shift = None                              # first batch mean
+        self.sum = np.zeros(n_assets)                  # sum y_t
+        self.outer = np.zeros((n_assets, n_assets))    # sum y_t y_t'
+        self.norm_sq_sum = 0.0                         # sum |y_t|^2
+        self.norm_sq_weighted = np.zeros(n_assets)     # sum |y_t|^2 y_t
+        self.norm_fourth_sum = 0.0                     # sum |y_t|^4
+        self._cache: Dict[str, object] = {}
+
+    @classmethod
+    def from_returns(cls, returns: np.ndarray) -> "ReturnMoments":
+        returns = np.asarray(returns, dtype=np.float64)
+        moments = cls(returns.shape[1])
+        moments.update(returns)
+        return moments
+
+    def update(self, rows: np.ndarray) -> "ReturnMoments":
+        """Add new return rows (k x assets): O(k N^2), the cached estimates are invalidated."""
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        if rows.shape[1] != self.n_assets:
+            raise ValueError(f"Expected {self.n_assets} assets, got {rows.shape[1]}")
+        if self.shift is None:
+            self.shift = rows.mean(axis=0)
+
+        shifted = rows - self.shift
+        norm_sq = np.einsum("ij,ij->i", shifted, shifted)
+        self.count += rows.shape[0]
+        self.sum += shifted.sum(axis=0)
+        self.outer += shifted.T @ shifted
+        self.norm_sq_sum += norm_sq.sum()
+        self.norm_sq_weighted += norm_sq @ shifted
+        self.norm_fourth_sum += (norm_sq * norm_sq).sum()
+        self._cache.clear()
+        return self
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self.shift + self.sum / self.count
+
+    def covariance(self, ddof: int = 1) -> np.ndarray:
+        key = f"covariance_{ddof}"
+        if key not in self._cache:
+            offset = self.sum / self.count
+            scatter = self.outer - self.count * np.outer(offset, offset)
+            self._cache[key] = scatter / (self.count - ddof)
+        return self._cache[key]
+
+    def ledoit_wolf(self):
+        """
+        Ledoit–Wolf shrinkage towards mu * I (same estimator as sklearn.covariance.ledoit_wolf).
+
+        Returns:
+            (shrunk covariance, shrinkage intensity).
+        """
+        if "ledoit_wolf" not in self._cache:
+            n, p = self.count, self.n_assets
+            emp_cov = self.covariance(ddof=0)
+            mu = np.trace(emp_cov) / p
+
+            # sum_t |x_t - mean|^4 from the running sums (x_t - mean = y_t - d)
+            d = self.sum / n
+            d_sq = d @ d
+            centred_fourth = (self.norm_fourth_sum + 4 * d @ self.outer @ d + n * d_sq ** 2
+                              - 4 * d @ self.norm_sq_weighted + 2 * d_sq * self.norm_sq_sum
+                              - 4 * d_sq * (d @ self.sum))
+
+            delta_ = np.sum(emp_cov * emp_cov)
+            beta = (centred_fourth / n - delta_) / (p * n)
+            delta = (delta_ - 2 * mu * np.trace(emp_cov) + p * mu ** 2) / p
+            beta = min(beta, delta)
+            shrinkage = 0.0 if beta == 0 else beta / delta
+
+            shrunk = (1 - shrinkage) * emp_cov
+            shrunk.flat[::p + 1] += shrinkage * mu
+            self._cache["ledoit_wolf"] = (shrunk, shrinkage)
+        return self._cache["ledoit_wolf"]
+
+
+class FactorCovariance:
+    """Σ ≈ B B' + diag(D): top-k principal factors plus residual variances."""
+
+    def __init__(self, loadings: np.ndarray, residual: np.ndarray):
+        self.loadings = loadings
+        self.residual = residual
+
+    @classmethod
+    def from_covariance(cls, covariance: np.ndarray, rank: int) -> "FactorCovariance":
+        from scipy.linalg import eigh
+
+        n = covariance.shape[0]
+        rank = min(rank, n)
+        eigenvalues, eigenvectors = eigh(covariance, subset_by_index=[n - rank, n - 1])
+        loadings = eigenvectors * np.sqrt(np.maximum(eigenvalues, 0.0))
+        residual = np.maximum(np.diag(covariance) - np.einsum("ij,ij->i", loadings, loadings), 1e-12)
+        return cls(loadings, residual)
+
+    @property
+    def shape(self):
+        return (self.residual.shape[0],) * 2
+
+    def diagonal(self) -> np.ndarray:
+        return self.residual + np.einsum("ij,ij->i", self.loadings, self.loadings)
+
+    def dot(self, w: np.ndarray) -> np.ndarray:
+        """Σ w in O(N k)."""
+        return self.loadings @ (self.loadings.T @ w) + self.residual * w
+
+    def to_dense(self) -> np.ndarray:
+        dense = self.loadings @ self.loadings.T
+        dense.flat[::dense.shape[0] + 1] += self.residual
+        return dense
+
+
+# === Optimizer ===
+class MeanVarianceOptimizer:
+    def __init__(self, mean: np.ndarray, covariance: Union[np.ndarray, FactorCovariance],
+                 lower: Union[float, np.ndarray, None] = 0.0,
+                 upper: Union[float, np.ndarray, None] = None,
+                 tol: float = 1e-9, max_active_iter: int = 25):
+        """
+        Args:
+            mean: Expected returns (N,).
+            covariance: Dense (N x N) covariance or FactorCovariance.
+            lower, upper: Box bounds per asset (scalar or (N,)); None = unbounded.
+                Default lower=0, upper=None is long-only.
+            tol: Tolerance on the bound multipliers.
+            max_active_iter: Primal-dual active-set iterations before falling
+                back to the primal active-set method.
+        """
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.covariance = covariance
+        n = self.mean.shape[0]
+        self.lower = np.broadcast_to(-np.inf if lower is None else np.asarray(lower, dtype=np.float64), (n,)).copy()
+        self.upper = np.broadcast_to(np.inf if upper is None else np.asarray(upper, dtype=np.float64), (n,)).copy()
+        if np.any(self.lower > self.upper) or self.lower.sum() > 1 or self.upper.sum() < 1:
+            raise ValueError("Bounds admit no fully invested portfolio")
+        bounded = bool(np.isfinite(self.lower).any() or np.isfinite(self.upper).any())
+        if bounded and not np.all(np.isfinite(self.lower)):
+            raise ValueError("Box constraints need a finite lower bound for every asset")
+
+        self.tol = tol
+        self.max_active_iter = max_active_iter
+        self._constraints = np.vstack([np.ones(n), self.mean])  # rows: sum(w), μ'w
+        diagonal = covariance.diagonal() if isinstance(covariance, FactorCovariance) else np.diag(covariance)
+        self._scale = float(np.mean(diagonal))
+        # (at_lower, at_upper) of the last solution; without bounds one solve is exact
+        self._active = None if bounded else (np.zeros(n, dtype=bool), np.zeros(n, dtype=bool))
+        self._last = None    # last solution
+        self.iterations: List[int] = []
+
+    # --- Covariance products ---
+    def _dot(self, w: np.ndarray) -> np.ndarray:
+        if isinstance(self.covariance, FactorCovariance):
+            return self.covariance.dot(w)
+        return self.covariance @ w
+
+    def _free_solver(self, free: np.ndarray):
+        """Solver of Σ[F, F] x = v for the free assets F."""
+        if isinstance(self.covariance, FactorCovariance):
+            b = self.covariance.loadings[free]
+            d_inv = 1.0 / self.covariance.residual[free]
+            d_inv_b = d_inv[:, None] * b
+            capacitance = np.linalg.inv(np.eye(b.shape[1]) + b.T @ d_inv_b)
+            return lambda v: (d_inv * v.T).T - d_inv_b @ (capacitance @ (d_inv_b.T @ v))
+
+        from scipy.linalg import cho_factor, cho_solve
+        factor = cho_factor(self.covariance[np.ix_(free, free)])
+        return lambda v: cho_solve(factor, v)
+
+    # --- Primal-dual active set ---
+    def _active_set(self, d: np.ndarray, rows: slice):
+        """
+        Primal-dual active-set iterations (warm-started from the last solution's
+        bound sets). Each iteration solves the equality-constrained QP on the
+        free assets, then moves assets in/out of the bounds by the sign of
+        mu + scale * (bound violation), mu the bound multipliers.
+
+        Safeguard (Judice-Pires): all changes are applied at once while the
+        number of changes keeps falling; otherwise the best sets so far are
+        restored and only one asset (Murty's largest-index rule) changes per
+        iteration from then on.
+
+        Returns:
+            (weights, iterations) or (None, iterations) if it did not settle.
+        """
+        constraints = self._constraints[rows]
+        n = self.mean.shape[0]
+        at_lower, at_upper = self._active if self._active is not None else (np.zeros(n, bool), np.zeros(n, bool))
+        best = None  # (changes, at_lower, at_upper)
+        single_change = False
+
+        for iteration in range(1, self.max_active_iter + 1):
+            free = ~(at_lower | at_upper)
+            if free.sum() < constraints.shape[0]:
+                return None, iteration
+            w = np.where(at_lower, self.lower, np.where(at_upper, self.upper, 0.0))
+
+            solve = self._free_solver(np.flatnonzero(free))
+            c_free = constraints[:, free]
+            x = solve(-self._dot(w)[free])
+            y = solve(c_free.T)
+            schur = c_free @ y
+            if np.linalg.cond(schur) > 1e12:
+                return None, iteration
+            nu = np.linalg.solve(schur, c_free @ x - (d - constraints @ w))
+            w[free] = x - y @ nu
+
+            multipliers = -(self._dot(w) + constraints.T @ nu)
+            multipliers[free] = 0.0
+            new_upper = multipliers + self._scale * (w - self.upper) > self.tol
+            new_lower = multipliers + self._scale * (w - self.lower) < -self.tol
+            new_upper &= ~new_lower
+            changed = (new_lower != at_lower) | (new_upper != at_upper)
+            n_changed = int(changed.sum())
+            if n_changed == 0:
+                self._active = (at_lower, at_upper)
+                return np.clip(w, self.lower, self.upper), iteration
+
+            if not single_change and best is not None and n_changed >= best[0]:
+                single_change = True
+                _, at_lower, at_upper = best
+                continue
+            if single_change:
+                i = np.flatnonzero(changed)[-1]
+                at_lower, at_upper = at_lower.copy(), at_upper.copy()
+                at_lower[i], at_upper[i] = new_lower[i], new_upper[i]
+            else:
+                best = (n_changed, at_lower, at_upper)
+                at_lower, at_upper = new_lower, new_upper
+        return None, self.max_active_iter
+
+    # --- Primal active set (fallback) ---
+    def _feasible_start(self, d: np.ndarray, rows: slice) -> np.ndarray:
+        """
+        A point inside the box with sum(w) = 1 (and μ'w = target): the last
+        solution (or the highest-return vertex) moved towards the extreme
+        portfolio on the target's side just far enough to hit the target.
+        """
+        start = self._last if self._last is not None else self.extreme_portfolio()
+        if rows.stop == 1:
+            return start.copy()
+        start_return, target = float(start @ self.mean), d[1]
+        extreme = self.extreme_portfolio(highest=target >= start_return)
+        gap = float(extreme @ self.mean) - start_return
+        theta = 0.0 if gap == 0 else min(max((target - start_return) / gap, 0.0), 1.0)
+        return np.clip(start + theta * (extreme - start), self.lower, self.upper)
+
+    def _primal_active_set(self, d: np.ndarray, rows: slice):
+        """
+        Primal active-set method: from a feasible point, step towards the
+        optimum of the free assets, stop at the first blocking bound (added to
+        the working set), or, once no step is left, release the bound with the
+        most negative multiplier. One working-set change per iteration, never
+        cycles on a strictly convex QP.
+
+        Returns:
+            (weights, iterations).
+        """
+        constraints = self._constraints[rows]
+        w = self._feasible_start(d, rows)
+        at_lower = w <= self.lower
+        at_upper = (w >= self.upper) & ~at_lower
+        max_iter = 10 * self.mean.shape[0]
+
+        for iteration in range(1, max_iter + 1):
+            free = ~(at_lower | at_upper)
+            free_index = np.flatnonzero(free)
+            gradient = self._dot(w)
+            c_free = constraints[:, free]
+
+            if free_index.shape[0] > np.linalg.matrix_rank(c_free):
+                solve = self._free_solver(free_index)
+                x = solve(-gradient[free])
+                y = solve(c_free.T)
+                nu = np.linalg.lstsq(c_free @ y, c_free @ x, rcond=None)[0]
+                step = x - y @ nu
+            else:  # no direction left inside the working set
+                nu = np.linalg.lstsq(c_free.T, -gradient[free], rcond=None)[0] if free_index.shape[0] else \
+                    np.zeros(constraints.shape[0])
+                step = np.zeros(free_index.shape[0])
+
+            if np.max(np.abs(step), initial=0.0) <= 1e-12:
+                multipliers = -(gradient + constraints.T @ nu)
+                violation = np.where(at_lower, multipliers, 0.0) - np.where(at_upper, multipliers, 0.0)
+                worst = int(np.argmax(violation))
+                if violation[worst] <= self.tol:
+                    self._active = (at_lower, at_upper)
+                    return w, iteration
+                at_lower[worst] = at_upper[worst] = False
+                continue
+
+            # Longest step along `step` that stays inside the box
+            current = w[free]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratios = np.where(step < 0, (self.lower[free] - current) / step,
+                                  np.where(step > 0, (self.upper[free] - current) / step, np.inf))
+            blocking = int(np.argmin(ratios))
+            alpha = min(1.0, float(ratios[blocking]))
+            w[free] = current + alpha * step
+            if alpha < 1.0:
+                i = free_index[blocking]
+                if step[blocking] < 0:
+                    w[i], at_lower[i] = self.lower[i], True
+                else:
+                    w[i], at_upper[i] = self.upper[i], True
+        raise RuntimeError(f"Active-set solver did not converge in {max_iter} iterations")
+
+    def _solve(self, d: np.ndarray, rows: slice) -> np.ndarray:
+        """Primal-dual active set warm-started from the last solution, primal active set if it does not settle."""
+        weights, iterations = self._active_set(d, rows)
+        if weights is None:
+            weights, fallback_iterations = self._primal_active_set(d, rows)
+            iterations += fallback_iterations
+        self.iterations.append(iterations)
+        self._last = weights
+        return weights
+
+    # --- Public API ---
+    def extreme_portfolio(self, highest: bool = True) -> np.ndarray:
+        """Fully invested portfolio with the highest (lowest) expected return: fill the best assets up to their bounds."""
+        if not np.all(np.isfinite(self.lower)):
+            raise ValueError("Unbounded problem: no extreme portfolio without finite lower bounds")
+        order = np.argsort(self.mean)
+        weights = self.lower.copy()
+        budget = 1.0 - weights.sum()
+        for i in (order[::-1] if highest else order):
+            step = min(self.upper[i] - weights[i], budget)
+            weights[i] += step
+            budget -= step
+            if budget <= 0:
+                break
+        return weights
+
+    def return_range(self):
+        """(min, max) expected return reachable by a fully invested portfolio within the bounds."""
+        if not np.all(np.isfinite(self.lower)):
+            return -np.inf, np.inf
+        return float(self.extreme_portfolio(False) @ self.mean), float(self.extreme_portfolio(True) @ self.mean)
+
+    def min_variance(self) -> np.ndarray:
+        return self._solve(np.array([1.0]), slice(0, 1))
+
+    def solve(self, target_return: float) -> np.ndarray:
+        """Minimum-variance weights with expected return target_return (warm-started from the last solve)."""
+        return self._solve(np.array([1.0, target_return]), slice(0, 2))
+
+    def variance(self, weights: np.ndarray) -> float:
+        return float(weights @ self._dot(weights))
+
+    def frontier(self, n_points: int = 50, max_return: Optional[float] = None) -> Dict[str, object]:
+        """
+        Efficient frontier from the minimum-variance portfolio to the highest
+        reachable return (or max_return), each solve warm-started from the last.
+
+        Returns:
+            dict with "frontier" (DataFrame: target, expected_return, volatility,
+            iterations) and "weights" (n_points x N array).
+        """
+        self.iterations = []
+        start = self.min_variance()
+        low = float(start @ self.mean)
+        high = self.return_range()[1] if max_return is None else max_return
+        if not np.isfinite(high):
+            raise ValueError("Unbounded problem: pass max_return")
+
+        targets = np.linspace(low, high, n_points)
+        weights = np.empty((n_points, self.mean.shape[0]))
+        weights[0] = start
+        reachable = self.return_range()[1]
+        for i, target in enumerate(targets[1:], start=1):
+            if target >= reachable - 1e-12 * max(1.0, abs(reachable)):
+                weights[i] = self.extreme_portfolio()  # the only feasible point
+                self.iterations.append(0)
+            else:
+                weights[i] = self.solve(target)
+
+        frontier = pd.DataFrame({
+            "target": targets,
+            "expected_return": weights @ self.mean,
+            "volatility": np.sqrt([self.variance(w) for w in weights]),
+            "iterations": self.iterations,
+        })
+        return {"frontier": frontier, "weights": weights}
+
+
+# === Data ===
+def load_returns(file_names: Sequence[str], price_column: str = "Close") -> pd.DataFrame:
+    """Daily log returns of csv_dataset files on their common dates."""
+    from Mean_Reversion.Mean_reversion_panel import load_panel
+
+    prices = load_panel(list(file_names), price_column, missing="drop")
+    if prices.shape[0] < 3:
+        raise ValueError(f"{list(file_names)} share fewer than 3 dates")
+    return np.log(prices).diff().iloc[1:]
+
+
+def build_optimizer(returns: Union[pd.DataFrame, ReturnMoments], shrink: bool = True, rank: Optional[int] = None,
+                    periods_per_year: int = TRADING_DAYS, **kwargs) -> MeanVarianceOptimizer:
+    """
+    Optimizer on annualized moments of a return panel (or of existing ReturnMoments).
+
+    Args:
+        returns: (dates x assets) returns or ReturnMoments to reuse.
+        shrink: Use the Ledoit–Wolf covariance.
+        rank: If set, approximate the covariance with `rank` factors.
+        periods_per_year: Annualization factor.
+        **kwargs: lower / upper / tol / max_active_iter, passed to MeanVarianceOptimizer.
+    """
+    moments = returns if isinstance(returns, ReturnMoments) else ReturnMoments.from_returns(returns.to_numpy())
+    covariance = moments.ledoit_wolf()[0] if shrink else moments.covariance()
+    covariance = covariance * periods_per_year
+    if rank is not None:
+        covariance = FactorCovariance.from_covariance(covariance, rank)
+    return MeanVarianceOptimizer(moments.mean * periods_per_year, covariance, **kwargs)
+
+
+if __name__ == "__main__":
+    import time
+
+    # csv_dataset assets, long-only
+    returns = load_returns(["AMD.csv", "TSLA.csv"])
+    result = build_optimizer(returns).frontier(10)
+    print(result["frontier"].round(4).to_string(index=False))
+    print(pd.DataFrame(result["weights"], columns=returns.columns).round(3).to_string(index=False))
+
+    # 2,000 synthetic assets, box-constrained, dense and 20-factor covariance
+    rng = np.random.default_rng(0)
+    n_assets, n_days = 2000, 2520
+    factor_returns = rng.normal(0, 0.01, (n_days, 10))
+    synthetic = factor_returns @ rng.normal(0, 1, (10, n_assets)) + rng.normal(0.0004, 0.02, (n_days, n_assets))
+
+    start = time.perf_counter()
+    moments = ReturnMoments.from_returns(synthetic[:-20])
+    moments.update(synthetic[-20:])
+    print(f"\nmoments of {n_days} x {n_assets}: {time.perf_counter() - start:.2f}s, "
+          f"shrinkage {moments.ledoit_wolf()[1]:.3f}")
+
+    for rank in (None, 20):
+        start = time.perf_counter()
+        optimizer = build_optimizer(moments, rank=rank, lower=0.0, upper=0.02)
+        result = optimizer.frontier(50)
+        elapsed = time.perf_counter() - start
+        frontier = result["frontier"]
+        print(f"rank={rank}: 50-point frontier in {elapsed:.2f}s, "
+              f"{frontier['iterations'].sum()} active-set iterations, "
+              f"vol {frontier['volatility'].iloc[0]:.4f} -> {frontier['volatility'].iloc[-1]:.4f}")
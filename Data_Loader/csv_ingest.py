@@ -0,0 +1,374 @@
+"""
+Normalize csv_dataset files once and memory-map them afterwards.
+
+The raw files come in different shapes (space-padded headers and values in
+TSLA.csv; BOM, quoted numbers, "Nov 02, 2017" dates, newest-first rows and
+"497.30K" volumes in oil.csv). ingest_csv parses a file into one canonical
+schema:
+
+    index   Date                      datetime64[ns], ascending
+    Open / High / Low / Close         float64   (oil.csv "Price" -> Close)
+    Volume                            int64     ("Vol." with K/M/B suffixes)
+    any other numeric column          float64   (e.g. "Adj Close", "Change %")
+
+and writes every column as a .npy file into `<file>.cache/` next to the source,
+with a meta.json recording the source mtime, size and SHA-256. Later loads
+memory-map the .npy files, so they cost a few milliseconds whatever the size.
+
+Ingestion streams the source in chunks of rows (read_csv(chunksize=...)):
+each parsed chunk is appended to per-column spool files, which are then
+copied into the date-ordered .npy columns chunk by chunk, so files larger
+than RAM can be ingested. Only an unsorted file needs its whole Date column
+in memory, to argsort it.
+"""
+
+import gc
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from pandas.tseries.api import guess_datetime_format
+from typing import Dict, Iterable, List, Optional, Tuple
+
+CSV_DATASET_DIR = Path(__file__).resolve().parent.parent / "csv_dataset"
+CACHE_SUFFIX = ".cache"
+CACHE_VERSION = 1
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close"]
+COLUMN_ALIASES = {"Price": "Close", "Vol.": "Volume", "Vol": "Volume"}
+VOLUME_MULTIPLIERS = {"K": 1e3, "M": 1e6, "B": 1e9}
+INGEST_CHUNK_ROWS = 1_000_000
+# Date strings pandas skips when it guesses a column's format from its first value
+UNGUESSED_DATES = frozenset({"", "nan", "nat", "now", "today"})
+
+
+def resolve_csv_path(file_name) -> Path:
+    """Absolute path of a csv_dataset file (absolute paths are kept as-is)."""
+    csv_path = Path(file_name)
+    if not csv_path.is_absolute():
+        csv_path = CSV_DATASET_DIR / csv_path
+    if not csv_path.exists():
+        raise FileNotFoundError(f"Input path not found: {file_name}")
+    return csv_path
+
+
+def cache_dir_for(csv_path: Path) -> Path:
+    return csv_path.with_name(csv_path.name + CACHE_SUFFIX)
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# === Parsing ===
+def _clean_text(values: pd.Series) -> pd.Series:
+    return values.astype(str).str.strip(' "')
+
+
+def _parse_numeric(values: pd.Series) -> np.ndarray:
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.float64)
+    cleaned = _clean_text(values).str.replace(",", "", regex=False).str.rstrip("%")
+    return pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _parse_volume(values: pd.Series) -> np.ndarray:
+    """Volumes as int64; "497.30K" style suffixes expanded, missing values -> 0."""
+    if pd.api.types.is_numeric_dtype(values):
+        volume = values.to_numpy(dtype=np.float64)
+    else:
+        cleaned = _clean_text(values).str.replace(",", "", regex=False).str.upper()
+        suffix = cleaned.str[-1:]
+        multiplier = suffix.map(VOLUME_MULTIPLIERS).fillna(1.0).to_numpy()
+        number = cleaned.where(~suffix.isin(list(VOLUME_MULTIPLIERS)), cleaned.str[:-1])
+        volume = pd.to_numeric(number, errors="coerce").to_numpy(dtype=np.float64) * multiplier
+    return np.nan_to_num(np.round(volume), nan=0.0).astype(np.int64)
+
+
+def _read_raw(csv_path: Path, chunk_rows: int = None):
+    """read_csv of a raw file: one DataFrame, or an iterator of chunk_rows-row DataFrames."""
+    return pd.read_csv(csv_path, encoding="utf-8-sig", skipinitialspace=True, chunksize=chunk_rows)
+
+
+def _canonical_names(columns) -> List[str]:
+    return [COLUMN_ALIASES.get(name, name) for name in (str(col).strip(' "') for col in columns)]
+
+
+def _date_column(columns: List[str]) -> str:
+    return next((col for col in columns if col.lower() in ("date", "datetime", "time")), columns[0])
+
+
+def _date_format(dates: pd.Series) -> Optional[str]:
+    """
+    Format pandas would infer from the first usable date ("mixed" when it cannot
+    guess one), None if the block has no usable date yet.
+    """
+    for value in dates:
+        if value.lower() not in UNGUESSED_DATES:
+            return guess_datetime_format(value) or "mixed"
+    return None
+
+
+def _parse_block(raw: pd.DataFrame, date_column: str,
+                 date_format: str = None) -> Tuple[np.ndarray, Dict[str, np.ndarray], Optional[str]]:
+    """
+    Dates and canonical arrays of every other column of a raw block, in file order.
+
+    Clean numeric columns go through read_csv's native parser; only columns
+    that come back as text (quoted, "K"-suffixed, "%"...) are cleaned as strings.
+    The date format is guessed once from the first usable date and passed back,
+    so later chunks of a file are parsed with the same format.
+    """
+    text = _clean_text(raw[date_column])
+    date_format = date_format or _date_format(text)
+    dates = pd.to_datetime(text, format=date_format).to_numpy(dtype="datetime64[ns]")
+    columns = {col: _parse_volume(raw[col]) if col == "Volume" else _parse_numeric(raw[col])
+               for col in raw.columns if col != date_column}
+    return dates, columns, date_format
+
+
+def _kept_columns(has_values: Dict[str, bool]) -> List[str]:
+    """Columns of the schema in canonical order: prices, then the others that hold any number."""
+    kept = [col for col, any_value in has_values.items()
+            if col == "Volume" or col in PRICE_COLUMNS or any_value]
+    return [col for col in PRICE_COLUMNS if col in kept] + [col for col in kept if col not in PRICE_COLUMNS]
+
+
+def parse_csv(csv_path: Path) -> pd.DataFrame:
+    """
+    Parse one raw CSV into the canonical schema (see module docstring), in memory.
+
+    ingest_csv produces the same columns without reading the whole file at once.
+    """
+    raw = _read_raw(csv_path)
+    raw.columns = _canonical_names(raw.columns)
+    dates, columns, _ = _parse_block(raw, _date_column(list(raw.columns)))
+
+    ordered = _kept_columns({col: not np.all(np.isnan(values)) if values.dtype.kind == "f" else True
+                             for col, values in columns.items()})
+    order = np.argsort(dates, kind="stable")
+    frame = pd.DataFrame({col: columns[col][order] for col in ordered},
+                         index=pd.DatetimeIndex(dates[order], name="Date"))
+    return frame
+
+
+def _spool_csv(csv_path: Path, cache_dir: Path, chunk_rows: int) -> Tuple[int, Dict[str, Tuple[Path, np.dtype]], str]:
+    """
+    Parse a raw CSV chunk by chunk and append every column (Date first) to a
+    raw spool file in file order.
+
+    Returns:
+        n_rows, {column: (spool path, dtype)} in schema order, and the row
+        order of the file: "ascending", "descending" (strictly) or "unsorted".
+    """
+    spools, handles, has_values = {}, {}, {}
+    n_rows, last_date, date_format = 0, None, None
+    ascending = descending = True
+    try:
+        for raw in _read_raw(csv_path, chunk_rows):
+            raw.columns = _canonical_names(raw.columns)
+            dates, columns, date_format = _parse_block(raw, _date_column(list(raw.columns)), date_format)
+            if dates.size:
+                # NaT compares False either way, so it makes the file "unsorted" (argsort puts it last)
+                ascending &= bool(np.all(dates[1:] >= dates[:-1])) and (last_date is None or dates[0] >= last_date)
+                descending &= bool(np.all(dates[1:] < dates[:-1])) and (last_date is None or dates[0] < last_date)
+                last_date = dates[-1]
+            for col, values in {"Date": dates, **columns}.items():
+                if col not in handles:
+                    spools[col] = (cache_dir / f"spool_{len(spools)}.bin", values.dtype)
+                    handles[col] = open(spools[col][0], "wb")
+                    has_values[col] = False
+                np.ascontiguousarray(values).tofile(handles[col])
+                if col != "Date" and not has_values[col]:
+                    has_values[col] = values.dtype.kind != "f" or not np.all(np.isnan(values))
+            n_rows += dates.shape[0]
+            # The .str accessors leave each chunk's text in reference cycles;
+            # collect them now so peak memory stays at about one chunk
+            del raw, dates, columns
+            gc.collect()
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    kept = ["Date"] + _kept_columns({col: any_value for col, any_value in has_values.items() if col != "Date"})
+    for col in set(spools) - set(kept):
+        spools.pop(col)[0].unlink()
+    row_order = "ascending" if ascending else "descending" if descending and n_rows > 1 else "unsorted"
+    return n_rows, {col: spools[col] for col in kept}, row_order
+
+
+def _write_sorted(spool: Path, dtype: np.dtype, n_rows: int, order, target: Path, chunk_rows: int) -> None:
+    """
+    Copy a spooled column into a .npy file in date order, chunk_rows rows at a
+    time. Ordered spools are read sequentially (reversed slices for a
+    descending file); only an argsort order gathers through a memory map.
+    """
+    gather = None
+    if order is not None and not isinstance(order, str) and n_rows:
+        gather = np.memmap(spool, dtype=dtype, mode="r", shape=(n_rows,))
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (n_rows,)}
+    with open(spool, "rb") as source, open(target, "wb") as out:
+        np.lib.format.write_array_header_1_0(out, header)
+        for lo in range(0, n_rows, chunk_rows):
+            hi = min(lo + chunk_rows, n_rows)
+            if order is None:
+                block = np.fromfile(source, dtype=dtype, count=hi - lo)
+            elif gather is None:  # "descending"
+                source.seek((n_rows - hi) * dtype.itemsize)
+                block = np.fromfile(source, dtype=dtype, count=hi - lo)[::-1]
+            else:
+                block = gather[order[lo:hi]]
+            block.tofile(out)
+    del gather
+
+
+# === Cache ===
+def _read_meta(cache_dir: Path) -> dict:
+    meta_path = cache_dir / "meta.json"
+    if not meta_path.exists():
+        return None
+    with open(meta_path, "r") as f:
+        return json.load(f)
+
+
+def _write_meta(cache_dir: Path, meta: dict) -> None:
+    tmp_path = cache_dir / "meta.json.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, cache_dir / "meta.json")
+
+
+def cache_is_fresh(csv_path: Path) -> bool:
+    """
+    True when the cache matches the source.
+
+    A matching mtime + size is trusted without reading the source; otherwise
+    the SHA-256 decides (a touched but unchanged file keeps its cache).
+    """
+    cache_dir = cache_dir_for(csv_path)
+    meta = _read_meta(cache_dir)
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return False
+
+    stat = csv_path.stat()
+    if meta["source_mtime_ns"] == stat.st_mtime_ns and meta["source_size"] == stat.st_size:
+        return True
+    if meta["source_size"] != stat.st_size or meta["source_sha256"] != file_sha256(csv_path):
+        return False
+
+    meta["source_mtime_ns"] = stat.st_mtime_ns
+    _write_meta(cache_dir, meta)
+    return True
+
+
+def ingest_csv(file_name, force: bool = False, chunk_rows: int = INGEST_CHUNK_ROWS) -> Path:
+    """
+    Parse a CSV once and write its columnar cache.
+
+    Args:
+        file_name: File in csv_dataset/ (or an absolute path).
+        force: Rebuild even if the cache is fresh.
+        chunk_rows: Rows parsed and copied at a time (bounds peak memory).
+
+    Returns:
+        Path of the cache directory.
+    """
+    csv_path = resolve_csv_path(file_name)
+    cache_dir = cache_dir_for(csv_path)
+    if not force and cache_is_fresh(csv_path):
+        return cache_dir
+
+    stat = csv_path.stat()
+    sha256 = file_sha256(csv_path)
+    chunk_rows = max(int(chunk_rows), 1)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    n_rows, spools, row_order = _spool_csv(csv_path, cache_dir, chunk_rows)
+    order = None
+    if row_order == "descending":
+        order = row_order
+    elif row_order == "unsorted":
+        order = np.argsort(np.memmap(spools["Date"][0], dtype=spools["Date"][1], mode="r", shape=(n_rows,)),
+                           kind="stable")
+
+    # Columns go to temp files and replace the old ones only once all are
+    # written: a process that has a column memory-mapped keeps the old inode
+    # instead of seeing the file truncated under it
+    files, tmp_paths = {}, {}
+    try:
+        for index, (col, (spool, dtype)) in enumerate(spools.items()):
+            array_name = f"col_{index}.npy"
+            tmp_paths[array_name] = (cache_dir / array_name).with_suffix(".tmp")
+            _write_sorted(spool, dtype, n_rows, order, tmp_paths[array_name], chunk_rows)
+            files[col] = array_name
+
+        meta_path = cache_dir / "meta.json"
+        if meta_path.exists():
+            meta_path.unlink()  # invalidate while old and new columns are mixed; meta.json is written last
+        for array_name, tmp_path in tmp_paths.items():
+            os.replace(tmp_path, cache_dir / array_name)
+    finally:
+        for spool, _ in spools.values():
+            spool.unlink(missing_ok=True)
+        for tmp_path in tmp_paths.values():
+            tmp_path.unlink(missing_ok=True)
+
+    _write_meta(cache_dir, {
+        "version": CACHE_VERSION,
+        "source": csv_path.name,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_size": stat.st_size,
+        "source_sha256": sha256,
+        "n_rows": n_rows,
+        "columns": [col for col in files if col != "Date"],
+        "files": files,
+    })
+    return cache_dir
+
+
+def load_arrays(file_name) -> Dict[str, np.ndarray]:
+    """
+    Memory-mapped, read-only column arrays of a file ("Date" included).
+    Ingests the CSV first if the cache is missing or stale.
+    """
+    cache_dir = ingest_csv(file_name)
+    meta = _read_meta(cache_dir)
+    return {col: np.load(cache_dir / array_name, mmap_mode="r")
+            for col, array_name in meta["files"].items()}
+
+
+def load_frame(file_name) -> pd.DataFrame:
+    """
+    Canonical DataFrame (Date index) backed by the memory-mapped arrays, no copy.
+    """
+    arrays = load_arrays(file_name)
+    index = pd.DatetimeIndex(arrays.pop("Date"), name="Date")
+    return pd.DataFrame(arrays, index=index, copy=False)
+
+
+def ingest_all(file_names: Iterable[str] = None, force: bool = False) -> Dict[str, Path]:
+    """Ingest every CSV of csv_dataset/ (or the given files)."""
+    if file_names is None:
+        file_names = sorted(path.name for path in CSV_DATASET_DIR.glob("*.csv"))
+    return {name: ingest_csv(name, force=force) for name in file_names}
+
+
+if __name__ == "__main__":
+    for name, cache_dir in ingest_all(force=True).items():
+        frame = load_frame(name)
+        print(f"{name}: {frame.shape[0]} rows -> {cache_dir}")
+        print(frame.dtypes.to_dict())
+        print(frame.head(3), "\n")
+
+    # Streaming ingest (tiny chunks) must give exactly the in-memory parse
+    for name in sorted(path.name for path in CSV_DATASET_DIR.glob("*.csv")):
+        ingest_csv(name, force=True, chunk_rows=7)
+        pd.testing.assert_frame_equal(load_frame(name).copy(), parse_csv(resolve_csv_path(name)), check_freq=False)
+        ingest_csv(name, force=True)
+    print("chunked ingest matches parse_csv")
@@ -0,0 +1,143 @@
+"""
+Shared in-process dataset loader for csv_dataset files.
+
+Mean_Reversion, Agent and the sweep all load through one DatasetLoader:
+
+- file names are resolved to paths once,
+- the memory-mapped columns from csv_ingest are kept in a size-bounded LRU
+  keyed by (path, source mtime), so a second consumer of the same file in the
+  same process neither parses nor re-opens it,
+- columns and a date range can be selected at load time (views, no copy),
+- headless mode turns every display()/print() side effect off for batch jobs.
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Data_Loader.csv_ingest import resolve_csv_path, load_arrays
+
+
+class DatasetLoader:
+    def __init__(self, max_entries: int = 32, max_bytes: int = 4 * 1024 ** 3, headless: bool = False):
+        """
+        Args:
+            max_entries: Maximum number of files kept open in the LRU.
+            max_bytes: Maximum total size (bytes) of the cached columns.
+            headless: Default for show()/echo(); True disables all output.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.headless = headless
+
+        self._paths: Dict[str, Path] = {}
+        self._cache = OrderedDict()  # (path, source mtime_ns) -> columns
+        self._cache_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    # === Paths ===
+    def resolve(self, file_name) -> Path:
+        key = str(file_name)
+        if key not in self._paths:
+            self._paths[key] = resolve_csv_path(file_name)
+        return self._paths[key]
+
+    # === LRU of column arrays ===
+    @staticmethod
+    def _nbytes(arrays: Dict[str, np.ndarray]) -> int:
+        return sum(values.nbytes for values in arrays.values())
+
+    def arrays(self, file_name) -> Dict[str, np.ndarray]:
+        """All canonical columns of a file ("Date" included) as read-only arrays."""
+        csv_path = self.resolve(file_name)
+        key = (csv_path, csv_path.stat().st_mtime_ns)
+
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        self.misses += 1
+        for stale in [cached for cached in self._cache if cached[0] == csv_path]:
+            self._cache_bytes -= self._nbytes(self._cache.pop(stale))
+
+        arrays = load_arrays(csv_path)
+        self._cache[key] = arrays
+        self._cache_bytes += self._nbytes(arrays)
+
+        while len(self._cache) > 1 and (len(self._cache) > self.max_entries or self._cache_bytes > self.max_bytes):
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= self._nbytes(evicted)
+        return arrays
+
+    def row_range(self, file_name, start=None, end=None) -> Tuple[int, int]:
+        """Row slice [lo, hi) of the inclusive date bounds start / end (None = open)."""
+        dates = self.arrays(file_name)["Date"]
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start), "ns"), side="left"))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end), "ns"), side="right"))
+        return lo, hi
+
+    def load(self, file_name, columns: List[str] = None, start=None, end=None) -> pd.DataFrame:
+        """
+        Load a file as a canonical DataFrame (Date index).
+
+        Args:
+            file_name: File in csv_dataset/ (or an absolute path).
+            columns: Columns to keep (default: all).
+            start, end: Inclusive date bounds (anything pd.Timestamp accepts).
+
+        Returns:
+            DataFrame whose columns are views of the memory-mapped cache.
+        """
+        arrays = self.arrays(file_name)
+        dates = arrays["Date"]
+        lo, hi = self.row_range(file_name, start, end)
+
+        if columns is None:
+            columns = [col for col in arrays if col != "Date"]
+        missing = [col for col in columns if col not in arrays]
+        if missing:
+            raise KeyError(f"Columns not found in {file_name}: {missing}")
+
+        return pd.DataFrame({col: arrays[col][lo:hi] for col in columns},
+                            index=pd.DatetimeIndex(dates[lo:hi], name="Date"), copy=False)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._cache_bytes = 0
+
+    # === Output side effects ===
+    def show(self, obj, headless: bool = None) -> None:
+        """IPython display() unless headless."""
+        if not (self.headless if headless is None else headless):
+            from IPython.display import display
+            display(obj)
+
+    def echo(self, *args, headless: bool = None) -> None:
+        """print() unless headless."""
+        if not (self.headless if headless is None else headless):
+            print(*args)
+
+
+_DEFAULT_LOADER = DatasetLoader()
+
+
+def get_loader() -> DatasetLoader:
+    """Process-wide loader shared by every consumer."""
+    return _DEFAULT_LOADER
+
+
+def set_headless(headless: bool = True) -> None:
+    _DEFAULT_LOADER.headless = headless
+
+
+def load_dataset(file_name, columns: List[str] = None, start=None, end=None) -> pd.DataFrame:
+    return _DEFAULT_LOADER.load(file_name, columns, start, end)
@@ -0,0 +1,415 @@
+"""
+Incremental feature store: derived series computed once per (symbol, feature,
+parameters), persisted as columns and extended when new bars arrive.
+
+Layout (under FEATURE_DIR, csv_dataset/feature_store by default):
+
+    <symbol>/<feature key>/values.bin   float64, one value per source bar
+    <symbol>/<feature key>/meta.json    rows, source fingerprint, running state
+
+The feature key is the name plus the sorted parameters, e.g.
+"rolling_zscore(column=Close,window=20)". Values are appended to the end of
+values.bin and meta.json is replaced afterwards (a crashed append is
+truncated away on the next open), like Data_Loader.market_data_store.
+
+On every request the store compares the source bars with what the feature
+was computed from:
+
+    unchanged          the stored column is memory-mapped and returned
+    bars appended      only the tail is computed: window features re-read the
+                       last `lookback` bars before the first new one,
+                       expanding features resume from the running sums kept
+                       in meta.json
+    history rewritten  (first date, date at the last stored row or a
+                       checksum of the last stored inputs differ) the feature
+                       is recomputed from scratch
+
+Features are computed lazily, on the first request, and are aligned with the
+source bars (same length and order as its Date column). The rolling and
+expanding statistics reuse the Mean_Reversion engine kernels, so stored
+Z-scores match vectorized_mean_reversion.
+
+Sources are pluggable: any callable symbol -> {column: array} with a "Date"
+column, e.g. the shared csv_dataset loader (default, symbols are file names
+like "TSLA.csv") or MarketDataStore.arrays.
+"""
+
+import sys
+import zlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from urllib.parse import quote
+from typing import Callable, Dict, Iterable, List, NamedTuple, Tuple, Union
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Data_Loader.csv_ingest import CSV_DATASET_DIR, _read_meta, _write_meta
+from Mean_Reversion.Mean_reversion_engine import _block_window_sums, _safe_zscore
+
+FEATURE_DIR = CSV_DATASET_DIR / "feature_store"
+FEATURE_VERSION = 1
+
+# Rows of inputs checksummed to detect a rewritten (not just extended) source
+FINGERPRINT_ROWS = 64
+
+Bars = Dict[str, np.ndarray]
+FeatureRequest = Union[str, Tuple[str, dict]]
+
+
+# === Kernels: window features (bars -> values for every bar of the slice) ===
+def _column(bars: Bars, column: str) -> np.ndarray:
+    return np.asarray(bars[column], dtype=np.float64)
+
+
+def _rolling_moments(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Trailing mean and std (ddof = 0, partial windows at the start) via the engine's block sums."""
+    if window < 1:
+        raise ValueError("window must be >= 1")
+    if values.shape[0] == 0:
+        return np.zeros(0), np.zeros(0)
+    mean, variance, _ = _block_window_sums(values, int(window))
+    return mean, np.sqrt(variance)
+
+
+def _log_returns(prices: np.ndarray, periods: int = 1) -> np.ndarray:
+    """log(P_t / P_{t-periods}), 0 on the first `periods` bars."""
+    returns = np.zeros_like(prices)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[periods:] = np.log(prices[periods:] / prices[:-periods])
+    return returns
+
+
+def log_return(bars: Bars, column: str = "Close", periods: int = 1) -> np.ndarray:
+    return _log_returns(_column(bars, column), periods)
+
+
+def rolling_mean(bars: Bars, column: str = "Close", window: int = 20) -> np.ndarray:
+    return _rolling_moments(_column(bars, column), window)[0]
+
+
+def rolling_std(bars: Bars, column: str = "Close", window: int = 20) -> np.ndarray:
+    return _rolling_moments(_column(bars, column), window)[1]
+
+
+def rolling_zscore(bars: Bars, column: str = "Close", window: int = 20) -> np.ndarray:
+    """Same values as Mean_reversion_engine.rolling_zscore."""
+    values = _column(bars, column)
+    mean, std = _rolling_moments(values, window)
+    return _safe_zscore(values, mean, std)
+
+
+def volatility(bars: Bars, column: str = "Close", window: int = 20) -> np.ndarray:
+    """Rolling std of one-bar log returns (not annualised)."""
+    return _rolling_moments(_log_returns(_column(bars, column)), window)[1]
+
+
+def hl_range(bars: Bars) -> np.ndarray:
+    """(High - Low) / Close."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (_column(bars, "High") - _column(bars, "Low")) / _column(bars, "Close")
+
+
+def true_range(bars: Bars) -> np.ndarray:
+    """max(High - Low, |High - Close_{t-1}|, |Low - Close_{t-1}|); High - Low on the first bar."""
+    high, low, close = _column(bars, "High"), _column(bars, "Low"), _column(bars, "Close")
+    ranges = high - low
+    if ranges.shape[0] > 1:
+        previous = close[:-1]
+        ranges[1:] = np.maximum(ranges[1:], np.maximum(np.abs(high[1:] - previous), np.abs(low[1:] - previous)))
+    return ranges
+
+
+def atr(bars: Bars, window: int = 14) -> np.ndarray:
+    """Average true range: rolling mean of true_range."""
+    return _rolling_moments(true_range(bars), window)[0]
+
+
+def dollar_volume(bars: Bars) -> np.ndarray:
+    return _column(bars, "Close") * _column(bars, "Volume")
+
+
+def volume_ratio(bars: Bars, window: int = 20) -> np.ndarray:
+    """Volume / rolling mean volume (0 where the mean is 0)."""
+    volume = _column(bars, "Volume")
+    mean = _rolling_moments(volume, window)[0]
+    ratio = np.zeros_like(volume)
+    np.divide(volume, mean, out=ratio, where=mean > 0)
+    return ratio
+
+
+def volume_zscore(bars: Bars, window: int = 20) -> np.ndarray:
+    """Rolling Z-score of log(1 + Volume)."""
+    log_volume = np.log1p(np.maximum(_column(bars, "Volume"), 0.0))
+    mean, std = _rolling_moments(log_volume, window)
+    return _safe_zscore(log_volume, mean, std)
+
+
+# === Kernels: expanding features (bars, running state -> values, new state) ===
+def _expanding(bars: Bars, column: str, state: dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+    """
+    Mean_reversion_engine.expanding_zscore statistics, resumable:
+    mean_t = sum_t / t, std_t = sqrt(sum_{i<=t} (P_i - mean_i)^2 / t).
+
+    The cumulative sums restart from the stored totals as the first element,
+    so the sequential additions (and hence the values) match a full recompute.
+    """
+    values = _column(bars, column)
+    state = state or {"count": 0, "sum": 0.0, "sq_diff": 0.0}
+    counts = np.arange(state["count"] + 1, state["count"] + values.shape[0] + 1, dtype=np.float64)
+    mean = np.cumsum(np.concatenate(([state["sum"]], values)))[1:] / counts
+    deviation = values - mean
+    sq_diff = np.cumsum(np.concatenate(([state["sq_diff"]], deviation * deviation)))[1:]
+    std = np.sqrt(sq_diff / counts)
+    if values.shape[0]:
+        state = {"count": int(counts[-1]), "sum": float(mean[-1] * counts[-1]), "sq_diff": float(sq_diff[-1])}
+    return values, mean, std, state
+
+
+def expanding_mean(bars: Bars, column: str = "Close", state: dict = None):
+    _, mean, _, state = _expanding(bars, column, state)
+    return mean, state
+
+
+def expanding_std(bars: Bars, column: str = "Close", state: dict = None):
+    _, _, std, state = _expanding(bars, column, state)
+    return std, state
+
+
+def expanding_zscore(bars: Bars, column: str = "Close", state: dict = None):
+    """Same values as Mean_reversion_engine.expanding_zscore (and Basic_Mean_Reversion_)."""
+    values, mean, std, state = _expanding(bars, column, state)
+    z_scores = np.zeros_like(values)
+    np.divide(values - mean, std, out=z_scores, where=std != 0)
+    return z_scores, state
+
+
+class FeatureSpec(NamedTuple):
+    function: Callable
+    inputs: Callable[[dict], Tuple[str, ...]]     # source columns read, from the parameters
+    lookback: Callable[[dict], int]               # earlier bars a new value depends on (None: expanding)
+
+
+def _price_input(params: dict) -> Tuple[str, ...]:
+    return (params.get("column", "Close"),)
+
+
+def _window_lookback(extra: int = 0) -> Callable[[dict], int]:
+    return lambda params: int(params.get("window", 20)) - 1 + extra
+
+
+FEATURES: Dict[str, FeatureSpec] = {
+    "log_return": FeatureSpec(log_return, _price_input, lambda params: int(params.get("periods", 1))),
+    "rolling_mean": FeatureSpec(rolling_mean, _price_input, _window_lookback()),
+    "rolling_std": FeatureSpec(rolling_std, _price_input, _window_lookback()),
+    "rolling_zscore": FeatureSpec(rolling_zscore, _price_input, _window_lookback()),
+    "volatility": FeatureSpec(volatility, _price_input, _window_lookback(1)),
+    "expanding_mean": FeatureSpec(expanding_mean, _price_input, None),
+    "expanding_std": FeatureSpec(expanding_std, _price_input, None),
+    "expanding_zscore": FeatureSpec(expanding_zscore, _price_input, None),
+    "hl_range": FeatureSpec(hl_range, lambda params: ("High", "Low", "Close"), lambda params: 0),
+    "true_range": FeatureSpec(true_range, lambda params: ("High", "Low", "Close"), lambda params: 1),
+    "atr": FeatureSpec(atr, lambda params: ("High", "Low", "Close"),
+                       lambda params: int(params.get("window", 14))),
+    "dollar_volume": FeatureSpec(dollar_volume, lambda params: ("Close", "Volume"), lambda params: 0),
+    "volume_ratio": FeatureSpec(volume_ratio, lambda params: ("Volume",), _window_lookback()),
+    "volume_zscore": FeatureSpec(volume_zscore, lambda params: ("Volume",), _window_lookback()),
+}
+
+
+def feature_key(name: str, params: dict = None) -> str:
+    """Canonical key of a feature request, e.g. rolling_zscore(column=Close,window=20)."""
+    return f"{name}({','.join(f'{key}={params[key]}' for key in sorted(params or {}))})"
+
+
+def _fingerprint(dates: np.ndarray, inputs: List[np.ndarray], rows: int) -> dict:
+    """Identity of the first `rows` source bars: first / last date and a checksum of the last inputs."""
+    lo = max(rows - FINGERPRINT_ROWS, 0)
+    checksum = 0
+    for values in inputs:
+        checksum = zlib.crc32(np.ascontiguousarray(values[lo:rows], dtype="<f8").tobytes(), checksum)
+    dates = np.asarray(dates).view(np.int64)
+    return {"first": int(dates[0]), "last": int(dates[rows - 1]), "checksum": checksum}
+
+
+class FeatureColumn:
+    """Append-only values file and metadata of one (symbol, feature key)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.meta = _read_meta(self.path)
+        if self.meta is None or self.meta.get("version") != FEATURE_VERSION:
+            self.meta = {"version": FEATURE_VERSION, "rows": 0}
+        self._truncate_to_meta()
+
+    @property
+    def rows(self) -> int:
+        return self.meta["rows"]
+
+    @property
+    def _values_path(self) -> Path:
+        return self.path / "values.bin"
+
+    def _truncate_to_meta(self):
+        expected = self.rows * 8
+        if self._values_path.exists() and self._values_path.stat().st_size != expected:
+            with open(self._values_path, "r+b") as f:
+                f.truncate(expected)
+
+    def reset(self):
+        self.meta = {"version": FEATURE_VERSION, "rows": 0}
+        self._truncate_to_meta()
+
+    def append(self, values: np.ndarray, fingerprint: dict, state: dict = None):
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self._values_path, "ab") as f:
+            f.write(np.ascontiguousarray(values, dtype="<f8").tobytes())
+        self.meta.update(rows=self.rows + int(values.shape[0]), source=fingerprint)
+        if state is not None:
+            self.meta["state"] = state
+        _write_meta(self.path, self.meta)
+
+    def values(self) -> np.ndarray:
+        """Memory-mapped, read-only values."""
+        if self.rows == 0:
+            return np.zeros(0)
+        return np.memmap(self._values_path, dtype="<f8", mode="r", shape=(self.rows,))
+
+
+def _csv_source(symbol: str) -> Bars:
+    from Data_Loader.dataset_loader import get_loader
+    return get_loader().arrays(symbol)
+
+
+class FeatureStore:
+    def __init__(self, root=FEATURE_DIR, source: Callable[[str], Bars] = None):
+        """
+        Args:
+            root: Store directory.
+            source: symbol -> {column: array} with a "Date" column in time
+                order (default: csv_dataset files through the shared loader).
+        """
+        self.root = Path(root)
+        self.source = source or _csv_source
+        self.stats = {"hits": 0, "appended": 0, "recomputed": 0, "rows_computed": 0}
+
+    def _column_store(self, symbol: str, key: str) -> FeatureColumn:
+        return FeatureColumn(self.root / quote(str(symbol), safe="") / quote(key, safe="()=,"))
+
+    def get(self, symbol: str, name: str, bars: Bars = None, **params) -> np.ndarray:
+        """
+        Feature values for every source bar of `symbol`, computing only what is missing.
+
+        Args:
+            symbol: Source symbol (file name for the csv_dataset source).
+            name: Feature name (see FEATURES).
+            bars: Source arrays if already loaded (default: source(symbol)).
+            **params: Feature parameters (column, window, periods...).
+
+        Returns:
+            Read-only memory-mapped float64 array aligned with bars["Date"].
+        """
+        if name not in FEATURES:
+            raise KeyError(f"Unknown feature {name!r}, expected one of {sorted(FEATURES)}")
+        spec = FEATURES[name]
+        bars = self.source(symbol) if bars is None else bars
+        dates = bars["Date"]
+        n = dates.shape[0]
+        inputs = [bars[column] for column in spec.inputs(params)]
+
+        column = self._column_store(symbol, feature_key(name, params))
+        rows = column.rows
+        if rows and (rows > n or column.meta.get("source") != _fingerprint(dates, inputs, rows)):
+            column.reset()
+            rows = 0
+            self.stats["recomputed"] += 1
+        if rows == n:
+            self.stats["hits"] += 1
+            return column.values()
+
+        if rows:
+            self.stats["appended"] += 1
+        if spec.lookback is None:
+            tail = {key: values[rows:n] for key, values in zip(spec.inputs(params), inputs)}
+            values, state = spec.function(tail, state=column.meta.get("state") if rows else None, **params)
+        else:
+            start = max(rows - spec.lookback(params), 0)
+            window = {key: values[start:n] for key, values in zip(spec.inputs(params), inputs)}
+            values, state = spec.function(window, **params)[rows - start:], None
+        column.append(values, _fingerprint(dates, inputs, n), state)
+        self.stats["rows_computed"] += n - rows
+        return column.values()
+
+    def get_many(self, symbol: str, requests: Iterable[FeatureRequest]) -> Dict[str, np.ndarray]:
+        """{feature key: values} for names or (name, params) requests, source loaded once."""
+        bars = self.source(symbol)
+        result = {}
+        for request in requests:
+            name, params = (request, {}) if isinstance(request, str) else request
+            result[feature_key(name, params)] = self.get(symbol, name, bars=bars, **params)
+        return result
+
+    def frame(self, symbol: str, requests: Iterable[FeatureRequest]) -> pd.DataFrame:
+        """Features as DataFrame columns (Date index) over the memory-mapped values, no copy."""
+        bars = self.source(symbol)
+        columns = {}
+        for request in requests:
+            name, params = (request, {}) if isinstance(request, str) else request
+            columns[feature_key(name, params)] = self.get(symbol, name, bars=bars, **params)
+        index = pd.DatetimeIndex(np.asarray(bars["Date"]).view("datetime64[ns]"), name="Date")
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def aligned(self, symbol: str, name: str, dates, **params) -> np.ndarray:
+        """Feature values at the given dates (e.g. of a date-filtered frame); NaN where missing."""
+        bars = self.source(symbol)
+        values = self.get(symbol, name, bars=bars, **params)
+        source_dates = np.asarray(bars["Date"]).view(np.int64)
+        wanted = np.asarray(pd.DatetimeIndex(dates).to_numpy(dtype="datetime64[ns]")).view(np.int64)
+        index = np.clip(np.searchsorted(source_dates, wanted), 0, max(source_dates.shape[0] - 1, 0))
+        found = (source_dates.shape[0] > 0) & (source_dates[index] == wanted)
+        return np.where(found, values[index] if values.shape[0] else np.nan, np.nan)
+
+    def clear(self, symbol: str = None):
+        """Delete stored features (of one symbol, or all)."""
+        import shutil
+        target = self.root if symbol is None else self.root / quote(str(symbol), safe="")
+        if target.exists():
+            shutil.rmtree(target)
+
+
+if __name__ == "__main__":
+    import time
+    import tempfile
+    from Mean_Reversion.Mean_reversion_engine import rolling_zscore as engine_rolling_zscore
+    from Mean_Reversion.Mean_reversion_engine import expanding_zscore as engine_expanding_zscore
+
+    REQUESTS = [("log_return", {}), ("volatility", {"window": 20}), ("rolling_zscore", {"window": 20}),
+                ("expanding_zscore", {}), ("atr", {"window": 14}), ("volume_ratio", {"window": 20})]
+
+    n_bars, n_new = 5_000_000, 390
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, n_bars + n_new)))
+    full = {"Date": (np.datetime64("2000-01-01", "ns") + np.arange(n_bars + n_new) * np.timedelta64(60, "s")),
+            "Close": close, "High": close * 1.001, "Low": close * 0.999,
+            "Volume": rng.integers(1_000, 10_000, n_bars + n_new)}
+    source = {"SYN": {column: values[:n_bars] for column, values in full.items()}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FeatureStore(tmp, source=lambda symbol: source[symbol])
+        for label in ("first request (full compute)", "repeat request (memory-mapped)"):
+            start = time.perf_counter()
+            store.get_many("SYN", REQUESTS)
+            print(f"{label:34s} {time.perf_counter() - start:8.4f} s")
+
+        source["SYN"] = full
+        start = time.perf_counter()
+        features = store.get_many("SYN", REQUESTS)
+        print(f"{f'+{n_new} bars (tail only)':34s} {time.perf_counter() - start:8.4f} s, stats {store.stats}")
+
+        rolling = features[feature_key("rolling_zscore", {"window": 20})]
+        expanding = features[feature_key("expanding_zscore", {})]
+        print("max |store - engine| rolling z:", np.abs(rolling - engine_rolling_zscore(close, 20)).max(),
+              "expanding z:", np.abs(expanding - engine_expanding_zscore(close)).max())
+        print(store.frame("SYN", REQUESTS).tail(3))
@@ -0,0 +1,454 @@
+"""
+Incremental local store of market data bars, per symbol and interval.
+
+Layout (under STORE_DIR, csv_dataset/market_store by default):
+
+    <interval>/<symbol>/Date.bin       int64 ns timestamps
+    <interval>/<symbol>/Open.bin ...   float64 Open / High / Low / Close, int64 Volume
+    <interval>/<symbol>/meta.json      row count, sorted flag, covered ranges
+
+Columns are raw little-endian binaries. New bars are appended to the ends of
+the files, and meta.json is replaced afterwards, so history is never
+rewritten and a crash between the two is undone on the next open (the files
+are truncated back to the recorded row count). Loads memory-map the columns.
+
+meta.json also records which [start, end) time ranges have already been
+requested (with or without bars, e.g. weekends). refresh() asks the provider
+only for the ranges that are missing. It groups symbols with the same
+missing range into one batched request, and runs the requests on a thread
+or process pool, so a daily refresh costs time proportional to the new bars.
+
+Providers are pluggable: anything with
+    fetch(symbols, start, end, interval) -> {symbol: DataFrame}
+returning canonical frames (Date index, Open / High / Low / Close / Volume).
+A symbol missing from the answer is treated as a failed download and is
+retried on the next refresh. YFinanceProvider talks to Yahoo Finance;
+SyntheticProvider serves deterministic fake bars for offline runs.
+"""
+
+import os
+import sys
+import time
+import zlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from urllib.parse import quote
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Data_Loader.csv_ingest import CSV_DATASET_DIR, _read_meta, _write_meta
+
+STORE_DIR = CSV_DATASET_DIR / "market_store"
+STORE_VERSION = 1
+
+BAR_COLUMNS = {"Open": np.float64, "High": np.float64, "Low": np.float64, "Close": np.float64,
+               "Volume": np.int64}
+INTERVALS = {"1m": pd.Timedelta(minutes=1), "2m": pd.Timedelta(minutes=2), "5m": pd.Timedelta(minutes=5),
+             "15m": pd.Timedelta(minutes=15), "30m": pd.Timedelta(minutes=30), "1h": pd.Timedelta(hours=1),
+             "1d": pd.Timedelta(days=1)}
+
+Range = Tuple[int, int]     # [start, end) in int64 ns
+
+
+def interval_step(interval: str) -> pd.Timedelta:
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown interval {interval!r}, expected one of {list(INTERVALS)}")
+    return INTERVALS[interval]
+
+
+def _to_ns(value) -> int:
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return int(timestamp.value)
+
+
+def _merge_ranges(ranges: Iterable[Range]) -> List[Range]:
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _subtract_ranges(start: int, end: int, covered: List[Range]) -> List[Range]:
+    """Parts of [start, end) not inside any covered range (covered merged and sorted)."""
+    missing = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end <= cursor:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+def bar_arrays(frame: pd.DataFrame, daily: bool = False) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Provider frame -> (int64 ns dates, {column: array} with BAR_COLUMNS dtypes),
+    in time order, rows without any price dropped. Intraday timestamps are
+    converted to naive UTC; daily bars keep their exchange-local date.
+    """
+    index = frame["Date"] if "Date" in frame.columns else frame.index
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None) if daily else index.tz_convert("UTC").tz_localize(None)
+    dates = index.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    missing = [column for column in BAR_COLUMNS if column not in frame.columns]
+    if missing:
+        raise KeyError(f"Provider frame lacks columns {missing}")
+
+    columns = {column: frame[column].to_numpy(dtype=np.float64) for column in BAR_COLUMNS}
+    keep = ~(np.isnan(columns["Open"]) & np.isnan(columns["High"]) & np.isnan(columns["Low"])
+             & np.isnan(columns["Close"]))
+    order = np.flatnonzero(keep)
+    if order.shape[0] > 1 and np.any(np.diff(dates[order]) < 0):
+        order = order[np.argsort(dates[order], kind="stable")]
+    columns["Volume"] = np.nan_to_num(columns["Volume"])
+    return dates[order], {column: values[order].astype(BAR_COLUMNS[column]) for column, values in columns.items()}
+
+
+class SymbolStore:
+    """Append-only column files and coverage metadata of one symbol / interval."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.meta = _read_meta(self.path) or {"version": STORE_VERSION, "rows": 0, "sorted": True, "coverage": []}
+        self._truncate_to_meta()
+
+    def _column_path(self, column: str) -> Path:
+        return self.path / f"{column}.bin"
+
+    def _truncate_to_meta(self):
+        """Drop bytes appended after the last meta.json update (interrupted append)."""
+        rows = self.meta["rows"]
+        for column, dtype in {"Date": np.int64, **BAR_COLUMNS}.items():
+            column_path = self._column_path(column)
+            expected = rows * np.dtype(dtype).itemsize
+            if column_path.exists() and column_path.stat().st_size > expected:
+                with open(column_path, "r+b") as f:
+                    f.truncate(expected)
+
+    @property
+    def rows(self) -> int:
+        return self.meta["rows"]
+
+    @property
+    def coverage(self) -> List[Range]:
+        return [tuple(r) for r in self.meta["coverage"]]
+
+    def missing(self, start: int, end: int) -> List[Range]:
+        return _subtract_ranges(start, end, self.coverage)
+
+    def last_timestamp(self) -> int:
+        return self.meta.get("last", None)
+
+    def append(self, dates: np.ndarray, columns: Dict[str, np.ndarray], covered: Range):
+        """Append bars (bar_arrays output, inside `covered`) and mark `covered` as requested."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        if dates.shape[0]:
+            with open(self._column_path("Date"), "ab") as f:
+                f.write(np.ascontiguousarray(dates, dtype="<i8").tobytes())
+            for column, dtype in BAR_COLUMNS.items():
+                with open(self._column_path(column), "ab") as f:
+                    f.write(np.ascontiguousarray(columns[column], dtype=np.dtype(dtype).newbyteorder("<"))
+                            .tobytes())
+            last = self.meta.get("last")
+            if last is not None and int(dates[0]) <= last:
+                self.meta["sorted"] = False
+            self.meta["last"] = max(int(dates[-1]), last if last is not None else int(dates[-1]))
+            self.meta["first"] = min(int(dates[0]), self.meta.get("first", int(dates[0])))
+            self.meta["rows"] += int(dates.shape[0])
+        self.meta["coverage"] = [list(r) for r in _merge_ranges(self.coverage + [covered])]
+        _write_meta(self.path, self.meta)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Memory-mapped columns in time order (a sorted copy when backfills were appended)."""
+        rows = self.rows
+        arrays = {}
+        for column, dtype in {"Date": np.int64, **BAR_COLUMNS}.items():
+            if rows == 0:
+                arrays[column] = np.zeros(0, dtype=dtype)
+            else:
+                arrays[column] = np.memmap(self._column_path(column), dtype=np.dtype(dtype).newbyteorder("<"),
+                                           mode="r", shape=(rows,))
+        if not self.meta["sorted"]:
+            order = np.argsort(arrays["Date"], kind="stable")
+            arrays = {column: values[order] for column, values in arrays.items()}
+        return arrays
+
+    def compact(self):
+        """Rewrite the columns in time order (only needed after backfilling earlier gaps)."""
+        if self.meta["sorted"] or self.rows == 0:
+            return
+        arrays = {column: np.array(values) for column, values in self.arrays().items()}
+        for column, values in arrays.items():
+            tmp_path = self._column_path(column).with_suffix(".tmp")
+            values.astype(values.dtype.newbyteorder("<")).tofile(tmp_path)
+            os.replace(tmp_path, self._column_path(column))
+        self.meta["sorted"] = True
+        _write_meta(self.path, self.meta)
+
+    def frame(self, start=None, end=None) -> pd.DataFrame:
+        """Bars with start <= Date <= end, like DatasetLoader.load."""
+        arrays = self.arrays()
+        dates = arrays["Date"]
+        lo = 0 if start is None else int(np.searchsorted(dates, _to_ns(start), side="left"))
+        hi = dates.shape[0] if end is None else int(np.searchsorted(dates, _to_ns(end), side="right"))
+        return pd.DataFrame({column: arrays[column][lo:hi] for column in BAR_COLUMNS},
+                            index=pd.DatetimeIndex(np.asarray(dates[lo:hi]).view("datetime64[ns]"), name="Date"))
+
+
+# === Providers ===
+class YFinanceProvider:
+    """
+    Yahoo Finance bars through yfinance.download, many tickers per call.
+    yfinance does not tell an empty range from a failed download, so tickers
+    without any bar in the range are left unanswered (requested again later).
+    """
+
+    def __init__(self, auto_adjust: bool = False):
+        self.auto_adjust = auto_adjust
+
+    def fetch(self, symbols: List[str], start: pd.Timestamp, end: pd.Timestamp,
+              interval: str) -> Dict[str, pd.DataFrame]:
+        import yfinance
+
+        data = yfinance.download(list(symbols), start=start, end=end, interval=interval,
+                                 group_by="ticker", auto_adjust=self.auto_adjust, actions=False,
+                                 progress=False, threads=False, multi_level_index=True)
+        frames = {}
+        if data is None or data.empty:
+            # yfinance reports download errors as an empty frame: nothing is answered
+            return frames
+        tickers = set(data.columns.get_level_values(0))
+        for symbol in symbols:
+            # Failed tickers come back as all-NaN columns; leave them unanswered
+            if symbol in tickers and data[symbol].notna().any().any():
+                frames[symbol] = data[symbol]
+        return frames
+
+
+class SyntheticProvider:
+    """
+    Deterministic fake bars for offline runs and tests: the bar of a symbol at
+    a timestamp is always the same, whatever range is requested. Daily bars
+    fall on business days; intraday bars on every step. `latency` seconds are
+    slept per call, and `calls` / `bars_served` count the traffic.
+    """
+
+    def __init__(self, latency: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.seed = seed
+        self.calls = 0
+        self.bars_served = 0
+
+    @staticmethod
+    def _uniform(keys: np.ndarray) -> np.ndarray:
+        # splitmix64 finalizer -> uniform (0, 1)
+        z = keys.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+        return ((z >> np.uint64(11)).astype(np.float64) + 0.5) / float(1 << 53)
+
+    def _bars(self, symbol: str, index: pd.DatetimeIndex) -> pd.DataFrame:
+        symbol_key = np.uint64((zlib.crc32(symbol.encode()) << 16) ^ self.seed)
+        t = index.to_numpy(dtype="datetime64[ns]").view(np.int64) // 60_000_000_000    # minutes
+        with np.errstate(over="ignore"):
+            keys = t.astype(np.uint64) * np.uint64(4) + symbol_key * np.uint64(0x2545F4914F6CDD1D)
+            u1, u2, u3 = self._uniform(keys), self._uniform(keys + np.uint64(1)), self._uniform(keys + np.uint64(2))
+        days = t / 1440.0
+        phase = float(symbol_key % np.uint64(1000))
+        close = 50 + float(symbol_key % np.uint64(450)) * np.exp(0.3 * np.sin(days / 40.0 + phase)) \
+            * np.exp(0.01 * np.sqrt(-2 * np.log(u1)) * np.cos(2 * np.pi * u2))
+        spread = close * 0.01 * u3
+        return pd.DataFrame({"Open": close + 0.3 * spread * (u2 - 0.5), "High": close + spread,
+                             "Low": close - spread, "Close": close,
+                             "Volume": (1e5 + 1e6 * u1).astype(np.int64)},
+                            index=pd.DatetimeIndex(index, name="Date"))
+
+    def fetch(self, symbols: List[str], start: pd.Timestamp, end: pd.Timestamp,
+              interval: str) -> Dict[str, pd.DataFrame]:
+        if self.latency:
+            time.sleep(self.latency)
+        self.calls += 1
+        step = interval_step(interval)
+        if step >= pd.Timedelta(days=1):
+            index = pd.bdate_range(start.normalize(), end, inclusive="left")
+            index = index[index >= start]
+        else:
+            index = pd.date_range(start.ceil(step), end, freq=step, inclusive="left")
+        self.bars_served += len(index) * len(symbols)
+        return {symbol: self._bars(symbol, index) for symbol in symbols}
+
+
+def _fetch_batch(provider, symbols: List[str], start: int, end: int, interval: str):
+    """Pool task: one provider call for a batch of symbols sharing a missing range."""
+    return provider.fetch(symbols, pd.Timestamp(start), pd.Timestamp(end), interval)
+
+
+# === Store ===
+class MarketDataStore:
+    def __init__(self, root=STORE_DIR, provider=None,
+                 batch_size: int = 50,
+                 workers: int = 8,
+                 processes: bool = False,
+                 settle=pd.Timedelta(days=4)):
+        """
+        Args:
+            root: Store directory.
+            provider: Bar provider (default YFinanceProvider()).
+            batch_size: Maximum symbols per provider request.
+            workers: Concurrent provider requests.
+            processes: Use a process pool instead of threads (the provider
+                must be picklable); writes always happen in this process.
+            settle: Ranges ending less than `settle` ago are only marked as
+                covered up to their last returned bar, so bars that are not
+                published yet are requested again on the next refresh.
+        """
+        self.root = Path(root)
+        self.provider = provider if provider is not None else YFinanceProvider()
+        self.batch_size = max(int(batch_size), 1)
+        self.workers = max(int(workers), 1)
+        self.processes = processes
+        self.settle = pd.Timedelta(settle)
+
+    def symbol_store(self, symbol: str, interval: str = "1d") -> SymbolStore:
+        interval_step(interval)
+        return SymbolStore(self.root / interval / quote(symbol, safe=""))
+
+    def default_end(self, interval: str) -> pd.Timestamp:
+        """Exclusive end of a refresh: today 00:00 UTC for daily bars, now floored to the step otherwise."""
+        step = interval_step(interval)
+        now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+        return now.normalize() if step >= pd.Timedelta(days=1) else now.floor(step)
+
+    def plan(self, symbols: Iterable[str], start, end=None, interval: str = "1d",
+             stores: Dict[str, SymbolStore] = None) -> List[Tuple[Range, List[str]]]:
+        """
+        Missing ranges, each with the symbols lacking it, split into batch_size
+        requests. `stores`, if given, is filled with the opened SymbolStores.
+        """
+        start_ns = _to_ns(start)
+        end_ns = _to_ns(end if end is not None else self.default_end(interval))
+        stores = {} if stores is None else stores
+        by_range = defaultdict(list)
+        for symbol in dict.fromkeys(symbols):
+            stores[symbol] = self.symbol_store(symbol, interval)
+            for missing in stores[symbol].missing(start_ns, end_ns):
+                by_range[missing].append(symbol)
+        requests = []
+        for missing, range_symbols in sorted(by_range.items()):
+            for i in range(0, len(range_symbols), self.batch_size):
+                requests.append((missing, range_symbols[i:i + self.batch_size]))
+        return requests
+
+    def refresh(self, symbols: Iterable[str], start, end=None, interval: str = "1d") -> dict:
+        """
+        Download whatever [start, end) bars the store lacks for `symbols`.
+
+        Returns:
+            {"requests", "symbols_updated", "rows_added", "unanswered": [symbols the
+            provider returned nothing for], "errors": [(symbols, message)]}
+        """
+        stores = {}
+        requests = self.plan(symbols, start, end, interval, stores)
+        stats = {"requests": len(requests), "symbols_updated": 0, "rows_added": 0, "unanswered": [], "errors": []}
+        if not requests:
+            return stats
+
+        settled_before = _to_ns(pd.Timestamp.now(tz="UTC").tz_localize(None) - self.settle)
+        step_ns = interval_step(interval).value
+        daily = step_ns >= pd.Timedelta(days=1).value
+        updated = set()
+
+        def write(missing: Range, batch: List[str], frames: Dict[str, pd.DataFrame]):
+            start_ns, end_ns = missing
+            for symbol in batch:
+                if symbol not in frames:
+                    stats["unanswered"].append(symbol)      # stays missing, retried next refresh
+                    continue
+                dates, columns = bar_arrays(frames[symbol], daily)
+                inside = (dates >= start_ns) & (dates < end_ns)
+                if not inside.all():
+                    dates, columns = dates[inside], {column: values[inside] for column, values in columns.items()}
+                covered_end = end_ns
+                if end_ns > settled_before:
+                    covered_end = start_ns if dates.shape[0] == 0 else min(end_ns, int(dates[-1]) + step_ns)
+                if dates.shape[0] == 0 and covered_end <= start_ns:
+                    continue
+                stores[symbol].append(dates, columns, (start_ns, covered_end))
+                stats["rows_added"] += int(dates.shape[0])
+                updated.add(symbol)
+
+        if len(requests) == 1 or self.workers == 1:
+            for missing, batch in requests:
+                try:
+                    write(missing, batch, _fetch_batch(self.provider, batch, *missing, interval))
+                except Exception as exc:
+                    stats["errors"].append((batch, f"{type(exc).__name__}: {exc}"))
+        else:
+            pool_type = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+            with pool_type(max_workers=min(self.workers, len(requests))) as pool:
+                futures = {pool.submit(_fetch_batch, self.provider, batch, *missing, interval): (missing, batch)
+                           for missing, batch in requests}
+                for future in as_completed(futures):
+                    missing, batch = futures[future]
+                    try:
+                        write(missing, batch, future.result())
+                    except Exception as exc:
+                        stats["errors"].append((batch, f"{type(exc).__name__}: {exc}"))
+
+        stats["symbols_updated"] = len(updated)
+        stats["unanswered"] = sorted(set(stats["unanswered"]) - updated)
+        return stats
+
+    def load(self, symbol: str, start=None, end=None, interval: str = "1d") -> pd.DataFrame:
+        """Stored bars with start <= Date <= end (no download)."""
+        return self.symbol_store(symbol, interval).frame(start, end)
+
+    def fetch(self, symbols: Iterable[str], start, end=None, interval: str = "1d") -> Dict[str, pd.DataFrame]:
+        """refresh() then load() every symbol over [start, end)."""
+        symbols = list(dict.fromkeys(symbols))
+        self.refresh(symbols, start, end, interval)
+        last = None if end is None else pd.Timestamp(end) - pd.Timedelta(1, "ns")
+        return {symbol: self.load(symbol, start, last, interval) for symbol in symbols}
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    symbols = [f"SYM{i:03d}" for i in range(300)]
+    with tempfile.TemporaryDirectory() as tmp:
+        provider = SyntheticProvider(latency=0.02)
+        store = MarketDataStore(tmp, provider=provider, batch_size=50, workers=8)
+
+        for label, end in (("initial 10y", "2025-06-02"), ("next day", "2025-06-03"), ("same day", "2025-06-03")):
+            calls, served = provider.calls, provider.bars_served
+            start_time = time.perf_counter()
+            stats = store.refresh(symbols, "2015-06-01", end)
+            print(f"{label:>12}: {time.perf_counter() - start_time:6.3f} s, {stats['requests']} requests "
+                  f"({provider.calls - calls} calls), {stats['rows_added']:,} rows added, "
+                  f"{provider.bars_served - served:,} bars downloaded")
+
+        # Backfill a range before the stored history, then compact
+        stats = store.refresh(symbols[:3], "2014-01-01", "2025-06-03")
+        print(f"backfill: {stats['rows_added']:,} rows, sorted={store.symbol_store(symbols[0]).meta['sorted']}")
+        frame = store.load(symbols[0])
+        store.symbol_store(symbols[0]).compact()
+        assert frame.index.is_monotonic_increasing and frame.equals(store.load(symbols[0]))
+        print(frame.tail(3))
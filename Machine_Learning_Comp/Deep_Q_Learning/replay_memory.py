@@ -0,0 +1,469 @@
+"""
+Replay memory for the DQN agents: preallocated NumPy ring buffers, uniform or
+prioritized (sum-tree) sampling, optional memory-mapped backing.
+
+Layout: every field is an array of shape (rows, num_envs, ...), one column per
+environment of a vector env (TradingVectorEnv), so a whole env.step() batch is
+written with one fancy-indexed assignment per field. Each column is its own
+circular buffer:
+
+    row t   obs_t, action_t, reward_t, terminated_t, truncated_t
+    row t+1 obs_{t+1}: the next observation is the following row of the same
+            column, it is never stored twice.
+
+When an episode ends, the vector env has already reset (same-step autoreset),
+so its final observation (infos["final_obs"]) is written as one extra row that
+is marked as not a transition and is never sampled; the new episode continues
+on the row after it. Each row also records a per-column write stamp, and a
+transition is sampleable only while stamp[t + 1] == stamp[t] + 1, i.e. its
+successor is really the next row written (not yet written, or already
+overwritten after the ring wrapped, both fail the check).
+
+Prioritized sampling (Schaul et al. 2016) keeps (|td| + eps) ** alpha per slot
+in an array-based sum tree. Updates only write leaves; the inner nodes are
+refreshed once, for all updates since the last refresh, when the next
+sample needs the total, so steps that only add() pay no O(log n) walk.
+Stratified batched lookups are O(batch * log n) array operations. Rows that
+are not sampleable have priority 0.
+
+With path=..., all arrays are .npy memory maps in that directory (plus
+meta.json), so a buffer can be larger than RAM and is picked up again by the
+next ReplayMemory(path=...) with the same shapes; write positions are
+recovered from the stamps, not from the metadata.
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+from typing import NamedTuple, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Data_Loader.csv_ingest import _read_meta, _write_meta
+
+MEMORY_VERSION = 1
+
+
+class SumTree:
+    """
+    Binary sum tree in one array: leaves at [n_leaves, 2 * n_leaves), node i
+    holds tree[2i] + tree[2i + 1], tree[1] is the total.
+
+    update() only sets leaves and queues them; total and find() first bring
+    the inner nodes up to date (refresh), so many small updates share one
+    walk up the tree.
+    """
+
+    # Distinct nodes per level below which the walk to the root goes node by node
+    SCALAR_NODES = 16
+    # Queued leaves above n_leaves / REBUILD_FRACTION make a full rebuild cheaper
+    REBUILD_FRACTION = 16
+
+    def __init__(self, size: int, tree: np.ndarray = None):
+        """
+        Args:
+            size: Number of leaves used.
+            tree: Optional preallocated float64 array of length 2 * n_leaves
+                (e.g. a memory map) whose leaves are kept and whose inner nodes are rebuilt.
+        """
+        self.size = int(size)
+        self.n_leaves = 1 << max(int(self.size - 1).bit_length(), 0)
+        if tree is None:
+            tree = np.zeros(2 * self.n_leaves, dtype=np.float64)
+        elif tree.shape != (2 * self.n_leaves,):
+            raise ValueError(f"Tree array must have length {2 * self.n_leaves}")
+        self.tree = tree
+        self._queued = []
+        self._queued_count = 0
+        self.rebuild()
+
+    @staticmethod
+    def length(size: int) -> int:
+        """Array length of a tree with `size` leaves."""
+        return 2 << max(int(size - 1).bit_length(), 0)
+
+    @property
+    def total(self) -> float:
+        self.refresh()
+        return float(self.tree[1])
+
+    def rebuild(self):
+        """Recompute every inner node from the leaves (O(n), level by level)."""
+        level = self.n_leaves
+        while level > 1:
+            half = level // 2
+            self.tree[half:level] = self.tree[level:2 * level:2] + self.tree[level + 1:2 * level:2]
+            level = half
+        self._queued = []
+        self._queued_count = 0
+
+    def refresh(self):
+        """Recompute the ancestors of the leaves queued by update() since the last refresh."""
+        if not self._queued:
+            return
+        if self._queued_count * self.REBUILD_FRACTION > self.n_leaves:
+            self.rebuild()
+            return
+        tree = self.tree
+        nodes = np.unique(np.concatenate(self._queued) >> 1)
+        self._queued = []
+        self._queued_count = 0
+        # Wide levels: one vectorized pass over the distinct nodes (sorted, so
+        # their parents are deduplicated by comparing neighbours)
+        while nodes.size > self.SCALAR_NODES:
+            tree[nodes] = tree[2 * nodes] + tree[2 * nodes + 1]
+            nodes >>= 1
+            distinct = np.empty(nodes.size, dtype=bool)
+            distinct[0] = True
+            np.not_equal(nodes[1:], nodes[:-1], out=distinct[1:])
+            nodes = nodes[distinct]
+        # Near the root only a few paths are left, cheaper one node at a time
+        nodes = nodes.tolist()
+        while nodes:
+            parents = []
+            for node in nodes:
+                tree[node] = tree[2 * node] + tree[2 * node + 1]
+                if node > 1 and (not parents or parents[-1] != node >> 1):
+                    parents.append(node >> 1)
+            nodes = parents
+
+    def leaves(self, indices: np.ndarray) -> np.ndarray:
+        return self.tree[np.asarray(indices) + self.n_leaves]
+
+    def update(self, indices: np.ndarray, priorities: np.ndarray):
+        """Set leaves (the last one wins for repeated indices) and queue their ancestors for refresh."""
+        nodes = np.asarray(indices, dtype=np.int64) + self.n_leaves
+        if nodes.size == 0:
+            return
+        self.tree[nodes] = priorities
+        self._queued.append(nodes)
+        self._queued_count += nodes.size
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """Leaf index where each cumulative value falls (batched descent)."""
+        self.refresh()
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(values.shape, dtype=np.int64)
+        while nodes[0] < self.n_leaves:
+            left = self.tree[2 * nodes]
+            right = values >= left
+            values -= np.where(right, left, 0.0)
+            nodes = 2 * nodes + right
+        return nodes - self.n_leaves
+
+
+class ReplayBatch(NamedTuple):
+    obs: np.ndarray
+    actions: np.ndarray
+    rewards: np.ndarray
+    next_obs: np.ndarray
+    terminations: np.ndarray
+    truncations: np.ndarray
+    weights: np.ndarray    # importance-sampling weights (1.0 for uniform sampling)
+    indices: np.ndarray    # slots, for update_priorities
+
+
+class ReplayMemory:
+    FIELDS = ("obs", "actions", "rewards", "terminations", "truncations", "is_transition", "stamps")
+
+    def __init__(self, capacity: int, obs_shape: Tuple[int, ...], num_envs: int = 1,
+                 obs_dtype=np.float32, action_shape: Tuple[int, ...] = (), action_dtype=np.int64,
+                 prioritized: bool = False, alpha: float = 0.6, beta: float = 0.4, eps: float = 1e-6,
+                 path=None, seed: int = None):
+        """
+        Args:
+            capacity: Total rows (transitions + episode-final observations)
+                across all environments.
+            obs_shape: Shape of one observation.
+            num_envs: Environments per add() batch.
+            obs_dtype: Storage dtype of observations (e.g. uint8 for frames).
+            action_shape, action_dtype: Shape / dtype of one action.
+            prioritized: Sample proportionally to priority instead of uniformly.
+            alpha: Priority exponent.
+            beta: Default importance-sampling exponent of sample().
+            eps: Added to |td error| so no transition gets priority 0.
+            path: Directory for memory-mapped storage (None = in RAM).
+            seed: Seed of the sampling generator.
+        """
+        self.num_envs = int(num_envs)
+        self.rows = int(capacity) // self.num_envs
+        if self.rows < 4:
+            raise ValueError("capacity must hold at least 4 rows per environment")
+        self.obs_shape = tuple(obs_shape)
+        self.action_shape = tuple(action_shape)
+        self.prioritized = prioritized
+        self.alpha, self.beta, self.eps = float(alpha), float(beta), float(eps)
+        self.max_priority = 1.0
+        self.path = None if path is None else Path(path)
+        self._rng = np.random.default_rng(seed)
+
+        shape = (self.rows, self.num_envs)
+        specs = {"obs": (shape + self.obs_shape, np.dtype(obs_dtype)),
+                 "actions": (shape + self.action_shape, np.dtype(action_dtype)),
+                 "rewards": (shape, np.dtype(np.float32)),
+                 "terminations": (shape, np.dtype(bool)),
+                 "truncations": (shape, np.dtype(bool)),
+                 "is_transition": (shape, np.dtype(bool)),
+                 "stamps": (shape, np.dtype(np.int64))}
+        tree_length = SumTree.length(self.rows * self.num_envs)
+        if prioritized:
+            specs["priorities"] = ((tree_length,), np.dtype(np.float64))
+
+        if self.path is None:
+            arrays = {name: np.zeros(s, dtype=d) for name, (s, d) in specs.items()}
+        else:
+            arrays = self._open_memmaps(specs)
+        for name in self.FIELDS:
+            setattr(self, name, arrays[name])
+        self._tree = SumTree(self.rows * self.num_envs, arrays["priorities"]) if prioritized else None
+
+        # === Write positions, recovered from the stamps (0 = never written) ===
+        self._written = self.stamps.max(axis=0)
+        self._cursor = np.where(self._written > 0, (self.stamps.argmax(axis=0) + 1) % self.rows, 0)
+        # Latest transition row per column still waiting for its next observation (-1: none)
+        latest = (self._cursor - 1) % self.rows
+        env_index = np.arange(self.num_envs)
+        waiting = (self._written > 0) & self.is_transition[latest, env_index]
+        self._pending = np.where(waiting, latest * self.num_envs + env_index, -1)
+
+    @classmethod
+    def for_env(cls, env, capacity: int, **kwargs) -> "ReplayMemory":
+        """Memory shaped for a Gymnasium vector env (single_observation_space / single_action_space)."""
+        obs_space, action_space = env.single_observation_space, env.single_action_space
+        return cls(capacity, obs_space.shape, num_envs=env.num_envs, obs_dtype=obs_space.dtype,
+                   action_shape=action_space.shape, action_dtype=action_space.dtype, **kwargs)
+
+    # === Storage ===
+    def _open_memmaps(self, specs: dict) -> dict:
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta = {"version": MEMORY_VERSION, "rows": self.rows, "num_envs": self.num_envs,
+                "fields": {name: [list(s), d.str] for name, (s, d) in specs.items()}}
+        existing = _read_meta(self.path)
+        if existing is not None:
+            if {k: existing.get(k) for k in meta} != meta:
+                raise ValueError(f"Replay memory at {self.path} has a different layout")
+            self.max_priority = existing.get("max_priority", 1.0)
+
+        arrays = {}
+        for name, (shape, dtype) in specs.items():
+            file_path = self.path / f"{name}.npy"
+            mode = "r+" if existing is not None and file_path.exists() else "w+"
+            arrays[name] = np.lib.format.open_memmap(file_path, mode=mode, dtype=dtype, shape=shape)
+        self._meta = meta
+        _write_meta(self.path, {**meta, "max_priority": self.max_priority})
+        return arrays
+
+    def flush(self):
+        """Write memory-mapped pages and the metadata to disk (no-op in RAM)."""
+        if self.path is None:
+            return
+        if self.prioritized:
+            self._tree.refresh()
+        for name in self.FIELDS + (("priorities",) if self.prioritized else ()):
+            array = self._tree.tree if name == "priorities" else getattr(self, name)
+            array.flush()
+        _write_meta(self.path, {**self._meta, "max_priority": self.max_priority})
+
+    def __len__(self) -> int:
+        """Rows currently held (transitions plus episode-final observations)."""
+        return int(np.minimum(self._written, self.rows).sum())
+
+    # === Insertion ===
+    def add(self, obs: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+            terminations: np.ndarray, truncations: np.ndarray, final_obs: np.ndarray = None):
+        """
+        Store one transition per environment.
+
+        Args:
+            obs: Observations the actions were taken in, (num_envs, *obs_shape).
+            actions, rewards, terminations, truncations: env.step() outputs.
+            final_obs: Last observations of the episodes that just ended
+                (infos["final_obs"]); only the rows of finished environments are read.
+        """
+        env_index = np.arange(self.num_envs)
+        rows = self._cursor
+        done = np.asarray(terminations, dtype=bool) | np.asarray(truncations, dtype=bool)
+
+        self.obs[rows, env_index] = obs
+        self.actions[rows, env_index] = actions
+        self.rewards[rows, env_index] = rewards
+        self.terminations[rows, env_index] = terminations
+        self.truncations[rows, env_index] = truncations
+        self.is_transition[rows, env_index] = True
+        self._written += 1
+        self.stamps[rows, env_index] = self._written
+        slots = rows * self.num_envs + env_index
+        self._cursor = (rows + 1) % self.rows
+
+        finished = np.flatnonzero(done)
+        final_slots = np.zeros(0, dtype=np.int64)
+        if finished.size:
+            if final_obs is None:
+                raise ValueError("final_obs is required when an episode ends")
+            final_rows = self._cursor[finished]
+            self.obs[final_rows, finished] = np.asarray(final_obs)[finished]
+            self.is_transition[final_rows, finished] = False
+            self.terminations[final_rows, finished] = False
+            self.truncations[final_rows, finished] = False
+            self._written[finished] += 1
+            self.stamps[final_rows, finished] = self._written[finished]
+            final_slots = final_rows * self.num_envs + finished
+            self._cursor[finished] = (final_rows + 1) % self.rows
+
+        if self.prioritized:
+            # The previous pending rows now have their next observation; finished
+            # rows have theirs (the final row); unfinished new rows wait for the next add
+            ready = self._pending[self._pending >= 0]
+            self._tree.update(np.concatenate([ready, slots, final_slots]),
+                              np.concatenate([np.full(ready.size, self.max_priority),
+                                              np.where(done, self.max_priority, 0.0),
+                                              np.zeros(final_slots.size)]))
+        self._pending = np.where(done, -1, slots)
+
+    # === Sampling ===
+    def _sampleable(self, slots: np.ndarray) -> np.ndarray:
+        rows, envs = np.divmod(slots, self.num_envs)
+        stamps = self.stamps[rows, envs]
+        return (self.is_transition[rows, envs] & (stamps > 0)
+                & (self.stamps[(rows + 1) % self.rows, envs] == stamps + 1))
+
+    def _uniform_slots(self, batch_size: int) -> np.ndarray:
+        filled = int(min(self._written.max(), self.rows)) * self.num_envs
+        slots = np.empty(0, dtype=np.int64)
+        for _ in range(64):
+            draws = self._rng.integers(0, filled, size=2 * (batch_size - slots.size) + 8)
+            slots = np.concatenate([slots, draws[self._sampleable(draws)]])
+            if slots.size >= batch_size:
+                return slots[:batch_size]
+        raise ValueError("Not enough transitions in the replay memory to sample from")
+
+    def _prioritized_slots(self, batch_size: int) -> np.ndarray:
+        total = self._tree.total
+        if total <= 0:
+            raise ValueError("Not enough transitions in the replay memory to sample from")
+        # Stratified: one uniform draw in each of batch_size equal slices of the total
+        values = (np.arange(batch_size) + self._rng.random(batch_size)) * (total / batch_size)
+        slots = self._tree.find(np.minimum(values, np.nextafter(total, 0)))
+        # Rounding can land a descent on an empty leaf; redraw those from the whole tree
+        empty = self._tree.leaves(slots) <= 0
+        while empty.any():
+            slots[empty] = self._tree.find(self._rng.random(int(empty.sum())) * total)
+            empty = self._tree.leaves(slots) <= 0
+        return slots
+
+    def sample(self, batch_size: int, beta: float = None) -> ReplayBatch:
+        """
+        Draw a batch of transitions (uniformly, or by priority if prioritized).
+
+        Importance-sampling weights (N * P(i)) ** -beta are normalised by the
+        largest weight in the batch, so N cancels out.
+        """
+        if self.prioritized:
+            slots = self._prioritized_slots(batch_size)
+            probabilities = self._tree.leaves(slots) / self._tree.total
+            weights = (probabilities / probabilities.min()) ** -(self.beta if beta is None else beta)
+        else:
+            slots = self._uniform_slots(batch_size)
+            weights = np.ones(batch_size)
+
+        rows, envs = np.divmod(slots, self.num_envs)
+        return ReplayBatch(self.obs[rows, envs], self.actions[rows, envs], self.rewards[rows, envs],
+                           self.obs[(rows + 1) % self.rows, envs], self.terminations[rows, envs],
+                           self.truncations[rows, envs], weights.astype(np.float32), slots)
+
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray):
+        """New priorities (|td| + eps) ** alpha for sampled slots (batch.indices)."""
+        indices = np.asarray(indices, dtype=np.int64)
+        priorities = (np.abs(np.asarray(td_errors, dtype=np.float64)) + self.eps) ** self.alpha
+        # Slots overwritten since they were sampled, or no longer sampleable, keep their priority
+        live = self._sampleable(indices) & (self._tree.leaves(indices) > 0)
+        if live.any():
+            self._tree.update(indices[live], priorities[live])
+            self.max_priority = max(self.max_priority, float(priorities[live].max()))
+
+
+if __name__ == "__main__":
+    import time
+    import random
+    import tempfile
+    import tracemalloc
+    from collections import deque
+    from Machine_Learning_Comp.Reinforcement_Learning.reinforcement_learning import TradingVectorEnv
+
+    # === Filled from the batched trading environment ===
+    env = TradingVectorEnv.from_dataset(["TSLA.csv", "AMD.csv"], num_envs=64, episode_length=64, seed=0)
+    memory = ReplayMemory.for_env(env, capacity=100_000, prioritized=True, seed=0)
+    obs, _ = env.reset()
+    for _ in range(500):
+        actions = env.action_space.sample()
+        next_obs, rewards, terminations, truncations, infos = env.step(actions)
+        memory.add(obs, actions, rewards, terminations, truncations, infos.get("final_obs"))
+        obs = next_obs
+    batch = memory.sample(256)
+    memory.update_priorities(batch.indices, np.random.default_rng(0).normal(size=256))
+    print(f"trading env: {len(memory):,} rows, batch obs {batch.obs.shape}, weights {batch.weights.min():.2f}..1")
+
+    # === Throughput and memory versus a deque of tuples ===
+    n, num_envs, obs_dim, batch_size = 1_000_000, 64, 17, 256
+    rng = np.random.default_rng(1)
+    obs_batches = rng.normal(size=(n // num_envs, num_envs, obs_dim)).astype(np.float32)
+    actions = rng.integers(0, 3, size=(n // num_envs, num_envs))
+    rewards = rng.normal(size=(n // num_envs, num_envs)).astype(np.float32)
+    dones = rng.random((n // num_envs, num_envs)) < 1 / 128
+    no_truncation = np.zeros(num_envs, dtype=bool)
+
+    def fill_deque(steps: int) -> deque:
+        queue = deque(maxlen=n)
+        for step in range(steps):
+            for e in range(num_envs):
+                queue.append((obs_batches[step, e].copy(), actions[step, e], rewards[step, e],
+                              obs_batches[step + 1, e].copy(), dones[step, e]))
+        return queue
+
+    # Timed without tracemalloc (it slows Python allocations); memory from a traced 1/10 fill
+    tracemalloc.start()
+    queue = fill_deque(n // num_envs // 10)
+    queue_bytes = tracemalloc.get_traced_memory()[0] * 10
+    tracemalloc.stop()
+    del queue
+    start = time.perf_counter()
+    queue = fill_deque(n // num_envs - 1)
+    insert_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(10):
+        sample = random.sample(queue, batch_size)
+        np.stack([t[0] for t in sample]), np.stack([t[3] for t in sample])
+    print(f"deque:         insert {n / insert_time:12,.0f} transitions/s, "
+          f"sample {(time.perf_counter() - start) / 10 * 1e3:8.2f} ms/batch, {queue_bytes / 1e6:6.0f} MB")
+    del queue
+
+    for prioritized in (False, True):
+        memory = ReplayMemory(n + 2 * n // 64, (obs_dim,), num_envs=num_envs, prioritized=prioritized, seed=0)
+        start = time.perf_counter()
+        for step in range(n // num_envs):
+            memory.add(obs_batches[step], actions[step], rewards[step], dones[step], no_truncation,
+                       obs_batches[step])
+        insert_time = time.perf_counter() - start
+        memory_bytes = sum(getattr(memory, name).nbytes for name in ReplayMemory.FIELDS)
+        memory_bytes += memory._tree.tree.nbytes if prioritized else 0
+        start = time.perf_counter()
+        for _ in range(200):
+            batch = memory.sample(batch_size)
+            if prioritized:
+                memory.update_priorities(batch.indices, rng.normal(size=batch_size))
+        label = "prioritized:" if prioritized else "uniform:    "
+        print(f"{label}  insert {n / insert_time:12,.0f} transitions/s, "
+              f"sample {(time.perf_counter() - start) / 200 * 1e3:8.2f} ms/batch, {memory_bytes / 1e6:6.0f} MB")
+
+    # === Memory-mapped: survives a restart ===
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = ReplayMemory(10_000, (obs_dim,), num_envs=num_envs, prioritized=True, path=tmp, seed=0)
+        for step in range(100):
+            memory.add(obs_batches[step], actions[step], rewards[step], dones[step], no_truncation,
+                       obs_batches[step])
+        memory.flush()
+        reopened = ReplayMemory(10_000, (obs_dim,), num_envs=num_envs, prioritized=True, path=tmp, seed=0)
+        print(f"memmap reopen: {len(reopened):,} rows, tree total {reopened._tree.total:.0f} "
+              f"(before {memory._tree.total:.0f})")
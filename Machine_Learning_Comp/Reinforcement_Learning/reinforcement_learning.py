@@ -0,0 +1,236 @@
+"""
+Batched trading environment for the DQN agents.
+
+TradingVectorEnv steps num_envs independent trading episodes at once with
+array operations only (no Python loop over environments):
+
+    observation  (num_envs, window + 1) float32: the last `window` simple
+                 returns up to the current bar, then the current position.
+    action       Discrete(3) per environment: 0 short, 1 flat, 2 long.
+    reward       a_t * r_{t+1} - trading_cost * |a_t - a_{t-1}|, the
+                 per-unit-capital form of Mean_reversion_engine.positions_to_profits.
+
+All price series are turned into one read-only returns buffer when the
+environment is built; every episode is just a cursor into it, started at a
+random bar, so 4096 environments cost 4096 cursors rather than 4096 copies of
+the data.
+
+Episodes are truncated after episode_length steps or at the last bar of their
+series, and terminated when equity falls to ruin_equity. The interface is a
+gymnasium.vector.VectorEnv with AutoresetMode.SAME_STEP: finished
+environments are reset inside step(), the returned observation is the first
+one of the new episode, and infos["final_obs"] / infos["episode_stats"] (masked
+by infos["_final_obs"] / infos["_episode_stats"]) describe the episode that
+ended. "episode" itself is left to gymnasium's RecordEpisodeStatistics wrapper.
+
+Usage:
+    env = TradingVectorEnv.from_dataset(["TSLA.csv", "AMD.csv"], num_envs=256, seed=0)
+    obs, infos = env.reset()
+    obs, rewards, terminations, truncations, infos = env.step(env.action_space.sample())
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+from typing import List, Sequence, Union
+
+from numpy.lib.stride_tricks import sliding_window_view
+from gymnasium import spaces
+from gymnasium.vector import AutoresetMode, VectorEnv
+from gymnasium.vector.utils import batch_space
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Data_Loader.dataset_loader import get_loader
+
+# Target position of each discrete action: 0 short, 1 flat, 2 long
+ACTION_POSITIONS = np.array([-1.0, 0.0, 1.0], dtype=np.float32)
+
+
+def returns_buffer(series: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Simple returns of several price series laid end to end, as one read-only array.
+
+    The first element of each series is 0 (no previous bar); non-finite
+    returns (missing or zero prices) are 0 as well.
+    """
+    parts = []
+    for prices in series:
+        returns = np.zeros(prices.shape[0], dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.divide(prices[1:], prices[:-1], out=returns[1:])
+        returns[1:] -= 1.0
+        parts.append(returns)
+    buffer = np.nan_to_num(np.concatenate(parts), nan=0.0, posinf=0.0, neginf=0.0).astype(np.float32)
+    buffer.setflags(write=False)
+    return buffer
+
+
+class TradingVectorEnv(VectorEnv):
+    metadata = {"autoreset_mode": AutoresetMode.SAME_STEP}
+
+    def __init__(self, prices: Union[np.ndarray, List[np.ndarray]], num_envs: int = 64,
+                 window: int = 16, episode_length: int = 128, trading_cost: float = 0.001,
+                 ruin_equity: float = 0.5, seed: int = None, copy: bool = True):
+        """
+        Args:
+            prices: One price series or a list of them (e.g. one per ticker).
+            num_envs: Episodes stepped together.
+            window: Lagged returns in each observation.
+            episode_length: Steps before truncation (None = run to the end of the series).
+            trading_cost: Fractional cost per unit of position change.
+            ruin_equity: Equity (start = 1.0) at or below which an episode terminates.
+            seed: Seed of the start-offset generator (reset(seed=...) reseeds it).
+            copy: Return a copy of the observation buffer from reset/step; False
+                hands out the internal buffer, which the next step overwrites.
+        """
+        series = [np.asarray(p, dtype=np.float64).ravel() for p in
+                  (prices if isinstance(prices, (list, tuple)) else [prices])]
+        lengths = np.array([p.shape[0] for p in series], dtype=np.int64)
+        if lengths.size == 0 or (lengths < window + 2).any():
+            raise ValueError(f"Every price series needs at least window + 2 = {window + 2} bars")
+
+        self.num_envs = int(num_envs)
+        self.window = int(window)
+        self.episode_length = None if episode_length is None else int(episode_length)
+        self.trading_cost = float(trading_cost)
+        self.ruin_equity = float(ruin_equity)
+        self.copy = copy
+
+        # === Shared data: returns buffer and the valid start cursors of each series ===
+        self._returns = returns_buffer(series)
+        ends = np.cumsum(lengths)
+        self._first_start = ends - lengths + self.window  # `window` returns behind the cursor
+        self._last_bar = ends - 1                          # the cursor can advance up to here
+        self._start_counts = self._last_bar - self._first_start
+        self._cum_starts = np.cumsum(self._start_counts)
+        # Row c - window + 1 of this view is the return window ending at cursor c (no copy)
+        self._windows = sliding_window_view(self._returns, self.window)
+
+        # === Per-environment state ===
+        n = self.num_envs
+        self._cursor = np.zeros(n, dtype=np.int64)
+        self._series_end = np.zeros(n, dtype=np.int64)
+        self._steps = np.zeros(n, dtype=np.int64)
+        self._position = np.zeros(n, dtype=np.float32)
+        self._equity = np.ones(n, dtype=np.float64)
+        self._episode_return = np.zeros(n, dtype=np.float64)
+        self._obs = np.zeros((n, self.window + 1), dtype=np.float32)
+
+        self.single_observation_space = spaces.Box(-np.inf, np.inf, (self.window + 1,), dtype=np.float32)
+        self.single_action_space = spaces.Discrete(len(ACTION_POSITIONS))
+        self.observation_space = batch_space(self.single_observation_space, n)
+        self.action_space = batch_space(self.single_action_space, n)
+
+        if seed is not None:
+            self._np_random, self._np_random_seed = np.random.default_rng(seed), seed
+            self.action_space.seed(seed)
+
+    @classmethod
+    def from_dataset(cls, file_names: Union[str, List[str]], column: str = "Close", **kwargs) -> "TradingVectorEnv":
+        """Environment over one column of csv_dataset files (through the shared loader cache)."""
+        if isinstance(file_names, (str, Path)):
+            file_names = [file_names]
+        loader = get_loader()
+        return cls([loader.arrays(name)[column] for name in file_names], **kwargs)
+
+    @property
+    def n_starts(self) -> int:
+        """Number of distinct episode start bars across all series."""
+        return int(self._cum_starts[-1])
+
+    # === Episode bookkeeping ===
+    def _start_episodes(self, mask: np.ndarray):
+        """New episodes for the masked environments: uniform over all valid start bars."""
+        idx = np.flatnonzero(mask)
+        if idx.size == 0:
+            return
+        draws = self.np_random.integers(0, self.n_starts, size=idx.size)
+        series = np.searchsorted(self._cum_starts, draws, side="right")
+        self._cursor[idx] = self._first_start[series] + draws - (self._cum_starts[series] - self._start_counts[series])
+        self._series_end[idx] = self._last_bar[series]
+        self._steps[idx] = 0
+        self._position[idx] = 0.0
+        self._equity[idx] = 1.0
+        self._episode_return[idx] = 0.0
+
+    def _observe(self, idx: np.ndarray = None):
+        """Refresh the observation buffer (only rows idx if given)."""
+        if idx is None:
+            self._obs[:, :-1] = self._windows[self._cursor - (self.window - 1)]
+            self._obs[:, -1] = self._position
+        else:
+            self._obs[idx, :-1] = self._windows[self._cursor[idx] - (self.window - 1)]
+            self._obs[idx, -1] = self._position[idx]
+
+    def _output(self) -> np.ndarray:
+        return self._obs.copy() if self.copy else self._obs
+
+    # === VectorEnv interface ===
+    def reset(self, *, seed: int = None, options: dict = None):
+        """
+        Start new episodes (all, or options["reset_mask"] only) and return (obs, infos).
+        """
+        super().reset(seed=seed)
+        if seed is not None:
+            self.action_space.seed(seed)
+        mask = np.ones(self.num_envs, dtype=bool)
+        if options and options.get("reset_mask") is not None:
+            mask = np.asarray(options["reset_mask"], dtype=bool)
+        self._start_episodes(mask)
+        self._observe()
+        return self._output(), {}
+
+    def step(self, actions):
+        """
+        Apply one action per environment.
+
+        Returns:
+            obs, rewards (float32), terminations, truncations, infos with
+            per-environment "position", "cost" and "equity", plus "final_obs"
+            and "episode_stats" {"r": return, "l": length} for finished episodes.
+        """
+        new_position = ACTION_POSITIONS[np.asarray(actions, dtype=np.intp)]
+        cost = self.trading_cost * np.abs(new_position - self._position)
+
+        self._cursor += 1
+        self._steps += 1
+        rewards = new_position * self._returns[self._cursor] - cost
+        self._position = new_position
+        self._equity *= 1.0 + rewards
+        self._episode_return += rewards
+
+        terminations = self._equity <= self.ruin_equity
+        at_end = self._cursor >= self._series_end
+        if self.episode_length is not None:
+            at_end |= self._steps >= self.episode_length
+        truncations = at_end & ~terminations
+
+        infos = {"position": new_position.copy(), "cost": cost, "equity": self._equity.copy()}
+        self._observe()
+        done = terminations | at_end
+        if done.any():
+            # Same-step autoreset: report the finished episodes, then restart them
+            infos["final_obs"] = self._obs.copy()
+            infos["_final_obs"] = done
+            infos["episode_stats"] = {"r": np.where(done, self._episode_return, 0.0),
+                                      "l": np.where(done, self._steps, 0)}
+            infos["_episode_stats"] = done
+            self._start_episodes(done)
+            self._observe(np.flatnonzero(done))
+        return self._output(), rewards, terminations, truncations, infos
+
+
+if __name__ == "__main__":
+    env = TradingVectorEnv.from_dataset(["TSLA.csv", "AMD.csv"], num_envs=8, episode_length=64, seed=0)
+    obs, _ = env.reset()
+    print(f"{env.num_envs} envs, observation {obs.shape}, {env.n_starts} start bars")
+
+    finished = []
+    for _ in range(256):
+        obs, rewards, terminations, truncations, infos = env.step(env.action_space.sample())
+        if "episode_stats" in infos:
+            finished.extend(infos["episode_stats"]["r"][infos["_episode_stats"]])
+    print(f"{len(finished)} random-policy episodes, mean return {np.mean(finished):+.4f}")
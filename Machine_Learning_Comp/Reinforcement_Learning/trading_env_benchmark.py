@@ -0,0 +1,63 @@
+"""
+Benchmark: environment steps per second of TradingVectorEnv for N = 1 .. 4096.
+
+Usage:
+    python Machine_Learning_Comp/Reinforcement_Learning/trading_env_benchmark.py
+    python Machine_Learning_Comp/Reinforcement_Learning/trading_env_benchmark.py --bars 1e6 --steps 2000
+
+Prices are a synthetic geometric random walk (--bars long) unless --file
+names a csv_dataset file. Actions are drawn up front, so the timing covers
+step() only: reward / cost / position updates, observation gather and the
+same-step resets of finished episodes.
+"""
+
+import sys
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+
+MODULE_DIR = Path(__file__).resolve().parent
+if str(MODULE_DIR) not in sys.path:
+    sys.path.append(str(MODULE_DIR))
+
+from reinforcement_learning import TradingVectorEnv
+
+
+def run_benchmark(prices, num_envs: int, steps: int, window: int, episode_length: int, seed: int = 0) -> float:
+    env = TradingVectorEnv(prices, num_envs=num_envs, window=window, episode_length=episode_length, seed=seed)
+    actions = np.random.default_rng(seed).integers(0, 3, size=(steps, num_envs))
+    env.reset()
+    for step_actions in actions[:10]:
+        env.step(step_actions)
+
+    start = time.perf_counter()
+    for step_actions in actions:
+        env.step(step_actions)
+    elapsed = time.perf_counter() - start
+    return steps * num_envs / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TradingVectorEnv throughput")
+    parser.add_argument("--file", default=None, help="csv_dataset file (default: synthetic prices)")
+    parser.add_argument("--bars", type=float, default=1e6)
+    parser.add_argument("--steps", type=int, default=2_000, help="Vector steps per N")
+    parser.add_argument("--window", type=int, default=16)
+    parser.add_argument("--episode-length", type=int, default=128)
+    args = parser.parse_args()
+
+    if args.file:
+        from Data_Loader.dataset_loader import get_loader
+        prices = get_loader().arrays(args.file)["Close"]
+    else:
+        rng = np.random.default_rng(0)
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, int(args.bars))))
+    print(f"{len(prices):,} bars, window {args.window}, episode length {args.episode_length}")
+
+    baseline = None
+    for num_envs in [1, 4, 16, 64, 256, 1024, 4096]:
+        rate = run_benchmark(prices, num_envs, args.steps, args.window, args.episode_length)
+        baseline = baseline or rate
+        print(f"N={num_envs:5d}: {rate:13,.0f} env steps/s ({rate / num_envs:9,.0f} vector steps/s, "
+              f"{rate / baseline:6.1f}x N=1)")
@@ -0,0 +1,78 @@
+"""
+Benchmark: per-bar loop engine vs NumPy-array engine of the mean-reversion strategy.
+
+Usage:
+    python Mean_Reversion/Mean_reversion_benchmark.py --sizes 1e4 1e5 1e6 1e7 --max-loop-bars 1e6
+
+The loop engine is skipped above --max-loop-bars (it needs minutes at 1e7 bars);
+its time is then extrapolated linearly from the largest size that was measured.
+"""
+
+import sys
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+from typing import List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Mean_Reversion.Mean_reversion_prj import Mean_Reversion
+
+
+def synthetic_prices(n_bars: int, seed: int = 0) -> np.ndarray:
+    """Geometric random walk starting at 100."""
+    rng = np.random.default_rng(seed)
+    log_returns = rng.normal(0.0, 0.01, n_bars)
+    return 100 * np.exp(np.cumsum(log_returns))
+
+
+def time_call(func, *args, repeat: int = 1) -> float:
+    """Best wall-clock time of `repeat` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(sizes: List[int], max_loop_bars: int = 1_000_000, trading_cost: float = 0.01):
+    bot = Mean_Reversion()
+    loop_rate = None  # seconds per bar of the last measured loop run
+
+    print(f"{'bars':>12} {'loop (s)':>12} {'vectorized (s)':>16} {'speed-up':>10} {'max |diff|':>12}")
+    for n_bars in sizes:
+        prices = synthetic_prices(n_bars)
+
+        vec_time = time_call(bot.Vectorized_Mean_Reversion_, prices, 100, 1, 1, trading_cost, repeat=3)
+
+        if n_bars <= max_loop_bars:
+            price_list = prices.tolist()
+            start = time.perf_counter()
+            loop_profits, _, loop_capital = bot.Basic_Mean_Reversion_(price_list, trading_cost=trading_cost)
+            loop_time = time.perf_counter() - start
+            loop_rate = loop_time / n_bars
+
+            vec_profits, _, vec_capital = bot.Vectorized_Mean_Reversion_(prices, trading_cost=trading_cost)
+            max_diff = max(np.max(np.abs(np.asarray(loop_profits) - vec_profits)),
+                           np.max(np.abs(np.asarray(loop_capital) - vec_capital)))
+            loop_label, diff_label = f"{loop_time:.3f}", f"{max_diff:.2e}"
+        elif loop_rate is not None:
+            loop_time = loop_rate * n_bars
+            loop_label, diff_label = f"~{loop_time:.1f}", "n/a"
+        else:
+            loop_time, loop_label, diff_label = float("nan"), "skipped", "n/a"
+
+        print(f"{n_bars:>12,} {loop_label:>12} {vec_time:>16.4f} {loop_time / vec_time:>9.1f}x {diff_label:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loop vs vectorized mean-reversion benchmark")
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1e4, 1e5, 1e6, 1e7])
+    parser.add_argument("--max-loop-bars", type=float, default=1e6)
+    args = parser.parse_args()
+
+    run_benchmark([int(size) for size in args.sizes], int(args.max_loop_bars))
@@ -0,0 +1,297 @@
+"""
+Array kernels for the Z-score mean-reversion strategy.
+
+Every function works on whole NumPy arrays (no Python loop over bars), so a
+backtest over tens of millions of bars costs a handful of cumulative sums.
+The math follows Mean_Reversion.Basic_Mean_Reversion_ step for step (see
+description.md), so both engines agree within float tolerance.
+"""
+
+import numpy as np
+from scipy.signal import lfilter
+from typing import Callable, Tuple
+
+# std below this fraction of |mean| is treated as a flat window (Z = 0)
+FLAT_STD_TOLERANCE = 1e-12
+
+
+def expanding_zscore(prices: np.ndarray) -> np.ndarray:
+    """
+    Expanding-window Z-score of a price series.
+
+    Args:
+        prices: 1-D array of prices.
+
+    Returns:
+        z_scores: (P_t - mean_t) / std_t, 0 where std_t == 0.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    counts = np.arange(1, prices.shape[0] + 1, dtype=np.float64)
+
+    mean = np.cumsum(prices) / counts
+    deviation = prices - mean
+    cumulative_sq_diff = np.cumsum(deviation * deviation)
+    std = np.sqrt(cumulative_sq_diff / counts)
+
+    z_scores = np.zeros_like(prices)
+    np.divide(deviation, std, out=z_scores, where=std != 0)
+    return z_scores
+
+
+def _block_window_sums(prices: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Trailing-window mean and variance in O(n) without a global running sum.
+
+    The series is cut into blocks of `window` bars. A window ending at bar j of
+    block k is the suffix of block k-1 plus the prefix of block k, so only
+    in-block cumulative sums are needed and rounding error stays bounded by the
+    window length instead of growing with the series (stable over 1e7+ bars).
+    Each block is centred on its own mean before summing squares.
+
+    Returns:
+        mean, variance, count: Per-bar window statistics (ddof = 0). The first
+        window - 1 bars use the partial window available so far.
+    """
+    n = prices.shape[0]
+    n_blocks = -(-n // window)
+    padded = np.empty(n_blocks * window)
+    padded[:n] = prices
+    padded[n:] = prices[-1]
+    blocks = padded.reshape(n_blocks, window)
+
+    centre = blocks.mean(axis=1, keepdims=True)
+    centred = blocks - centre
+
+    prefix_1 = np.cumsum(centred, axis=1)
+    prefix_2 = np.cumsum(centred * centred, axis=1)
+    suffix_1 = np.cumsum(centred[:, ::-1], axis=1)[:, ::-1]
+    suffix_2 = np.cumsum((centred * centred)[:, ::-1], axis=1)[:, ::-1]
+
+    # Suffix of the previous block starting at j + 1, re-centred on this block
+    tail_1 = np.zeros_like(blocks)
+    tail_2 = np.zeros_like(blocks)
+    tail_count = np.zeros_like(blocks)
+    tail_count[1:, :-1] = np.arange(window - 1, 0, -1)
+    shift = centre[1:] - centre[:-1]
+    tail_1[1:, :-1] = suffix_1[:-1, 1:] - tail_count[1:, :-1] * shift
+    tail_2[1:, :-1] = (suffix_2[:-1, 1:] - 2 * shift * suffix_1[:-1, 1:]
+                       + tail_count[1:, :-1] * shift * shift)
+
+    count = (tail_count + np.arange(1, window + 1)).ravel()[:n]
+    sum_1 = (prefix_1 + tail_1).ravel()[:n]
+    sum_2 = (prefix_2 + tail_2).ravel()[:n]
+
+    local_mean = sum_1 / count
+    mean = np.repeat(centre.ravel(), window)[:n] + local_mean
+    variance = np.maximum(sum_2 / count - local_mean * local_mean, 0.0)
+    return mean, variance, count
+
+
+def _safe_zscore(prices: np.ndarray, mean: np.ndarray, std: np.ndarray) -> np.ndarray:
+    z_scores = np.zeros_like(prices)
+    np.divide(prices - mean, std, out=z_scores, where=std > FLAT_STD_TOLERANCE * np.abs(mean))
+    return z_scores
+
+
+def rolling_zscore(prices: np.ndarray, window: int) -> np.ndarray:
+    """
+    Z-score against the trailing `window` bars (including the current one).
+
+    Args:
+        prices: 1-D array of prices.
+        window: Lookback N in bars.
+
+    Returns:
+        z_scores: (P_t - mean_t) / std_t over the window, 0 on flat windows.
+    """
+    if window < 1:
+        raise ValueError("window must be >= 1")
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.shape[0] == 0:
+        return np.zeros(0)
+
+    mean, variance, _ = _block_window_sums(prices, int(window))
+    return _safe_zscore(prices, mean, np.sqrt(variance))
+
+
+def ewm_alpha(halflife: float) -> float:
+    """Smoothing factor of an exponentially weighted average with half-life H bars."""
+    if halflife <= 0:
+        raise ValueError("halflife must be > 0")
+    return 1.0 - 0.5 ** (1.0 / halflife)
+
+
+def ewm_zscore(prices: np.ndarray, halflife: float) -> np.ndarray:
+    """
+    Z-score against an exponentially weighted mean and variance.
+
+    Uses the recursive updates
+        d_t = P_t - m_{t-1}
+        m_t = m_{t-1} + alpha * d_t
+        v_t = (1 - alpha) * (v_{t-1} + alpha * d_t^2)
+    run as IIR filters (scipy.signal.lfilter), so the batch result matches the
+    per-bar EwmZScore estimator and never forms large running sums.
+
+    Args:
+        prices: 1-D array of prices.
+        halflife: Half-life H in bars.
+
+    Returns:
+        z_scores: (P_t - m_t) / sqrt(v_t), 0 on the first bar.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n = prices.shape[0]
+    if n == 0:
+        return np.zeros(0)
+
+    alpha = ewm_alpha(halflife)
+    decay = 1.0 - alpha
+
+    mean = np.empty(n)
+    mean[0] = prices[0]
+    mean[1:] = lfilter([alpha], [1.0, -decay], prices[1:], zi=[decay * prices[0]])[0]
+
+    deviation = np.zeros(n)
+    deviation[1:] = prices[1:] - mean[:-1]
+    variance = np.zeros(n)
+    variance[1:] = lfilter([1.0], [1.0, -decay], decay * alpha * deviation[1:] ** 2, zi=[0.0])[0]
+
+    return _safe_zscore(prices, mean, np.sqrt(variance))
+
+
+def zscore_series(prices: np.ndarray, window: int = None, halflife: float = None) -> np.ndarray:
+    """
+    Z-score mode selector: expanding (default), rolling `window`, or EWMA `halflife`.
+    """
+    if window is not None and halflife is not None:
+        raise ValueError("Choose either window or halflife, not both")
+    if window is not None:
+        return rolling_zscore(prices, window)
+    if halflife is not None:
+        return ewm_zscore(prices, halflife)
+    return expanding_zscore(prices)
+
+
+def zscore_positions(z_scores: np.ndarray,
+                     buy_threshold: float = 1,
+                     sell_threshold: float = 1) -> np.ndarray:
+    """
+    Map Z-scores to positions: 1 = Buy, -1 = Sell, 0 = Hold.
+    """
+    z_scores = np.asarray(z_scores)
+    positions = np.zeros(z_scores.shape, dtype=np.int8)
+    positions[z_scores > sell_threshold] = -1
+    positions[z_scores < -buy_threshold] = 1
+    return positions
+
+
+def position_turnover(positions: np.ndarray) -> np.ndarray:
+    """
+    |a_t - a_{t-1}| along the last axis, 0 on the first bar.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    turnover = np.zeros_like(positions)
+    turnover[..., 1:] = np.abs(np.diff(positions, axis=-1))
+    return turnover
+
+
+def positions_to_profits(prices: np.ndarray,
+                         positions: np.ndarray,
+                         trading_cost: float = 0.0,
+                         costs: np.ndarray = None) -> np.ndarray:
+    """
+    Per-step profit a_{t-1} * (P_t - P_{t-1}) - c * |a_t - a_{t-1}|.
+
+    Args:
+        prices: Prices, time on the last axis.
+        positions: Positions with the same trailing shape as prices.
+        trading_cost: Flat cost per unit of turnover.
+        costs: Optional precomputed per-step costs, replaces the flat cost.
+
+    Returns:
+        profits: Profit per step, 0 on the first bar.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.float64)
+
+    if costs is None:
+        costs = trading_cost * position_turnover(positions)
+
+    profits = np.zeros(np.broadcast_shapes(prices.shape, positions.shape))
+    profits[..., 1:] = positions[..., :-1] * np.diff(prices, axis=-1) - costs[..., 1:]
+    return profits
+
+
+def profits_to_capital(prices: np.ndarray,
+                       profits: np.ndarray,
+                       init_value: float = 100) -> np.ndarray:
+    """
+    Capital curve C_t = C_{t-1} * (1 + profit_t / P_{t-1}), starting at 1.0.
+
+    The first element is init_value, matching the list returned by the loop
+    engine, so the curve is one element longer than the price series.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    profits = np.asarray(profits, dtype=np.float64)
+
+    previous_prices = np.empty_like(prices)
+    previous_prices[..., 0] = prices[..., 0]
+    previous_prices[..., 1:] = prices[..., :-1]
+
+    growth = np.cumprod(1 + profits / previous_prices, axis=-1)
+
+    capital_curve = np.empty(growth.shape[:-1] + (growth.shape[-1] + 1,))
+    capital_curve[..., 0] = init_value
+    capital_curve[..., 1:] = growth
+    return capital_curve
+
+
+def vectorized_mean_reversion(prices: np.ndarray,
+                              init_value: float = 100,
+                              buy_threshold: float = 1,
+                              sell_threshold: float = 1,
+                              trading_cost: float = 0.0,
+                              window: int = None,
+                              halflife: float = None,
+                              cost_model: Callable[[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]] = None,
+                              z_scores: np.ndarray = None
+                              ) -> Tuple[np.ndarray, float, np.ndarray]:
+    """
+    Array version of Mean_Reversion.Basic_Mean_Reversion_.
+
+    Args:
+        prices: 1-D array of historical prices.
+        init_value: First element of the capital curve.
+        buy_threshold: Z-score threshold to trigger buy.
+        sell_threshold: Z-score threshold to trigger sell.
+        trading_cost: Fractional cost per trade.
+        window: Rolling Z-score lookback in bars (None = expanding).
+        halflife: EWMA Z-score half-life in bars (None = expanding).
+        cost_model: Optional callable (prices, target positions) ->
+            (executed positions, per-step costs), e.g.
+            Simulated_slippage.SlippageModel; replaces the flat trading_cost.
+        z_scores: Optional precomputed Z-scores aligned with prices (e.g. from
+            Data_Loader.feature_store); window / halflife are then ignored.
+
+    Returns:
+        profits: Array of profit/loss per time step.
+        total_profit: Sum of profits.
+        capital_curve: Cumulative capital over time (len(prices) + 1).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.shape[0] == 0:
+        return np.zeros(0), 0.0, np.array([float(init_value)])
+
+    if z_scores is None:
+        z_scores = zscore_series(prices, window, halflife)
+    elif np.shape(z_scores) != prices.shape:
+        raise ValueError("z_scores must have the same shape as prices")
+    positions = zscore_positions(z_scores, buy_threshold, sell_threshold)
+    if cost_model is None:
+        profits = positions_to_profits(prices, positions, trading_cost)
+    else:
+        positions, costs = cost_model(prices, positions)
+        profits = positions_to_profits(prices, positions, costs=costs)
+    capital_curve = profits_to_capital(prices, profits, init_value)
+
+    return profits, float(profits.sum()), capital_curve
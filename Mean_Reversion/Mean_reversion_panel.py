@@ -0,0 +1,193 @@
+"""
+Multi-asset panel mode of the Z-score mean-reversion strategy.
+
+All symbols are aligned on one date index into a (time x symbols) price array
+and the signals, positions and P&L of every symbol are computed in a single
+vectorized pass, so the cost grows linearly with symbols x bars. A symbol
+is only active between its first and last bar, so one without gaps gets
+exactly the result of the 1-D engine on its own file. An equal-weight
+portfolio is built on top.
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Data_Loader.dataset_loader import get_loader
+
+MISSING_POLICIES = ("ffill", "drop")
+
+
+def load_panel(file_names: List[str], price_column: str = "Close", missing: str = "ffill") -> pd.DataFrame:
+    """
+    Load one price column of many files aligned on a common date index.
+
+    Args:
+        file_names: Files in csv_dataset/ (symbol = file stem).
+        price_column: Column used as the price of each symbol.
+        missing: Policy for dates a symbol has no bar on:
+            "ffill" - union of all dates; a missing bar inside a symbol's
+                      history repeats the last known price (flat P&L), bars
+                      before its first / after its last bar stay NaN and the
+                      symbol is inactive there.
+            "drop"  - intersection of dates; only bars every symbol has are kept.
+
+    Returns:
+        (dates x symbols) DataFrame of float64 prices.
+    """
+    if missing not in MISSING_POLICIES:
+        raise ValueError(f"missing must be one of {MISSING_POLICIES}")
+
+    loader = get_loader()
+    columns = [loader.arrays(name) for name in file_names]
+    symbols = [Path(name).stem for name in file_names]
+
+    all_dates = [arrays["Date"] for arrays in columns]
+    if missing == "drop":
+        dates = all_dates[0]
+        for other in all_dates[1:]:
+            dates = np.intersect1d(dates, other)
+    else:
+        dates = np.unique(np.concatenate(all_dates))
+
+    prices = np.full((dates.shape[0], len(file_names)), np.nan)
+    for j, arrays in enumerate(columns):
+        if dates.shape[0] == 0:
+            break
+        rows = np.searchsorted(dates, arrays["Date"])
+        inside = (rows < dates.shape[0]) & (dates[np.minimum(rows, dates.shape[0] - 1)] == arrays["Date"])
+        prices[rows[inside], j] = arrays[price_column][inside]
+
+    if missing == "ffill":
+        prices = forward_fill(prices)
+
+    return pd.DataFrame(prices, index=pd.DatetimeIndex(dates, name="Date"), columns=symbols)
+
+
+def forward_fill(prices: np.ndarray) -> np.ndarray:
+    """Forward-fill interior NaNs down the time axis (leading/trailing NaNs are kept)."""
+    valid = ~np.isnan(prices)
+    last_valid = np.where(valid, np.arange(prices.shape[0])[:, None], 0)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    filled = prices[last_valid, np.arange(prices.shape[1])]
+
+    before_first = np.cumsum(valid, axis=0) == 0
+    after_last = np.cumsum(valid[::-1], axis=0)[::-1] == 0
+    filled[before_first | after_last] = np.nan
+    return filled
+
+
+def panel_expanding_zscore(prices: np.ndarray) -> np.ndarray:
+    """
+    Expanding Z-score of every column of a (time x symbols) array.
+
+    Each column starts at its first non-NaN bar, exactly like the 1-D engine
+    run on that symbol alone; NaN bars get Z = 0.
+    """
+    valid = ~np.isnan(prices)
+    values = np.where(valid, prices, 0.0)
+
+    counts = np.cumsum(valid, axis=0, dtype=np.float64)
+    safe_counts = np.maximum(counts, 1.0)
+    mean = np.cumsum(values, axis=0) / safe_counts
+    deviation = np.where(valid, values - mean, 0.0)
+    std = np.sqrt(np.cumsum(deviation * deviation, axis=0) / safe_counts)
+
+    z_scores = np.zeros_like(values)
+    np.divide(deviation, std, out=z_scores, where=std != 0)
+    return z_scores
+
+
+def panel_backtest(panel: pd.DataFrame,
+                   buy_threshold: float = 1,
+                   sell_threshold: float = 1,
+                   trading_cost: float = 0.0) -> Dict[str, pd.DataFrame]:
+    """
+    Run the mean-reversion strategy on every symbol of a price panel at once.
+
+    Args:
+        panel: (dates x symbols) prices, e.g. from load_panel.
+        buy_threshold: Z-score threshold to trigger buy.
+        sell_threshold: Z-score threshold to trigger sell.
+        trading_cost: Fractional cost per trade.
+
+    Returns:
+        dict with
+            "positions", "profits", "capital": (dates x symbols) frames
+                (capital per symbol starts at 1.0),
+            "summary": per-symbol total_profit, final_capital, turnover,
+                max_drawdown and n_bars,
+            "portfolio": equal-weight portfolio profit and capital per date
+                (a symbol's share stays in cash while it is inactive).
+    """
+    prices = panel.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(prices)
+
+    z_scores = panel_expanding_zscore(prices)
+    positions = np.where(z_scores < -buy_threshold, 1.0, np.where(z_scores > sell_threshold, -1.0, 0.0))
+
+    previous = np.empty_like(prices)
+    previous[0] = np.nan
+    previous[1:] = prices[:-1]
+    traded = valid & ~np.isnan(previous)  # both bars exist: same as t > 0 in the 1-D engine
+
+    turnover = np.zeros_like(prices)
+    turnover[1:] = np.abs(positions[1:] - positions[:-1])
+    turnover = np.where(traded, turnover, 0.0)
+
+    price_change = np.where(traded, prices - previous, 0.0)
+    previous_positions = np.zeros_like(positions)
+    previous_positions[1:] = positions[:-1]
+    profits = previous_positions * price_change - trading_cost * turnover
+
+    growth_factor = np.ones_like(prices)
+    np.divide(profits, previous, out=growth_factor, where=traded)
+    growth_factor = np.where(traded, 1.0 + growth_factor, 1.0)
+    capital = np.cumprod(growth_factor, axis=0)
+
+    drawdown = 1 - capital / np.maximum.accumulate(capital, axis=0)
+    summary = pd.DataFrame({
+        "total_profit": profits.sum(axis=0),
+        "final_capital": capital[-1] if capital.shape[0] else np.ones(prices.shape[1]),
+        "turnover": turnover.sum(axis=0),
+        "max_drawdown": drawdown.max(axis=0) if capital.shape[0] else np.zeros(prices.shape[1]),
+        "n_bars": valid.sum(axis=0),
+    }, index=panel.columns)
+
+    portfolio_capital = capital.mean(axis=1)
+    portfolio = pd.DataFrame({"profit": profits.sum(axis=1), "capital": portfolio_capital}, index=panel.index)
+
+    def as_frame(values: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(values, index=panel.index, columns=panel.columns)
+
+    return {
+        "positions": as_frame(positions),
+        "profits": as_frame(profits),
+        "capital": as_frame(capital),
+        "summary": summary,
+        "portfolio": portfolio,
+    }
+
+
+def plot_panel(result: Dict[str, pd.DataFrame], plot_file: str = None, show: bool = False):
+    """Optional chart: per-symbol capital curves and the portfolio curve."""
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
+    result["capital"].plot(ax=axes[0], legend=result["capital"].shape[1] <= 20)
+    axes[0].set_title("Capital per Symbol")
+    result["portfolio"]["capital"].plot(ax=axes[1], color="green")
+    axes[1].set_title("Equal-weight Portfolio Capital")
+
+    plt.tight_layout()
+    if plot_file:
+        plt.savefig(plot_file, dpi=150)
+    if show:
+        plt.show()
+    plt.close(fig)
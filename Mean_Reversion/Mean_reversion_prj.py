@@ -1,30 +1,57 @@
+import sys
+import tempfile
 import yfinance
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from IPython.display import display
-import matplotlib.pyplot as plt
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Data_Loader.dataset_loader import get_loader
+from Data_Loader.market_data_store import MarketDataStore
+from Data_Loader.feature_store import FeatureStore
+from Plot_Renderer.batch_renderer import line_panel, render_job, render_many
+from Mean_Reversion.Mean_reversion_engine import vectorized_mean_reversion
+from Mean_Reversion.Mean_reversion_streaming import MeanReversionState
+from Training_Bot_Beginner.Stochastic_Process_Practice.stochastic_computation import ou_half_life, ou_lookback
 
 
 class Mean_Reversion:
-    def data_local_retrieve(self, file_name: str) -> pd.DataFrame:
-        csv_path = Path(__file__).resolve().parent.parent / "csv_dataset" / file_name
-        
-        if not csv_path.exists():
-            raise FileNotFoundError(f"Input path not found: {file_name}")
-
-        dataframe_csv = pd.read_csv(csv_path)
-        dataframe_csv.columns = dataframe_csv.columns.str.strip()
-        display(dataframe_csv)
+    def data_local_retrieve(self, file_name: str, columns: List[str] = None,
+                            start=None, end=None) -> pd.DataFrame:
+        # Shared loader: parsed once into the columnar cache, LRU-cached in process
+        dataframe_csv = self.loader.load(file_name, columns, start, end).reset_index()
+        self.loader.show(dataframe_csv, headless=self.headless)
         return dataframe_csv
 
-    def __init__(self, file_name):
-        self.csv_dataset = self.data_local_retrieve(file_name)
+    def __init__(self, file_name: str = None, headless: bool = False,
+                 columns: List[str] = None, start=None, end=None):
+        # file_name=None builds a bare strategy object (e.g. for benchmarks)
+        # headless=True disables every display/print side effect (plots only when saved)
+        self.loader = get_loader()
+        self.headless = headless
+        self.file_name = file_name
+        self.csv_dataset = self.data_local_retrieve(file_name, columns, start, end) if file_name else None
+
+    def _echo(self, *args):
+        self.loader.echo(*args, headless=self.headless)
 
     @staticmethod
-    def data_yfinance_retrieve():
-        pass
+    def data_yfinance_retrieve(symbols: List[str], start, end=None, interval: str = "1d",
+                               store: MarketDataStore = None) -> Dict[str, pd.DataFrame]:
+        """
+        Bars from the local market data store, downloading only the missing
+        [start, end) ranges from Yahoo Finance first (batched, pooled).
+
+        Returns:
+            {symbol: DataFrame} in the csv_dataset schema (Date index, Open /
+            High / Low / Close / Volume).
+        """
+        store = store if store is not None else MarketDataStore()
+        return store.fetch(symbols, start, end, interval)
 
     def Basic_Mean_Reversion_(self, prices: List[float],
                               init_value = 100, 
@@ -98,12 +125,114 @@ class Mean_Reversion:
         total_profit = sum(profits)
         return profits, total_profit, capital_curve
 
+    def Vectorized_Mean_Reversion_(self, prices: List[float],
+                                   init_value = 100,
+                                   buy_threshold: float = 1,
+                                   sell_threshold: float = 1,
+                                   trading_cost: float = 0.0,
+                                   window: int = None,
+                                   halflife: float = None,
+                                   cost_model=None,
+                                   z_scores: np.ndarray = None
+                                  ) -> Tuple[np.ndarray, float, np.ndarray]:
+        """
+        NumPy-array engine for the same strategy as Basic_Mean_Reversion_.
 
-    def run_and_plot_strategy(self, price_column: str, save_plot: bool = False, plot_file: str = "mean_reversion_plot.png"):
-            """Run the mean-reversion strategy and plot profits."""
-            prices = self.csv_dataset[price_column].values.tolist()
+        Expanding mean/std, Z-scores, positions, turnover cost, profits and the
+        capital curve are computed with cumulative sums over whole arrays
+        instead of a per-bar Python loop. `window` (N bars) or `halflife`
+        (H bars) replace the expanding Z-score with a rolling or EWMA one.
+        `cost_model` (e.g. Simulated_slippage.SlippageModel) replaces the flat
+        trading_cost with per-bar execution costs and partial fills.
+        `z_scores` (e.g. from the feature store) skips the Z-score computation.
 
-            profits, total_profit, capital_curve = self.Basic_Mean_Reversion_(prices)
+        Returns:
+            profits: Array of profit/loss per time step.
+            total_profit: Sum of profits.
+            capital_curve: Array of cumulative capital over time.
+        """
+        return vectorized_mean_reversion(prices, init_value, buy_threshold,
+                                         sell_threshold, trading_cost, window, halflife, cost_model, z_scores)
+
+    def stored_zscores(self, price_column: str, feature_store: FeatureStore, window: int = None) -> np.ndarray:
+        """
+        Expanding (or rolling `window`) Z-scores of the loaded rows from the feature store.
+
+        The store computes them once over the file's full history and only
+        extends them when bars are appended, so with start / end filters the
+        first rows see the history before `start` too.
+        """
+        if self.file_name is None:
+            raise ValueError("stored_zscores needs a strategy built from a file_name")
+        params = {"column": price_column} if window is None else {"column": price_column, "window": window}
+        name = "expanding_zscore" if window is None else "rolling_zscore"
+        z_scores = feature_store.aligned(self.file_name, name, self.csv_dataset["Date"], **params)
+        if np.isnan(z_scores).any():
+            raise ValueError(f"{self.file_name} has rows the feature store source does not know")
+        return z_scores
+
+
+    def ou_lookback(self, price_column: str, multiple: float = 1.0) -> Optional[int]:
+        """
+        multiple x the OU half-life of the loaded prices, in bars (None if they
+        do not mean-revert). Fitted on all loaded rows, i.e. in-sample: load a
+        training range (start / end) first for an out-of-sample backtest.
+        """
+        return ou_lookback(self.csv_dataset[price_column].to_numpy(dtype=np.float64), multiple)
+
+    def _resolve_lookback(self, prices: np.ndarray, window, halflife) -> Tuple[Optional[int], Optional[float]]:
+        """Replace window="ou" / halflife="ou" by the fitted OU half-life (expanding if none)."""
+        if window == "ou":
+            window = ou_lookback(prices)
+            self._echo(f"OU half-life lookback: window = {window}")
+        if halflife == "ou":
+            halflife = ou_half_life(prices)
+            halflife = halflife if np.isfinite(halflife) else None
+            self._echo(f"OU half-life lookback: halflife = {halflife}")
+        return window, halflife
+
+    def warm_start_state(self, price_column: str,
+                         buy_threshold: float = 1,
+                         sell_threshold: float = 1,
+                         trading_cost: float = 0.0,
+                         window: Union[int, str] = None,
+                         halflife: Union[float, str] = None) -> MeanReversionState:
+        """
+        Replay the loaded history once and return a streaming state.
+
+        New bars are then fed with state.on_bar(price) in O(1) instead of
+        calling run_and_plot_strategy on the whole history again.
+        """
+        prices = self.csv_dataset[price_column].to_numpy(dtype=np.float64)
+        window, halflife = self._resolve_lookback(prices, window, halflife)
+        state = MeanReversionState(buy_threshold, sell_threshold, trading_cost, window, halflife)
+        state.replay(prices)
+        return state
+
+    def run_and_plot_strategy(self, price_column: str, save_plot: bool = False, plot_file: str = "mean_reversion_plot.png",
+                              vectorized: bool = True, window: Union[int, str] = None, halflife: Union[float, str] = None,
+                              cost_model=None, feature_store: FeatureStore = None):
+            """Run the mean-reversion strategy and plot profits.
+
+            window / halflife select the rolling or EWMA Z-score (default: expanding);
+            "ou" uses the fitted OU half-life of the prices (see ou_lookback).
+            cost_model adds volume-aware execution costs (see Simulated_slippage).
+            feature_store serves expanding / rolling Z-scores from the incremental
+            store instead of recomputing them (see stored_zscores).
+            """
+            if vectorized:
+                prices = self.csv_dataset[price_column].to_numpy(dtype=np.float64)
+                window, halflife = self._resolve_lookback(prices, window, halflife)
+                z_scores = None
+                if feature_store is not None and halflife is None:
+                    z_scores = self.stored_zscores(price_column, feature_store, window)
+                profits, total_profit, capital_curve = self.Vectorized_Mean_Reversion_(
+                    prices, window=window, halflife=halflife, cost_model=cost_model, z_scores=z_scores)
+            elif window is not None or halflife is not None or cost_model is not None or feature_store is not None:
+                raise ValueError("window/halflife/cost_model/feature_store modes require vectorized=True")
+            else:
+                prices = self.csv_dataset[price_column].values.tolist()
+                profits, total_profit, capital_curve = self.Basic_Mean_Reversion_(prices)
 
             # Add results to DataFrame
             self.csv_dataset["MeanRev_Profit"] = profits
@@ -111,34 +240,41 @@ class Mean_Reversion:
             self.csv_dataset["Capital"] = capital_curve[:-1]
 
             # Print first 20 rows
-            print("\n=== Strategy Profits (first 20 rows) ===")
-            print(self.csv_dataset[["MeanRev_Profit", "CumProfit", "Capital"]].head(20))
-            print("Total profit:", total_profit)
-
-            # Plotting
-            fig, axes = plt.subplots(3, 1, figsize=(12, 8), sharex=True)
-
-            axes[0].plot(self.csv_dataset[price_column], color="blue")
-            axes[0].set_title(f"{price_column} Price")
+            self._echo("\n=== Strategy Profits (first 20 rows) ===")
+            self._echo(self.csv_dataset[["MeanRev_Profit", "CumProfit", "Capital"]].head(20))
+            self._echo("Total profit:", total_profit)
 
-            axes[1].plot(self.csv_dataset["MeanRev_Profit"], color="orange")
-            axes[1].set_title("Mean Reversion Profit per Step")
+            # Plotting: batch renderer (non-interactive, downsampled, skipped if unchanged)
+            if not save_plot and self.headless:
+                return
+            if not save_plot:
+                plot_file = str(Path(tempfile.gettempdir()) / plot_file)
 
-            axes[2].plot(self.csv_dataset["CumProfit"], color="green")
-            axes[2].set_title("Cumulative Profit")
-
-            plt.tight_layout()
+            panels = [
+                line_panel(self.csv_dataset[price_column].to_numpy(), title=f"{price_column} Price", color="blue"),
+                line_panel(self.csv_dataset["MeanRev_Profit"].to_numpy(), title="Mean Reversion Profit per Step", color="orange"),
+                line_panel(self.csv_dataset["CumProfit"].to_numpy(), title="Cumulative Profit", color="green"),
+            ]
+            render_many([render_job(plot_file, panels, figsize=(12, 8), dpi=300)])
             if save_plot:
-                plt.savefig(plot_file, dpi=300)
-                print(f"Plot saved as {plot_file}")
-            plt.show()
-            plt.close()
-
+                self._echo(f"Plot saved as {plot_file}")
+            if not self.headless:
+                from IPython.display import Image
+                self.loader.show(Image(filename=plot_file))
 
 if __name__ == "__main__":
+    from Mean_Reversion.Mean_reversion_panel import load_panel, panel_backtest, plot_panel
+
     FILE_NAME = "TSLA.csv"
     PRICE_COLUMN = "High"
+    FILE_NAMES = ["AMD.csv", "GOOG.csv", "TSLA.csv", "oil.csv"]
+    PLOT = False
+
+    # Panel mode: every symbol in one vectorized pass, plotting optional
+    panel = load_panel(FILE_NAMES, PRICE_COLUMN, missing="ffill")
+    result = panel_backtest(panel)
+    print(result["summary"])
+    print("Portfolio final capital:", result["portfolio"]["capital"].iloc[-1])
 
-    for i in ["AMD.csv", "GOOG.csv", "TSLA.csv", "oil.csv"]:
-        bot = Mean_Reversion(i)
-        bot.run_and_plot_strategy(PRICE_COLUMN)
\ No newline at end of file
+    if PLOT:
+        plot_panel(result, show=True)
\ No newline at end of file
@@ -0,0 +1,287 @@
+"""
+Streaming (bar-by-bar) mode of the Z-score mean-reversion strategy.
+
+MeanReversionState keeps only the running accumulators of the batch engine,
+so each on_bar(price) call costs O(1) time and memory and never touches the
+price history. The state is a flat set of floats and can be snapshotted to
+JSON and restored after a restart.
+"""
+
+import sys
+import json
+import math
+import numpy as np
+from pathlib import Path
+from typing import Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Mean_Reversion.Mean_reversion_engine import FLAT_STD_TOLERANCE, ewm_alpha
+
+
+class RollingZScore:
+    """
+    Per-bar Z-score over the trailing `window` bars (batch: rolling_zscore).
+
+    Keeps a fixed ring buffer of the last `window` prices plus Welford mean/M2
+    accumulators; a full window is updated by adding the new price and removing
+    the oldest in one step. Every time the ring wraps the accumulators are
+    re-derived from the buffer (amortized O(1)), so rounding cannot drift over
+    long series.
+    """
+
+    __slots__ = ("window", "buffer", "head", "count", "mean", "m2")
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.window = int(window)
+        self.buffer = [0.0] * self.window
+        self.head = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, price: float) -> float:
+        if self.count < self.window:
+            self.count += 1
+            delta = price - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (price - self.mean)
+        else:
+            oldest = self.buffer[self.head]
+            old_mean = self.mean
+            self.mean += (price - oldest) / self.window
+            self.m2 += (price - oldest) * (price - self.mean + oldest - old_mean)
+            if self.m2 < 0.0:
+                self.m2 = 0.0
+
+        self.buffer[self.head] = price
+        self.head = (self.head + 1) % self.window
+        if self.head == 0 and self.count == self.window:
+            self.mean = math.fsum(self.buffer) / self.window
+            self.m2 = math.fsum((value - self.mean) ** 2 for value in self.buffer)
+
+        std = math.sqrt(self.m2 / self.count)
+        if std <= FLAT_STD_TOLERANCE * abs(self.mean):
+            return 0.0
+        return (price - self.mean) / std
+
+    def to_dict(self) -> dict:
+        return {"window": self.window, "buffer": list(self.buffer), "head": self.head,
+                "count": self.count, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, snapshot: dict) -> "RollingZScore":
+        estimator = cls(snapshot["window"])
+        estimator.buffer = [float(value) for value in snapshot["buffer"]]
+        estimator.head = snapshot["head"]
+        estimator.count = snapshot["count"]
+        estimator.mean = snapshot["mean"]
+        estimator.m2 = snapshot["m2"]
+        return estimator
+
+
+class EwmZScore:
+    """
+    Per-bar Z-score against an exponentially weighted mean/variance with
+    half-life `halflife` bars (batch: ewm_zscore, same recursion).
+    """
+
+    __slots__ = ("halflife", "alpha", "count", "mean", "variance")
+
+    def __init__(self, halflife: float):
+        self.halflife = float(halflife)
+        self.alpha = ewm_alpha(self.halflife)
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+
+    def update(self, price: float) -> float:
+        self.count += 1
+        if self.count == 1:
+            self.mean = price
+            return 0.0
+
+        decay = 1.0 - self.alpha
+        deviation = price - self.mean
+        self.mean = self.alpha * price + decay * self.mean
+        self.variance = decay * self.alpha * deviation * deviation + decay * self.variance
+
+        std = math.sqrt(self.variance)
+        if std <= FLAT_STD_TOLERANCE * abs(self.mean):
+            return 0.0
+        return (price - self.mean) / std
+
+    def to_dict(self) -> dict:
+        return {"halflife": self.halflife, "count": self.count, "mean": self.mean, "variance": self.variance}
+
+    @classmethod
+    def from_dict(cls, snapshot: dict) -> "EwmZScore":
+        estimator = cls(snapshot["halflife"])
+        estimator.count = snapshot["count"]
+        estimator.mean = snapshot["mean"]
+        estimator.variance = snapshot["variance"]
+        return estimator
+
+
+class MeanReversionState:
+    """
+    Incremental state of Mean_Reversion.Basic_Mean_Reversion_.
+
+    Accumulators follow the batch engine exactly: the running sum gives the
+    expanding mean, and cumulative_sq_diff adds (P_t - mean_t)^2 in a single
+    Welford-style pass, so replaying a series through on_bar reproduces the
+    batch profits and capital curve.
+
+    Passing `window` or `halflife` swaps the expanding Z-score for a
+    RollingZScore or EwmZScore estimator.
+    """
+
+    __slots__ = ("buy_threshold", "sell_threshold", "trading_cost",
+                 "count", "cumulative_sum", "cumulative_sq_diff",
+                 "position_prev", "price_prev", "capital", "estimator")
+
+    def __init__(self, buy_threshold: float = 1, sell_threshold: float = 1, trading_cost: float = 0.0,
+                 window: int = None, halflife: float = None):
+        if window is not None and halflife is not None:
+            raise ValueError("Choose either window or halflife, not both")
+        self.buy_threshold = float(buy_threshold)
+        self.sell_threshold = float(sell_threshold)
+        self.trading_cost = float(trading_cost)
+        if window is not None:
+            self.estimator = RollingZScore(window)
+        elif halflife is not None:
+            self.estimator = EwmZScore(halflife)
+        else:
+            self.estimator = None
+
+        self.count = 0
+        self.cumulative_sum = 0.0
+        self.cumulative_sq_diff = 0.0
+        self.position_prev = 0
+        self.price_prev = 0.0
+        self.capital = 1.0
+
+    def on_bar(self, price: float) -> Tuple[int, float, float]:
+        """
+        Consume one new bar.
+
+        Args:
+            price: Latest price P_t.
+
+        Returns:
+            signal: New position (1 = Buy, -1 = Sell, 0 = Hold).
+            profit: Profit/loss of this step.
+            capital: Updated capital (starts at 1.0).
+        """
+        price = float(price)
+        self.count += 1
+
+        if self.estimator is not None:
+            z_t = self.estimator.update(price)
+        else:
+            self.cumulative_sum += price
+            mean_t = self.cumulative_sum / self.count
+
+            if self.count == 1:
+                std_t = 0.0
+            else:
+                self.cumulative_sq_diff += (price - mean_t) ** 2
+                std_t = math.sqrt(self.cumulative_sq_diff / self.count)
+
+            z_t = 0.0 if std_t == 0 else (price - mean_t) / std_t
+
+        if z_t < -self.buy_threshold:
+            position = 1
+        elif z_t > self.sell_threshold:
+            position = -1
+        else:
+            position = 0
+
+        if self.count == 1:
+            profit = 0.0
+        else:
+            profit = (self.position_prev * (price - self.price_prev)
+                      - self.trading_cost * abs(self.position_prev - position))
+            self.capital *= 1 + profit / self.price_prev
+
+        self.position_prev = position
+        self.price_prev = price
+        return position, profit, self.capital
+
+    def replay(self, prices) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Feed a whole series through on_bar.
+
+        Returns:
+            signals, profits, capital: One entry per bar.
+        """
+        n = len(prices)
+        signals = np.empty(n, dtype=np.int8)
+        profits = np.empty(n)
+        capital = np.empty(n)
+        for t in range(n):
+            signals[t], profits[t], capital[t] = self.on_bar(prices[t])
+        return signals, profits, capital
+
+    # === Snapshot / restore ===
+    def to_dict(self) -> dict:
+        snapshot = {name: getattr(self, name) for name in self.__slots__ if name != "estimator"}
+        snapshot["estimator"] = None if self.estimator is None else {
+            "type": type(self.estimator).__name__, **self.estimator.to_dict()}
+        return snapshot
+
+    @classmethod
+    def from_dict(cls, snapshot: dict) -> "MeanReversionState":
+        state = cls.__new__(cls)
+        for name in cls.__slots__:
+            if name != "estimator":
+                setattr(state, name, snapshot[name])
+
+        estimator = snapshot.get("estimator")
+        if estimator is None:
+            state.estimator = None
+        else:
+            estimator_cls = {"RollingZScore": RollingZScore, "EwmZScore": EwmZScore}[estimator["type"]]
+            state.estimator = estimator_cls.from_dict(estimator)
+        return state
+
+    def save(self, path) -> None:
+        """Write the state to a JSON snapshot (floats round-trip exactly)."""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path) -> "MeanReversionState":
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+    def __repr__(self) -> str:
+        return (f"MeanReversionState(count={self.count}, position={self.position_prev}, "
+                f"price={self.price_prev}, capital={self.capital})")
+
+
+if __name__ == "__main__":
+    import tempfile
+    from Mean_Reversion.Mean_reversion_engine import vectorized_mean_reversion
+    from Mean_Reversion.Mean_reversion_benchmark import synthetic_prices
+
+    prices = synthetic_prices(10_000)
+    half = len(prices) // 2
+
+    # Run the first half, snapshot, restore in a "new process", finish the series
+    state = MeanReversionState(trading_cost=0.01)
+    _, profits_a, capital_a = state.replay(prices[:half])
+
+    snapshot_path = Path(tempfile.gettempdir()) / "mean_reversion_state.json"
+    state.save(snapshot_path)
+    restored = MeanReversionState.load(snapshot_path)
+    _, profits_b, capital_b = restored.replay(prices[half:])
+
+    batch_profits, _, batch_capital = vectorized_mean_reversion(prices, trading_cost=0.01)
+    print(restored)
+    print("max |profit diff|:", np.max(np.abs(np.concatenate([profits_a, profits_b]) - batch_profits)))
+    print("max |capital diff|:", np.max(np.abs(np.concatenate([capital_a, capital_b]) - batch_capital[1:])))
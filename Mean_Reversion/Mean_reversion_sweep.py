@@ -0,0 +1,183 @@
+"""
+Batched parameter-grid sweep for the Z-score mean-reversion strategy.
+
+The Z-score series is computed once per price series. Every (buy_threshold,
+sell_threshold, trading_cost) combination then becomes one row of a
+(params x time) array, and a whole chunk of rows is evaluated in a single
+broadcasted pass. Chunks are sized from a memory budget so thousands of
+combinations over long histories never materialize at once.
+"""
+
+import sys
+import itertools
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Sequence
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Data_Loader.dataset_loader import load_dataset
+from Mean_Reversion.Mean_reversion_engine import (
+    zscore_series,
+    positions_to_profits,
+    profits_to_capital,
+    position_turnover,
+)
+
+SWEEP_COLUMNS = ["buy_threshold", "sell_threshold", "trading_cost",
+                 "total_profit", "final_capital", "turnover", "max_drawdown"]
+
+# Number of (params x time) float64 temporaries alive at once inside a chunk
+_ARRAYS_PER_ROW = 6
+
+
+def parameter_grid(buy_thresholds: Sequence[float],
+                   sell_thresholds: Sequence[float],
+                   trading_costs: Sequence[float]) -> np.ndarray:
+    """
+    Cartesian product of the three grids as a (n_params, 3) array.
+    """
+    return np.array(list(itertools.product(buy_thresholds, sell_thresholds, trading_costs)),
+                    dtype=np.float64).reshape(-1, 3)
+
+
+def chunk_rows(n_bars: int, max_memory_mb: float = 256) -> int:
+    """
+    Number of parameter rows per chunk that fits in max_memory_mb.
+    """
+    bytes_per_row = max(n_bars, 1) * 8 * _ARRAYS_PER_ROW
+    return max(1, int(max_memory_mb * 1024 ** 2 // bytes_per_row))
+
+
+def _evaluate_chunk(prices: np.ndarray, z_scores: np.ndarray, params: np.ndarray) -> np.ndarray:
+    """
+    Evaluate one chunk of parameter rows over the whole series.
+
+    Args:
+        prices: (T,) prices.
+        z_scores: (T,) precomputed Z-scores.
+        params: (K, 3) rows of buy_threshold, sell_threshold, trading_cost.
+
+    Returns:
+        (K, 4) array of total_profit, final_capital, turnover, max_drawdown.
+    """
+    buy = params[:, 0:1]
+    sell = params[:, 1:2]
+    cost = params[:, 2:3]
+
+    # Same precedence as the loop engine: the buy test wins over the sell test
+    positions = np.where(z_scores < -buy, 1.0, np.where(z_scores > sell, -1.0, 0.0))
+    turnover = position_turnover(positions)
+    profits = positions_to_profits(prices, positions, costs=cost * turnover)
+    growth = profits_to_capital(prices, profits, init_value=1.0)[:, 1:]
+
+    running_peak = np.maximum.accumulate(growth, axis=1)
+    drawdown = 1 - growth / running_peak
+
+    return np.column_stack([
+        profits.sum(axis=1),
+        growth[:, -1],
+        turnover.sum(axis=1),
+        drawdown.max(axis=1),
+    ])
+
+
+def sweep_mean_reversion(prices: Sequence[float],
+                         buy_thresholds: Sequence[float],
+                         sell_thresholds: Sequence[float],
+                         trading_costs: Sequence[float] = (0.0,),
+                         max_memory_mb: float = 256,
+                         window: int = None,
+                         halflife: float = None) -> pd.DataFrame:
+    """
+    Evaluate every threshold/cost combination of the mean-reversion strategy.
+
+    Args:
+        prices: Historical prices.
+        buy_thresholds: Grid of Z-score buy thresholds.
+        sell_thresholds: Grid of Z-score sell thresholds.
+        trading_costs: Grid of fractional costs per trade.
+        max_memory_mb: Memory budget of one (params x time) chunk.
+        window: Rolling Z-score lookback in bars (None = expanding).
+        halflife: EWMA Z-score half-life in bars (None = expanding).
+
+    Returns:
+        DataFrame with one row per combination: the parameters plus
+        total_profit, final_capital (capital curve starts at 1.0),
+        turnover (sum of |a_t - a_{t-1}|) and max_drawdown (fraction of peak).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    params = parameter_grid(buy_thresholds, sell_thresholds, trading_costs)
+    results = np.empty((params.shape[0], 4))
+
+    if prices.shape[0] > 0:
+        z_scores = zscore_series(prices, window, halflife)
+        step = chunk_rows(prices.shape[0], max_memory_mb)
+        for start in range(0, params.shape[0], step):
+            results[start:start + step] = _evaluate_chunk(prices, z_scores, params[start:start + step])
+    else:
+        results[:] = [0.0, 1.0, 0.0, 0.0]
+
+    return pd.DataFrame(np.hstack([params, results]), columns=SWEEP_COLUMNS)
+
+
+def load_price_column(file_name: str, price_column: str) -> np.ndarray:
+    """Read one price column of a csv_dataset file as float64."""
+    return load_dataset(file_name, columns=[price_column])[price_column].to_numpy(dtype=np.float64)
+
+
+def _sweep_file(file_name: str, price_column: str, buy_thresholds, sell_thresholds,
+                trading_costs, max_memory_mb: float, window: int, halflife: float) -> pd.DataFrame:
+    prices = load_price_column(file_name, price_column)
+    table = sweep_mean_reversion(prices, buy_thresholds, sell_thresholds, trading_costs,
+                                 max_memory_mb, window, halflife)
+    table.insert(0, "file", file_name)
+    return table
+
+
+def sweep_csv_dataset(buy_thresholds: Sequence[float],
+                      sell_thresholds: Sequence[float],
+                      trading_costs: Sequence[float] = (0.0,),
+                      price_column: str = "High",
+                      file_names: List[str] = None,
+                      processes: int = None,
+                      max_memory_mb: float = 256,
+                      window: int = None,
+                      halflife: float = None) -> pd.DataFrame:
+    """
+    Run the sweep over every file in csv_dataset/.
+
+    Args:
+        price_column: Column used as the price series in each file.
+        file_names: Files to sweep, defaults to every *.csv in csv_dataset/.
+        processes: Worker processes; None or 1 runs in this process.
+        max_memory_mb: Memory budget per chunk (per worker).
+        window, halflife: Z-score mode, as in sweep_mean_reversion.
+
+    Returns:
+        Concatenated sweep tables with a leading "file" column.
+    """
+    if file_names is None:
+        file_names = sorted(path.name for path in (ROOT_DIR / "csv_dataset").glob("*.csv"))
+
+    args = [(name, price_column, buy_thresholds, sell_thresholds, trading_costs, max_memory_mb,
+             window, halflife) for name in file_names]
+
+    if processes is None or processes <= 1:
+        tables = [_sweep_file(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            tables = list(pool.map(_sweep_file, *zip(*args)))
+
+    return pd.concat(tables, ignore_index=True)
+
+
+if __name__ == "__main__":
+    grid = np.round(np.arange(0.25, 3.01, 0.25), 2)
+    table = sweep_csv_dataset(grid, grid, [0.0, 0.01, 0.05], price_column="High", processes=2)
+
+    print(table.sort_values("total_profit", ascending=False).groupby("file").head(3))
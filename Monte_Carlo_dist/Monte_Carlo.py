@@ -0,0 +1,354 @@
+"""
+Chunked Monte Carlo price-path engine.
+
+- Models: GBM and Merton jump-diffusion, both calibrated from the historical
+  log returns of a csv_dataset series.
+- Paths are produced as (paths x steps) blocks sized from a memory budget,
+  one block at a time, never all at once.
+- Variance reduction: antithetic normals and scrambled Sobol' quasi-random
+  normals (scipy.stats.qmc), which can be combined.
+- Blocks run across a process pool. Block i always draws from the i-th child
+  of one SeedSequence (and the i-th slice of one Sobol' sequence), so results
+  do not depend on the number of workers.
+- Only a StreamingDistribution of terminal log returns (fine histogram with
+  per-bin sums, mergeable across blocks) is kept, from which VaR, expected
+  shortfall and terminal quantiles are read.
+"""
+
+import sys
+import math
+import warnings
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, Sequence
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+TRADING_DAYS = 252
+
+
+# === Models ===
+class GBM:
+    """dlog S = (mu - sigma^2 / 2) dt + sigma dW"""
+
+    def __init__(self, mu: float, sigma: float):
+        self.mu = float(mu)
+        self.sigma = float(sigma)
+
+    @classmethod
+    def calibrate(cls, log_returns: np.ndarray, dt: float = 1 / TRADING_DAYS) -> "GBM":
+        log_returns = np.asarray(log_returns, dtype=np.float64)
+        sigma = log_returns.std(ddof=1) / math.sqrt(dt)
+        mu = log_returns.mean() / dt + 0.5 * sigma ** 2
+        return cls(mu, sigma)
+
+    def log_increments(self, normals: np.ndarray, rng: np.random.Generator, dt: float) -> np.ndarray:
+        increments = normals * (self.sigma * math.sqrt(dt))
+        increments += (self.mu - 0.5 * self.sigma ** 2) * dt
+        return increments
+
+    def log_return_moments(self, horizon: float):
+        """Mean and standard deviation of log(S_T / S_0)."""
+        return (self.mu - 0.5 * self.sigma ** 2) * horizon, self.sigma * math.sqrt(horizon)
+
+    def __repr__(self) -> str:
+        return f"GBM(mu={self.mu:.4f}, sigma={self.sigma:.4f})"
+
+
+class JumpDiffusion(GBM):
+    """
+    Merton jump-diffusion: GBM plus Poisson(lam) jumps with N(jump_mean, jump_std^2)
+    log sizes, drift-compensated so E[S_T] = S_0 exp(mu T).
+    """
+
+    def __init__(self, mu: float, sigma: float, lam: float, jump_mean: float, jump_std: float):
+        super().__init__(mu, sigma)
+        self.lam = float(lam)
+        self.jump_mean = float(jump_mean)
+        self.jump_std = float(jump_std)
+
+    @property
+    def compensator(self) -> float:
+        return math.exp(self.jump_mean + 0.5 * self.jump_std ** 2) - 1
+
+    @classmethod
+    def calibrate(cls, log_returns: np.ndarray, dt: float = 1 / TRADING_DAYS,
+                  threshold: float = 3.0) -> "JumpDiffusion":
+        """
+        Threshold calibration: returns further than `threshold` robust standard
+        deviations (MAD) from the median are jumps, the rest is diffusion.
+        """
+        log_returns = np.asarray(log_returns, dtype=np.float64)
+        median = np.median(log_returns)
+        robust_std = 1.4826 * np.median(np.abs(log_returns - median))
+        is_jump = np.abs(log_returns - median) > threshold * robust_std if robust_std > 0 else \
+            np.zeros(log_returns.shape[0], dtype=bool)
+
+        diffusion = log_returns[~is_jump]
+        jumps = log_returns[is_jump] - diffusion.mean()
+        sigma = diffusion.std(ddof=1) / math.sqrt(dt)
+        lam = is_jump.sum() / (log_returns.shape[0] * dt)
+        jump_mean = jumps.mean() if jumps.shape[0] else 0.0
+        jump_std = jumps.std(ddof=1) if jumps.shape[0] > 1 else 0.0
+
+        model = cls(0.0, sigma, lam, jump_mean, jump_std)
+        # Match the sample mean log return per bar
+        model.mu = (log_returns.mean() / dt + 0.5 * sigma ** 2
+                    + lam * model.compensator - lam * jump_mean)
+        return model
+
+    def log_increments(self, normals: np.ndarray, rng: np.random.Generator, dt: float) -> np.ndarray:
+        increments = normals * (self.sigma * math.sqrt(dt))
+        increments += (self.mu - 0.5 * self.sigma ** 2 - self.lam * self.compensator) * dt
+        if self.lam > 0:
+            n_jumps = rng.poisson(self.lam * dt, size=normals.shape)
+            jumped = n_jumps > 0
+            counts = n_jumps[jumped]
+            increments[jumped] += self.jump_mean * counts + self.jump_std * np.sqrt(counts) * \
+                rng.standard_normal(counts.shape[0])
+        return increments
+
+    def log_return_moments(self, horizon: float):
+        mean = (self.mu - 0.5 * self.sigma ** 2 - self.lam * self.compensator + self.lam * self.jump_mean) * horizon
+        variance = (self.sigma ** 2 + self.lam * (self.jump_mean ** 2 + self.jump_std ** 2)) * horizon
+        return mean, math.sqrt(variance)
+
+    def __repr__(self) -> str:
+        return (f"JumpDiffusion(mu={self.mu:.4f}, sigma={self.sigma:.4f}, lam={self.lam:.3f}, "
+                f"jump_mean={self.jump_mean:.4f}, jump_std={self.jump_std:.4f})")
+
+
+# === Streaming estimates ===
+class StreamingDistribution:
+    """
+    Mergeable summary of terminal log returns x = log(S_T / S_0).
+
+    Values fall into `n_bins` equal bins over [low, high]; each bin keeps its
+    count and the sum of simple returns exp(x) - 1 inside it, and values
+    outside the range go to two overflow bins. Quantiles are interpolated
+    inside a bin (error < bin width), tail means are exact up to the one bin
+    the quantile falls in.
+    """
+
+    def __init__(self, low: float, high: float, n_bins: int = 20_000):
+        self.low = float(low)
+        self.high = float(high)
+        self.n_bins = int(n_bins)
+        self.counts = np.zeros(n_bins + 2, dtype=np.int64)
+        self.return_sums = np.zeros(n_bins + 2)
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, log_returns: np.ndarray) -> None:
+        log_returns = np.asarray(log_returns, dtype=np.float64).ravel()
+        width = (self.high - self.low) / self.n_bins
+        bins = np.floor((log_returns - self.low) / width).astype(np.int64) + 1
+        np.clip(bins, 0, self.n_bins + 1, out=bins)
+
+        simple_returns = np.expm1(log_returns)
+        self.counts += np.bincount(bins, minlength=self.n_bins + 2)
+        self.return_sums += np.bincount(bins, weights=simple_returns, minlength=self.n_bins + 2)
+        self.minimum = min(self.minimum, log_returns.min())
+        self.maximum = max(self.maximum, log_returns.max())
+        self.total += simple_returns.sum()
+        self.total_sq += (simple_returns * simple_returns).sum()
+
+    def merge(self, other: "StreamingDistribution") -> "StreamingDistribution":
+        self.counts += other.counts
+        self.return_sums += other.return_sums
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.total += other.total
+        self.total_sq += other.total_sq
+        return self
+
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum())
+
+    def _edges(self) -> np.ndarray:
+        inner = np.linspace(self.low, self.high, self.n_bins + 1)
+        return np.concatenate([[min(self.minimum, self.low)], inner, [max(self.maximum, self.high)]])
+
+    def log_return_quantile(self, q: float) -> float:
+        edges = self._edges()
+        cumulative = np.cumsum(self.counts)
+        target = q * cumulative[-1]
+        b = int(np.searchsorted(cumulative, target, side="left"))
+        below = cumulative[b - 1] if b > 0 else 0
+        fraction = (target - below) / self.counts[b] if self.counts[b] else 0.0
+        return float(edges[b] + fraction * (edges[b + 1] - edges[b]))
+
+    def quantile(self, q: float) -> float:
+        """q-quantile of the simple terminal return S_T / S_0 - 1."""
+        return math.expm1(self.log_return_quantile(q))
+
+    def value_at_risk(self, level: float = 0.99) -> float:
+        """Loss (as a positive fraction of S_0) not exceeded with probability `level`."""
+        return -self.quantile(1 - level)
+
+    def expected_shortfall(self, level: float = 0.99) -> float:
+        """Mean loss in the worst (1 - level) fraction of paths."""
+        tail_count = (1 - level) * self.n
+        cumulative = np.cumsum(self.counts)
+        b = int(np.searchsorted(cumulative, tail_count, side="left"))
+        full_count = cumulative[b - 1] if b > 0 else 0
+        tail_sum = self.return_sums[:b].sum()
+        if self.counts[b]:
+            tail_sum += self.return_sums[b] / self.counts[b] * (tail_count - full_count)
+        return -tail_sum / tail_count if tail_count > 0 else 0.0
+
+    def mean(self) -> float:
+        return self.total / self.n
+
+    def std(self) -> float:
+        return math.sqrt(max(self.total_sq / self.n - self.mean() ** 2, 0.0))
+
+    def summary(self, levels: Sequence[float] = (0.95, 0.99),
+                quantiles: Sequence[float] = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)) -> Dict[str, float]:
+        result = {"paths": self.n, "mean_return": self.mean(), "std_return": self.std()}
+        for level in levels:
+            result[f"VaR_{level:g}"] = self.value_at_risk(level)
+            result[f"ES_{level:g}"] = self.expected_shortfall(level)
+        for q in quantiles:
+            result[f"q_{q:g}"] = self.quantile(q)
+        return result
+
+
+# === Engine ===
+class MonteCarloEngine:
+    def __init__(self, model: GBM, s0: float, n_steps: int = TRADING_DAYS, dt: float = 1 / TRADING_DAYS,
+                 antithetic: bool = False, sobol: bool = False, seed: int = 0, memory_mb: float = 64):
+        """
+        Args:
+            model: GBM or JumpDiffusion instance.
+            s0: Starting price.
+            n_steps: Steps per path.
+            dt: Step length in years.
+            antithetic: Pair every normal draw Z with -Z.
+            sobol: Draw the diffusion normals from a scrambled Sobol' sequence.
+            seed: Root of the SeedSequence (and the Sobol' scrambling).
+            memory_mb: Budget for one (paths x steps) block.
+        """
+        if sobol and n_steps > 21201:
+            raise ValueError("Sobol' sampling supports at most 21201 steps")
+        self.model = model
+        self.s0 = float(s0)
+        self.n_steps = int(n_steps)
+        self.dt = float(dt)
+        self.antithetic = antithetic
+        self.sobol = sobol
+        self.seed = seed
+        self.memory_mb = memory_mb
+
+    @property
+    def block_paths(self) -> int:
+        """Paths per block: about 3 float64 (paths x steps) arrays fit in memory_mb."""
+        paths = max(2, int(self.memory_mb * 1024 ** 2 // (self.n_steps * 8 * 3)))
+        if self.sobol:
+            paths = 1 << int(math.log2(paths))  # Sobol' balance needs powers of two
+        return paths - paths % 2
+
+    def _normals(self, block_index: int, n_draws: int, rng: np.random.Generator) -> np.ndarray:
+        if not self.sobol:
+            return rng.standard_normal((n_draws, self.n_steps))
+
+        from scipy.stats import norm, qmc
+        sampler = qmc.Sobol(d=self.n_steps, scramble=True, seed=self.seed)
+        skip = block_index * (self.block_paths // (2 if self.antithetic else 1))
+        if skip:
+            sampler.fast_forward(skip)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            uniforms = sampler.random(n_draws)
+        return norm.ppf(np.clip(uniforms, 1e-12, 1 - 1e-12))
+
+    def log_path_block(self, block_index: int, n_paths: int) -> np.ndarray:
+        """(n_paths x n_steps) cumulative log returns of block `block_index`."""
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(block_index,)))
+        n_draws = (n_paths + 1) // 2 if self.antithetic else n_paths
+        normals = self._normals(block_index, n_draws, rng)
+        if self.antithetic:
+            normals = np.concatenate([normals, -normals])[:n_paths]
+
+        increments = self.model.log_increments(normals, rng, self.dt)
+        return np.cumsum(increments, axis=1, out=increments)
+
+    def blocks(self, n_paths: int) -> Iterator[np.ndarray]:
+        """Yield (paths x steps + 1) price blocks, one memory budget at a time."""
+        step = self.block_paths
+        for block_index, start in enumerate(range(0, n_paths, step)):
+            log_paths = self.log_path_block(block_index, min(step, n_paths - start))
+            prices = np.empty((log_paths.shape[0], self.n_steps + 1))
+            prices[:, 0] = self.s0
+            np.exp(log_paths, out=prices[:, 1:])
+            prices[:, 1:] *= self.s0
+            yield prices
+
+    def new_distribution(self, n_bins: int = 20_000) -> StreamingDistribution:
+        mean, std = self.model.log_return_moments(self.n_steps * self.dt)
+        return StreamingDistribution(mean - 12 * std, mean + 12 * std, n_bins)
+
+    def _block_distribution(self, block_index: int, n_paths: int) -> StreamingDistribution:
+        distribution = self.new_distribution()
+        distribution.update(self.log_path_block(block_index, n_paths)[:, -1])
+        return distribution
+
+    def run(self, n_paths: int, processes: int = None) -> StreamingDistribution:
+        """
+        Simulate n_paths paths block by block and return the merged terminal
+        distribution (only one block per worker is ever in memory).
+        """
+        step = self.block_paths
+        jobs = [(block_index, min(step, n_paths - start))
+                for block_index, start in enumerate(range(0, n_paths, step))]
+        distribution = self.new_distribution()
+
+        if processes is None or processes <= 1:
+            for block_index, size in jobs:
+                distribution.merge(self._block_distribution(block_index, size))
+            return distribution
+
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(self._block_distribution, block_index, size) for block_index, size in jobs]
+            for future in as_completed(futures):
+                distribution.merge(future.result())
+        return distribution
+
+
+def calibrate_from_dataset(file_name: str, price_column: str = "Close", model: str = "gbm",
+                           dt: float = 1 / TRADING_DAYS):
+    """
+    Calibrate a model on a csv_dataset file.
+
+    Returns:
+        (model, last price) ready for MonteCarloEngine.
+    """
+    from Data_Loader.dataset_loader import load_dataset
+
+    prices = load_dataset(file_name, columns=[price_column])[price_column].to_numpy(dtype=np.float64)
+    log_returns = np.diff(np.log(prices))
+    model_cls = {"gbm": GBM, "jump": JumpDiffusion}[model]
+    return model_cls.calibrate(log_returns, dt), float(prices[-1])
+
+
+if __name__ == "__main__":
+    import time
+
+    for model_name in ("gbm", "jump"):
+        model, s0 = calibrate_from_dataset("TSLA.csv", "Close", model_name)
+        print(model, "S0 =", s0)
+        for antithetic, sobol in ((False, False), (True, False), (False, True)):
+            engine = MonteCarloEngine(model, s0, n_steps=252, antithetic=antithetic, sobol=sobol, seed=42)
+            start = time.perf_counter()
+            distribution = engine.run(1_000_000, processes=2)
+            elapsed = time.perf_counter() - start
+            summary = distribution.summary()
+            print(f"  antithetic={antithetic!s:5} sobol={sobol!s:5} {elapsed:6.2f}s  "
+                  f"mean={summary['mean_return']:+.4f}  VaR99={summary['VaR_0.99']:.4f}  "
+                  f"ES99={summary['ES_0.99']:.4f}  median={summary['q_0.5']:+.4f}")
@@ -0,0 +1,222 @@
+"""
+Headless batch renderer for line charts (Agent.visualization, run_and_plot_strategy).
+
+- Draws on matplotlib's Agg canvas directly (never pyplot), so nothing blocks
+  and no interactive backend is touched; worker processes force Agg as well.
+- Figures, axes and line artists are created once per layout and reused:
+  each render only swaps the line data, titles and limits.
+- Long series are downsampled before drawing, with min/max buckets (keeps the
+  exact per-pixel envelope) or LTTB (Largest-Triangle-Three-Buckets).
+- The hash of the input data + chart spec is stored in the PNG metadata; a
+  chart whose hash is unchanged is not re-rendered.
+- render_many spreads the jobs across a process pool.
+"""
+
+import hashlib
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+HASH_KEY = "Source Hash"
+DEFAULT_MAX_POINTS = 4000
+DOWNSAMPLE_METHODS = ("minmax", "lttb", None)
+
+
+# === Downsampling ===
+def minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indices of the min and max of each bucket (plus first and last point).
+
+    With about two points per horizontal pixel this draws the same envelope as
+    the raw series.
+    """
+    n = y.shape[0]
+    n_buckets = max(1, (max_points - 2) // 2)
+    if n <= max_points:
+        return np.arange(n)
+
+    bucket_size = -(-n // n_buckets)
+    padded = np.empty(n_buckets * bucket_size)
+    padded[:n] = y
+    padded[n:] = y[-1]
+    buckets = padded.reshape(n_buckets, bucket_size)
+
+    offsets = np.arange(n_buckets) * bucket_size
+    lows = np.nanargmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1) + offsets
+    highs = np.nanargmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1) + offsets
+
+    indices = np.concatenate([[0], np.minimum(lows, n - 1), np.minimum(highs, n - 1), [n - 1]])
+    return np.unique(indices)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets selection of max_points indices.
+
+    Keeps the point of each bucket forming the largest triangle with the point
+    kept in the previous bucket and the mean of the next bucket.
+    """
+    n = y.shape[0]
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < edges.shape[0]:
+            next_start, next_end = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.nanargmax(area)) if np.any(~np.isnan(area)) else start
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample(x: np.ndarray, y: np.ndarray, max_points: int = DEFAULT_MAX_POINTS,
+               method: str = "minmax") -> Tuple[np.ndarray, np.ndarray]:
+    """Reduce a series to about max_points points with a shape-preserving method."""
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"method must be one of {DOWNSAMPLE_METHODS}")
+    if method is None or y.shape[0] <= max_points:
+        return x, y
+    if method == "lttb":
+        x_numeric = x.view(np.int64) if x.dtype.kind == "M" else x
+        indices = lttb_indices(x_numeric.astype(np.float64), y, max_points)
+    else:
+        indices = minmax_indices(y, max_points)
+    return x[indices], y[indices]
+
+
+# === Render jobs ===
+def line_panel(y, title: str = "", xlabel: str = "", ylabel: str = "", color: str = None, x=None) -> dict:
+    """One axes of a chart: a single line plus its labels."""
+    return {"y": y, "x": x, "title": title, "xlabel": xlabel, "ylabel": ylabel, "color": color}
+
+
+def render_job(output_path, panels: List[dict], figsize=(10, 5), dpi: int = 300, sharex: bool = True,
+               max_points: int = DEFAULT_MAX_POINTS, method: str = "minmax", force: bool = False) -> dict:
+    """Bundle everything render_many needs for one output file."""
+    return {"output_path": str(output_path), "panels": panels, "figsize": tuple(figsize), "dpi": dpi,
+            "sharex": sharex, "max_points": max_points, "method": method, "force": force}
+
+
+def job_hash(job: dict) -> str:
+    """Hash of the chart inputs: every series plus the chart spec."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((job["figsize"], job["dpi"], job["sharex"], job["max_points"], job["method"])).encode())
+    for panel in job["panels"]:
+        digest.update(repr((panel["title"], panel["xlabel"], panel["ylabel"], panel["color"])).encode())
+        for key in ("x", "y"):
+            if panel[key] is not None:
+                values = np.ascontiguousarray(panel[key])
+                digest.update(str(values.dtype).encode())
+                digest.update(values.view(np.uint8) if values.dtype != object else repr(values).encode())
+    return digest.hexdigest()
+
+
+def stored_hash(output_path: Path) -> str:
+    """Hash saved in an existing PNG (None if missing)."""
+    if not output_path.exists():
+        return None
+    from PIL import Image
+    try:
+        with Image.open(output_path) as image:
+            return image.info.get(HASH_KEY)
+    except OSError:
+        return None
+
+
+class BatchRenderer:
+    """Renders line-chart jobs, reusing one figure per (rows, figsize, sharex) layout."""
+
+    def __init__(self):
+        self._figures: Dict[tuple, tuple] = {}
+        self.rendered = 0
+        self.skipped = 0
+
+    def _layout(self, n_rows: int, figsize: tuple, sharex: bool):
+        key = (n_rows, figsize, sharex)
+        if key not in self._figures:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+            fig = Figure(figsize=figsize)
+            FigureCanvasAgg(fig)
+            axes = fig.subplots(n_rows, 1, sharex=sharex, squeeze=False)[:, 0]
+            lines = [ax.plot([], [])[0] for ax in axes]
+            default_colors = [line.get_color() for line in lines]
+            self._figures[key] = (fig, axes, lines, default_colors)
+        return self._figures[key]
+
+    def render(self, job: dict) -> bool:
+        """
+        Render one job unless its output already holds the same input hash.
+
+        Returns:
+            True if the PNG was (re)written, False if skipped.
+        """
+        output_path = Path(job["output_path"])
+        digest = job_hash(job)
+        if not job["force"] and stored_hash(output_path) == digest:
+            self.skipped += 1
+            return False
+
+        fig, axes, lines, default_colors = self._layout(len(job["panels"]), job["figsize"], job["sharex"])
+        for ax, line, default_color, panel in zip(axes, lines, default_colors, job["panels"]):
+            y = np.asarray(panel["y"], dtype=np.float64)
+            x = np.arange(y.shape[0]) if panel["x"] is None else np.asarray(panel["x"])
+            x, y = downsample(x, y, job["max_points"], job["method"])
+
+            line.set_data(x, y)
+            line.set_color(panel["color"] or default_color)
+            ax.set_title(panel["title"])
+            ax.set_xlabel(panel["xlabel"])
+            ax.set_ylabel(panel["ylabel"])
+            ax.relim()
+            ax.autoscale_view()
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if len(job["panels"]) > 1:
+            fig.tight_layout()
+        fig.savefig(output_path, dpi=job["dpi"], bbox_inches="tight", metadata={HASH_KEY: digest})
+        self.rendered += 1
+        return True
+
+
+_WORKER_RENDERER = None
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+    global _WORKER_RENDERER
+    _WORKER_RENDERER = BatchRenderer()
+
+
+def _render_in_worker(job: dict) -> bool:
+    return _WORKER_RENDERER.render(job)
+
+
+def render_many(jobs: List[dict], processes: int = None) -> List[bool]:
+    """
+    Render jobs, optionally across a process pool (one reusable renderer per worker).
+
+    Returns:
+        For each job, True if rendered, False if skipped as unchanged.
+    """
+    if processes is None or processes <= 1 or len(jobs) <= 1:
+        renderer = BatchRenderer()
+        return [renderer.render(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+        return list(pool.map(_render_in_worker, jobs))
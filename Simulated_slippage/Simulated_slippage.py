@@ -0,0 +1,249 @@
+"""
+Volume-aware execution costs for the array backtests.
+
+Per bar t, with the dataset's High, Low and Volume columns:
+
+    half spread    s_t / 2, s_t the Corwin–Schultz high-low spread estimate
+                   (bars t-1 and t, so no look-ahead), averaged over `window`
+    volatility     sigma_t, Parkinson high-low volatility averaged over `window`
+    participation  q_t / V_t, q_t the traded shares
+    impact         eta * sigma_t * sqrt(q_t / V_t)   (square-root law)
+
+    cost_t = P_t * |dx_t| * (s_t / 2 + eta * sigma_t * sqrt(q_t / V_t))
+
+A trade is capped at max_participation * V_t shares per bar; the rest is
+filled on the next bars (partial fills), so the executed positions can lag
+the target positions.
+
+Everything that depends only on market data is precomputed once, and a call
+only touches the bars where the position changes, so plugging the model into
+vectorized_mean_reversion adds little to its runtime.
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+_CS_DENOMINATOR = 3 - 2 * np.sqrt(2)
+
+
+def corwin_schultz_spread(high: np.ndarray, low: np.ndarray) -> np.ndarray:
+    """
+    Corwin–Schultz (2012) relative bid-ask spread from two consecutive bars.
+
+    The estimate at t uses bars t-1 and t; negative estimates are set to 0 and
+    the first bar gets 0.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    spread = np.zeros(high.shape[0])
+    if high.shape[0] < 2:
+        return spread
+
+    log_range_sq = np.log(high / low) ** 2
+    beta = log_range_sq[1:] + log_range_sq[:-1]
+    gamma = np.log(np.maximum(high[1:], high[:-1]) / np.minimum(low[1:], low[:-1])) ** 2
+    alpha = (np.sqrt(2 * beta) - np.sqrt(beta)) / _CS_DENOMINATOR - np.sqrt(gamma / _CS_DENOMINATOR)
+    spread[1:] = np.maximum(2 * np.expm1(alpha) / (1 + np.exp(alpha)), 0.0)
+    return spread
+
+
+def parkinson_volatility(high: np.ndarray, low: np.ndarray) -> np.ndarray:
+    """Per-bar Parkinson volatility sqrt(ln(H/L)^2 / (4 ln 2))."""
+    log_range = np.log(np.asarray(high, dtype=np.float64) / np.asarray(low, dtype=np.float64))
+    return np.abs(log_range) / np.sqrt(4 * np.log(2))
+
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    return pd.Series(values).rolling(window, min_periods=1).mean().to_numpy()
+
+
+class SlippageModel:
+    def __init__(self, high: np.ndarray, low: np.ndarray, volume: np.ndarray,
+                 position_size: float = 1.0,
+                 impact_coef: float = 0.5,
+                 max_participation: float = 0.1,
+                 window: int = 20,
+                 min_half_spread: float = 0.0):
+        """
+        Args:
+            high, low, volume: Bar data aligned with the backtest prices.
+            position_size: Shares per unit of strategy position (a position of
+                1 holds position_size shares).
+            impact_coef: eta of the square-root impact law.
+            max_participation: Maximum traded share of a bar's volume.
+            window: Bars averaged by the spread and volatility estimates.
+            min_half_spread: Floor on the half spread (fraction of price).
+        """
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        volume = np.asarray(volume, dtype=np.float64)
+        if not high.shape == low.shape == volume.shape:
+            raise ValueError("high, low and volume must have the same length")
+
+        self.position_size = float(position_size)
+        self.impact_coef = float(impact_coef)
+        self.max_participation = float(max_participation)
+
+        self.half_spread = np.maximum(0.5 * _rolling_mean(corwin_schultz_spread(high, low), window),
+                                      min_half_spread)
+        self.volatility = _rolling_mean(parkinson_volatility(high, low), window)
+
+        self.volume = volume
+
+        # Position units tradable per bar, and eta * sigma * sqrt(shares per unit / V);
+        # nothing trades on a zero-volume bar, so its impact scale is never used
+        self.capacity = self.max_participation * volume / self.position_size
+        with np.errstate(divide="ignore"):
+            self.impact_scale = self.impact_coef * self.volatility * np.sqrt(self.position_size / volume)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, **params) -> "SlippageModel":
+        """Model on a canonical dataset frame (High, Low, Volume columns)."""
+        return cls(frame["High"].to_numpy(), frame["Low"].to_numpy(), frame["Volume"].to_numpy(), **params)
+
+    @classmethod
+    def from_dataset(cls, file_name: str, start=None, end=None, **params) -> "SlippageModel":
+        from Data_Loader.dataset_loader import load_dataset
+        return cls.from_frame(load_dataset(file_name, ["High", "Low", "Volume"], start, end), **params)
+
+    def __len__(self) -> int:
+        return self.capacity.shape[0]
+
+    @staticmethod
+    def _trade_bars(positions: np.ndarray) -> np.ndarray:
+        """Bars whose position differs from the previous bar's."""
+        return np.flatnonzero(positions[1:] != positions[:-1]) + 1
+
+    def _execute(self, target: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(executed positions, their trade bars); the cap is only checked on target trade bars."""
+        if target.shape[0] != len(self):
+            raise ValueError(f"{target.shape[0]} positions for {len(self)} bars of market data")
+
+        trades = self._trade_bars(target)
+        change = np.abs(target[trades] - target[trades - 1])
+        binding = trades[change > self.capacity[trades]]
+        if binding.shape[0] == 0:
+            return target, trades
+
+        executed = target.copy()
+        n_bars, t = target.shape[0], int(binding[0])
+        while True:
+            held = executed[t - 1]
+            while t < n_bars:
+                gap, capacity = target[t] - held, self.capacity[t]
+                if abs(gap) <= capacity:
+                    executed[t] = held = target[t]
+                    break
+                held += capacity if gap > 0 else -capacity
+                executed[t] = held
+                t += 1
+            # Caught up at t (or ran out of bars): next bar whose own change binds
+            following = np.searchsorted(binding, t, side="right")
+            if t >= n_bars or following == binding.shape[0]:
+                # Partial fills moved trades onto other bars
+                return executed, self._trade_bars(executed)
+            t = int(binding[following])
+
+    def execute(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Executed positions for target positions, each bar's change capped at
+        `capacity` units. Unfilled size carries over to the next bars; only the
+        stretches where the cap binds are walked bar by bar.
+        """
+        return self._execute(np.asarray(positions, dtype=np.float64))[0]
+
+    def _costs_at(self, prices: np.ndarray, executed: np.ndarray, trades: np.ndarray) -> np.ndarray:
+        costs = np.zeros(prices.shape[0])
+        size = np.abs(executed[trades] - executed[trades - 1])
+        costs[trades] = prices[trades] * size * (self.half_spread[trades]
+                                                  + self.impact_scale[trades] * np.sqrt(size))
+        return costs
+
+    def costs(self, prices: np.ndarray, executed: np.ndarray) -> np.ndarray:
+        """Per-bar cost (price units x position units) of an executed position series, 0 on the first bar."""
+        executed = np.asarray(executed, dtype=np.float64)
+        return self._costs_at(np.asarray(prices, dtype=np.float64), executed, self._trade_bars(executed))
+
+    def __call__(self, prices: np.ndarray, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cost-function hook of vectorized_mean_reversion.
+
+        Only the trade bars are touched after one pass that finds them.
+
+        Returns:
+            (executed positions, per-bar costs).
+        """
+        executed, trades = self._execute(np.asarray(positions, dtype=np.float64))
+        return executed, self._costs_at(np.asarray(prices, dtype=np.float64), executed, trades)
+
+    def breakdown(self, prices: np.ndarray, positions: np.ndarray) -> pd.DataFrame:
+        """Per-bar executed position, traded shares, participation, spread and impact cost."""
+        prices = np.asarray(prices, dtype=np.float64)
+        executed = self.execute(positions)
+        size = np.zeros_like(executed)
+        size[1:] = np.abs(np.diff(executed))
+        shares = size * self.position_size
+        with np.errstate(divide="ignore", invalid="ignore"):
+            participation = np.where(shares > 0, shares / self.volume, 0.0)
+        return pd.DataFrame({
+            "target": np.asarray(positions, dtype=np.float64),
+            "executed": executed,
+            "shares": shares,
+            "participation": participation,
+            "spread_cost": prices * size * self.half_spread,
+            "impact_cost": np.where(size > 0, prices * size * self.impact_scale * np.sqrt(size), 0.0),
+        })
+
+
+if __name__ == "__main__":
+    import time
+    from Mean_Reversion.Mean_reversion_engine import vectorized_mean_reversion, zscore_positions, zscore_series
+    from Data_Loader.dataset_loader import load_dataset
+
+    frame = load_dataset("TSLA.csv")
+    prices = frame["High"].to_numpy()
+    model = SlippageModel.from_frame(frame, position_size=500_000, max_participation=0.05)
+    for label, cost_model in (("no cost", None), ("slippage", model)):
+        profits, total, capital = vectorized_mean_reversion(prices, cost_model=cost_model)
+        print(f"TSLA {label:>9}: total profit {total:10.2f}")
+
+    # Cost breakdown of a position flipping every 10 bars
+    flips = np.where(np.arange(prices.shape[0]) // 10 % 2 == 0, 1.0, -1.0)
+    breakdown = model.breakdown(prices, flips)
+    print(f"partial-fill bars: {(breakdown['executed'] != breakdown['target']).sum()}, "
+          f"spread cost {breakdown['spread_cost'].sum():.2f}, impact cost {breakdown['impact_cost'].sum():.2f}, "
+          f"max participation {breakdown['participation'].max():.2%}")
+
+    # Runtime overhead on 1e6 synthetic bars
+    rng = np.random.default_rng(0)
+    n_bars = 1_000_000
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    spread = close * np.abs(rng.normal(0, 0.01, n_bars))
+    model = SlippageModel(close + spread, close - spread, rng.integers(1e5, 1e6, n_bars), position_size=10_000)
+
+    def interleaved_best(funcs, repeat=15):
+        # Alternate the runs so drift in machine load hits every variant alike
+        times = [[] for _ in funcs]
+        for _ in range(repeat):
+            for elapsed, func in zip(times, funcs):
+                start = time.perf_counter()
+                func()
+                elapsed.append(time.perf_counter() - start)
+        return [min(elapsed) for elapsed in times]
+
+    positions = zscore_positions(zscore_series(close, None, None), 1, 1)
+    base, with_model, model_only = interleaved_best([
+        lambda: vectorized_mean_reversion(close, trading_cost=0.01),
+        lambda: vectorized_mean_reversion(close, cost_model=model),
+        lambda: model(close, positions),
+    ])
+    print(f"\n1e6 bars ({np.count_nonzero(np.diff(positions))} trades): flat cost {base * 1e3:.1f} ms, "
+          f"slippage model {with_model * 1e3:.1f} ms ({(with_model / base - 1) * 100:+.1f}%), "
+          f"model call alone {model_only * 1e3:.1f} ms")
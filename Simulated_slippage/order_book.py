@@ -0,0 +1,417 @@
+"""
+Limit order book matching engine with price-time (FIFO) priority.
+
+Layout:
+- Price levels: per side, preallocated arrays indexed by tick offset
+  (0 .. n_ticks-1) holding the first / last order slot and the resting volume
+  of each level. The best level of a side comes from a heap of its non-empty
+  levels (stale entries are dropped lazily).
+- Orders: struct-of-arrays pool (id, side, price, quantity, next / previous
+  slot). Each level is an intrusive doubly-linked FIFO through the next /
+  previous arrays, and freed slots go back to a free list, so the hot path
+  allocates no per-order objects.
+
+Costs: cancel and quantity-reducing modify O(1); add / market O(log L) per
+touched level (L = non-empty levels) plus O(1) per fill.
+
+Messages (MESSAGE_DTYPE records: type, order_id, side, price, qty):
+    ADD     order_id, side, price, qty   limit order, matches then rests
+    CANCEL  order_id
+    MODIFY  order_id, price, qty          reduce in place, else cancel + re-add
+    MARKET  order_id, side, qty           matches, never rests
+
+Prices are integer ticks; to_ticks converts from price units.
+"""
+
+import heapq
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+BUY, SELL = 0, 1
+ADD, CANCEL, MODIFY, MARKET = 0, 1, 2, 3
+MESSAGE_CODES = {"A": ADD, "C": CANCEL, "M": MODIFY, "X": MARKET}
+
+MESSAGE_DTYPE = np.dtype([("type", "u1"), ("order_id", "i8"), ("side", "u1"), ("price", "i8"), ("qty", "i8")])
+
+
+def to_ticks(prices, min_price: float, tick_size: float) -> np.ndarray:
+    """Tick offsets of prices in a book starting at min_price."""
+    return np.rint((np.asarray(prices, dtype=np.float64) - min_price) / tick_size).astype(np.int64)
+
+
+class OrderBook:
+    def __init__(self, n_ticks: int = 100_000, capacity: int = 1 << 16, record_trades: bool = False):
+        """
+        Args:
+            n_ticks: Number of price levels per side (valid prices 0 .. n_ticks-1).
+            capacity: Initial order pool size; the pool doubles when full.
+            record_trades: Keep (maker_id, taker_id, price, qty) tuples in self.trades.
+        """
+        self.n_ticks = n_ticks
+
+        # Level arrays, one per side: first / last slot of the FIFO and resting volume
+        self._head = ([-1] * n_ticks, [-1] * n_ticks)
+        self._tail = ([-1] * n_ticks, [-1] * n_ticks)
+        self._volume = ([0] * n_ticks, [0] * n_ticks)
+        # Heap keys: -price for bids, price for asks, so the best level is heap[0]
+        self._heap: Tuple[List[int], List[int]] = ([], [])
+        self._in_heap = ([False] * n_ticks, [False] * n_ticks)
+
+        # Order pool (struct of arrays) and free list
+        self._order_id: List[int] = []
+        self._side: List[int] = []
+        self._price: List[int] = []
+        self._qty: List[int] = []
+        self._next: List[int] = []
+        self._prev: List[int] = []
+        self._free: List[int] = []
+        self._slots = {}
+        self._grow(capacity)
+
+        self.record_trades = record_trades
+        self.trades: List[Tuple[int, int, int, int]] = []
+        self.traded_volume = 0
+        self.n_trades = 0
+
+    def _grow(self, extra: int):
+        start = len(self._order_id)
+        for pool in (self._order_id, self._side, self._price, self._qty, self._next, self._prev):
+            pool.extend([-1] * extra)
+        self._free.extend(range(start + extra - 1, start - 1, -1))
+
+    def __len__(self) -> int:
+        """Number of resting orders."""
+        return len(self._slots)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._slots
+
+    # === Book state ===
+    def _best(self, side: int) -> Optional[int]:
+        heap, volume, in_heap = self._heap[side], self._volume[side], self._in_heap[side]
+        while heap:
+            price = -heap[0] if side == BUY else heap[0]
+            if volume[price]:
+                return price
+            heapq.heappop(heap)
+            in_heap[price] = False
+        return None
+
+    def best_bid(self) -> Optional[int]:
+        return self._best(BUY)
+
+    def best_ask(self) -> Optional[int]:
+        return self._best(SELL)
+
+    def volume_at(self, side: int, price: int) -> int:
+        return self._volume[side][price]
+
+    def depth(self, side: int, levels: int = 5) -> List[Tuple[int, int]]:
+        """Top `levels` (price, volume) pairs of a side, best first."""
+        volume = self._volume[side]
+        keys = heapq.nsmallest(len(self._heap[side]), self._heap[side])
+        prices = [-key if side == BUY else key for key in keys]
+        return [(price, volume[price]) for price in prices if volume[price]][:levels]
+
+    def order(self, order_id: int) -> Optional[Tuple[int, int, int]]:
+        """(side, price, remaining qty) of a resting order, None if not resting."""
+        slot = self._slots.get(order_id)
+        if slot is None:
+            return None
+        return self._side[slot], self._price[slot], self._qty[slot]
+
+    # === Level FIFO ===
+    def _append(self, order_id: int, side: int, price: int, qty: int):
+        if not self._free:
+            self._grow(len(self._order_id))
+        slot = self._free.pop()
+        self._order_id[slot] = order_id
+        self._side[slot] = side
+        self._price[slot] = price
+        self._qty[slot] = qty
+        self._next[slot] = -1
+        self._slots[order_id] = slot
+
+        tail = self._tail[side]
+        last = tail[price]
+        self._prev[slot] = last
+        if last == -1:
+            self._head[side][price] = slot
+            if not self._in_heap[side][price]:
+                self._in_heap[side][price] = True
+                heapq.heappush(self._heap[side], -price if side == BUY else price)
+        else:
+            self._next[last] = slot
+        tail[price] = slot
+        self._volume[side][price] += qty
+
+    def _unlink(self, slot: int):
+        side, price = self._side[slot], self._price[slot]
+        prev, following = self._prev[slot], self._next[slot]
+        if prev == -1:
+            self._head[side][price] = following
+        else:
+            self._next[prev] = following
+        if following == -1:
+            self._tail[side][price] = prev
+        else:
+            self._prev[following] = prev
+        self._volume[side][price] -= self._qty[slot]
+        del self._slots[self._order_id[slot]]
+        self._free.append(slot)
+
+    def _match(self, side: int, qty: int, limit: int, taker_id: int) -> int:
+        """Fill up to qty against the resting `side` at prices no worse than limit; returns the unfilled qty."""
+        book = 1 - side
+        heap, in_heap = self._heap[book], self._in_heap[book]
+        head, tail, volume = self._head[book], self._tail[book], self._volume[book]
+        order_qty, order_next, order_id = self._qty, self._next, self._order_id
+        # Asks match while price <= limit, bids while -price <= -limit
+        sign = -1 if book == BUY else 1
+        limit_key = sign * limit
+
+        while qty and heap and heap[0] <= limit_key:
+            price = sign * heap[0]
+            if not volume[price]:
+                heapq.heappop(heap)
+                in_heap[price] = False
+                continue
+            slot = head[price]
+            while qty and slot != -1:
+                resting = order_qty[slot]
+                fill = resting if resting <= qty else qty
+                qty -= fill
+                volume[price] -= fill
+                self.n_trades += 1
+                self.traded_volume += fill
+                if self.record_trades:
+                    self.trades.append((order_id[slot], taker_id, price, fill))
+                if fill == resting:
+                    # Fully filled maker: it is the level head, pop it
+                    following = order_next[slot]
+                    head[price] = following
+                    if following == -1:
+                        tail[price] = -1
+                    else:
+                        self._prev[following] = -1
+                    del self._slots[order_id[slot]]
+                    self._free.append(slot)
+                    slot = following
+                else:
+                    order_qty[slot] = resting - fill
+        return qty
+
+    def _check_price(self, price: int):
+        if not 0 <= price < self.n_ticks:
+            raise ValueError(f"Price {price} outside the book's 0..{self.n_ticks - 1} ticks")
+
+    # === Operations ===
+    def add(self, order_id: int, side: int, price: int, qty: int) -> int:
+        """Limit order: match against the opposite side, rest the remainder. Returns the filled qty."""
+        if order_id in self._slots:
+            raise ValueError(f"Order {order_id} is already resting")
+        self._check_price(price)
+        if qty <= 0:
+            raise ValueError(f"Order quantity must be positive, got {qty}")
+        remaining = self._match(side, qty, price, order_id)
+        if remaining:
+            self._append(order_id, side, price, remaining)
+        return qty - remaining
+
+    def market(self, side: int, qty: int, order_id: int = -1) -> int:
+        """Market order: match at any price, the unfilled remainder is dropped. Returns the filled qty."""
+        limit = self.n_ticks if side == BUY else -1
+        return qty - self._match(side, qty, limit, order_id)
+
+    def cancel(self, order_id: int) -> bool:
+        """Remove a resting order; False if it is not resting (filled, cancelled or unknown)."""
+        slot = self._slots.get(order_id)
+        if slot is None:
+            return False
+        self._unlink(slot)
+        return True
+
+    def modify(self, order_id: int, qty: int, price: int = None) -> bool:
+        """
+        Change a resting order. A quantity decrease at the same price keeps
+        its queue position; a price change or a quantity increase loses it
+        (cancel + re-add, which may trade). qty <= 0 cancels. An out-of-range
+        price raises ValueError and leaves the order resting unchanged.
+
+        Returns:
+            False if the order is not resting.
+        """
+        slot = self._slots.get(order_id)
+        if slot is None:
+            return False
+        if qty <= 0:
+            self._unlink(slot)
+            return True
+        side, current_price, current_qty = self._side[slot], self._price[slot], self._qty[slot]
+        if (price is None or price == current_price) and qty <= current_qty:
+            self._qty[slot] = qty
+            self._volume[side][current_price] -= current_qty - qty
+            return True
+        if price is not None:
+            self._check_price(price)
+        self._unlink(slot)
+        self.add(order_id, side, current_price if price is None else price, qty)
+        return True
+
+    def apply(self, message_type: int, order_id: int, side: int, price: int, qty: int):
+        """Apply one message (see MESSAGE_DTYPE)."""
+        if message_type == ADD:
+            self.add(order_id, side, price, qty)
+        elif message_type == CANCEL:
+            self.cancel(order_id)
+        elif message_type == MODIFY:
+            self.modify(order_id, qty, price if price >= 0 else None)
+        elif message_type == MARKET:
+            self.market(side, qty, order_id)
+        else:
+            raise ValueError(f"Unknown message type {message_type}")
+
+
+# === Message files and replay ===
+def read_messages(path, min_price: float = None, tick_size: float = None) -> np.ndarray:
+    """
+    Load a message file into a MESSAGE_DTYPE array.
+
+    .npy files are memory-mapped. Text files are CSV with a header
+    type,order_id,side,price,qty where type is A/C/M/X and side B/S; prices
+    are in ticks, or in price units when min_price and tick_size are given.
+    Missing fields (e.g. price of a cancel) may be left empty.
+    """
+    path = Path(path)
+    if path.suffix == ".npy":
+        messages = np.load(path, mmap_mode="r")
+        if messages.dtype != MESSAGE_DTYPE:
+            raise ValueError(f"{path} has dtype {messages.dtype}, expected {MESSAGE_DTYPE}")
+        return messages
+
+    frame = pd.read_csv(path, dtype={"type": str, "side": str})
+    messages = np.zeros(len(frame), dtype=MESSAGE_DTYPE)
+    codes = frame["type"].str.strip().str.upper().map(MESSAGE_CODES)
+    if codes.isna().any():
+        raise ValueError(f"Unknown message types {sorted(frame['type'][codes.isna()].unique())} in {path}")
+    messages["type"] = codes.to_numpy()
+    messages["order_id"] = frame["order_id"].fillna(-1).to_numpy()
+    messages["side"] = np.where(frame["side"].fillna("B").str.strip().str.upper().str[0] == "S", SELL, BUY)
+    price = frame["price"]
+    if min_price is not None and tick_size is not None:
+        messages["price"] = np.where(price.isna(), -1, to_ticks(price.fillna(min_price), min_price, tick_size))
+    else:
+        messages["price"] = price.fillna(-1).to_numpy()
+    messages["qty"] = frame["qty"].fillna(0).to_numpy()
+    return messages
+
+
+def write_messages(path, messages: np.ndarray):
+    """Save messages as .npy (memory-mappable by read_messages)."""
+    np.save(Path(path), np.asarray(messages, dtype=MESSAGE_DTYPE))
+
+
+def replay(book: OrderBook, messages: np.ndarray, latencies: np.ndarray = None,
+           chunk_size: int = 1 << 16) -> OrderBook:
+    """
+    Feed messages to the book in order.
+
+    Records are converted to Python tuples one chunk at a time, so memory-mapped
+    files of any length replay in bounded memory.
+
+    Args:
+        latencies: Optional int64 array of len(messages), filled with each
+            message's processing time in nanoseconds.
+    """
+    from time import perf_counter_ns
+
+    add, cancel, modify, market = book.add, book.cancel, book.modify, book.market
+    for start in range(0, messages.shape[0], chunk_size):
+        chunk = messages[start:start + chunk_size].tolist()
+        if latencies is None:
+            for message_type, order_id, side, price, qty in chunk:
+                if message_type == ADD:
+                    add(order_id, side, price, qty)
+                elif message_type == CANCEL:
+                    cancel(order_id)
+                elif message_type == MODIFY:
+                    modify(order_id, qty, price if price >= 0 else None)
+                else:
+                    market(side, qty, order_id)
+        else:
+            timings = [0] * len(chunk)
+            for i, (message_type, order_id, side, price, qty) in enumerate(chunk):
+                begin = perf_counter_ns()
+                if message_type == ADD:
+                    add(order_id, side, price, qty)
+                elif message_type == CANCEL:
+                    cancel(order_id)
+                elif message_type == MODIFY:
+                    modify(order_id, qty, price if price >= 0 else None)
+                else:
+                    market(side, qty, order_id)
+                timings[i] = perf_counter_ns() - begin
+            latencies[start:start + len(chunk)] = timings
+    return book
+
+
+def synthetic_messages(n_messages: int, n_ticks: int = 100_000, seed: int = 0,
+                       mix: Iterable[float] = (0.55, 0.30, 0.10, 0.05)) -> np.ndarray:
+    """
+    Random message stream around a random-walk mid price.
+
+    mix is the (add, cancel, modify, market) share. Adds sit a geometric number
+    of ticks from the mid on their side (about 5% cross it); cancels and
+    modifies target one of the last 2000 message ids, which may already be
+    filled or cancelled (a no-op, as in real feeds).
+    """
+    rng = np.random.default_rng(seed)
+    messages = np.zeros(n_messages, dtype=MESSAGE_DTYPE)
+    ids = np.arange(n_messages, dtype=np.int64)
+
+    message_type = rng.choice(4, size=n_messages, p=np.asarray(mix, dtype=np.float64) / np.sum(mix))
+    side = rng.integers(0, 2, n_messages)
+    mid = n_ticks // 2 + np.cumsum(rng.integers(-1, 2, n_messages))
+    mid = np.clip(mid, n_ticks // 10, n_ticks - n_ticks // 10)
+    offset = rng.geometric(0.15, n_messages) - 1
+    offset[rng.random(n_messages) < 0.05] *= -1
+    # Buys rest below the mid, sells above it
+    price = np.where(side == BUY, mid - offset, mid + offset)
+
+    targets = np.maximum(ids - rng.integers(1, 2000, n_messages), 0)
+    is_reference = (message_type == CANCEL) | (message_type == MODIFY)
+    messages["type"] = message_type
+    messages["order_id"] = np.where(is_reference, targets, ids)
+    messages["side"] = side
+    messages["price"] = np.where(message_type == MODIFY, -1, np.clip(price, 0, n_ticks - 1))
+    messages["qty"] = rng.integers(1, 100, n_messages)
+    return messages
+
+
+if __name__ == "__main__":
+    book = OrderBook(n_ticks=1_000, record_trades=True)
+    book.add(1, SELL, 505, 100)
+    book.add(2, SELL, 505, 50)
+    book.add(3, SELL, 507, 200)
+    book.add(4, BUY, 500, 80)
+    book.add(5, BUY, 499, 120)
+    print("asks:", book.depth(SELL), "bids:", book.depth(BUY))
+
+    book.modify(1, 60)                      # keeps priority
+    print("filled:", book.add(6, BUY, 506, 90), "trades:", book.trades)
+    print("market sell filled:", book.market(SELL, 150, order_id=7))
+    print("cancel 3:", book.cancel(3), "cancel 3 again:", book.cancel(3))
+    before = book.order(5)
+    try:
+        book.modify(5, 200, price=1_000)    # off the book: rejected, order 5 keeps resting
+    except ValueError as error:
+        print("modify rejected:", error)
+    assert book.order(5) == before and book.volume_at(BUY, 499) == before[2]
+    print("asks:", book.depth(SELL), "bids:", book.depth(BUY), "resting:", len(book))
+
+    messages = synthetic_messages(200_000, n_ticks=10_000)
+    stream_book = replay(OrderBook(n_ticks=10_000), messages)
+    print(f"\nreplayed {messages.shape[0]:,} messages: {len(stream_book):,} resting orders, "
+          f"{stream_book.n_trades:,} trades, best bid/ask {stream_book.best_bid()}/{stream_book.best_ask()}")
@@ -0,0 +1,63 @@
+"""
+Benchmark: messages per second and per-message latency of the order book.
+
+Usage:
+    python Simulated_slippage/order_book_benchmark.py --messages 1e7
+    python Simulated_slippage/order_book_benchmark.py --file messages.npy
+
+The stream (synthetic by default, or a message file) is replayed twice on a
+fresh book: once untimed for throughput, once with a perf_counter_ns pair
+around every message for the p50 / p99 / p99.9 latencies, which therefore
+include the timer's own overhead.
+"""
+
+import sys
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+
+MODULE_DIR = Path(__file__).resolve().parent
+if str(MODULE_DIR) not in sys.path:
+    sys.path.append(str(MODULE_DIR))
+
+from order_book import ADD, CANCEL, MARKET, MODIFY, OrderBook, read_messages, replay, synthetic_messages
+
+
+def run_benchmark(messages: np.ndarray, n_ticks: int):
+    counts = np.bincount(messages["type"], minlength=4)
+    print(f"{messages.shape[0]:,} messages: {counts[ADD]:,} add, {counts[CANCEL]:,} cancel, "
+          f"{counts[MODIFY]:,} modify, {counts[MARKET]:,} market")
+
+    book = OrderBook(n_ticks=n_ticks, capacity=1 << 20)
+    start = time.perf_counter()
+    replay(book, messages)
+    elapsed = time.perf_counter() - start
+    print(f"throughput: {messages.shape[0] / elapsed:,.0f} messages/s ({elapsed:.1f} s), "
+          f"{book.n_trades:,} trades, {len(book):,} resting orders")
+
+    latencies = np.empty(messages.shape[0], dtype=np.int64)
+    replay(OrderBook(n_ticks=n_ticks, capacity=1 << 20), messages, latencies)
+    p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9])
+    print(f"latency: p50 {p50 / 1e3:.2f} us, p99 {p99 / 1e3:.2f} us, p99.9 {p999 / 1e3:.2f} us, "
+          f"max {latencies.max() / 1e3:.1f} us")
+    for code, name in ((ADD, "add"), (CANCEL, "cancel"), (MODIFY, "modify"), (MARKET, "market")):
+        selected = latencies[messages["type"] == code]
+        if selected.shape[0]:
+            print(f"  {name:>7}: p50 {np.percentile(selected, 50) / 1e3:.2f} us, "
+                  f"p99 {np.percentile(selected, 99) / 1e3:.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Limit order book replay throughput and latency")
+    parser.add_argument("--messages", type=float, default=1e7, help="Synthetic stream length")
+    parser.add_argument("--ticks", type=int, default=100_000, help="Price levels per side")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--file", type=str, default=None, help="Replay a message file (.npy or .csv) instead")
+    args = parser.parse_args()
+
+    if args.file is None:
+        stream = synthetic_messages(int(args.messages), n_ticks=args.ticks, seed=args.seed)
+    else:
+        stream = read_messages(args.file)
+    run_benchmark(stream, args.ticks)
@@ -0,0 +1,178 @@
+"""
+Out-of-core PCA for Agent.pca_conversion.
+
+The features are streamed in fixed-size row chunks from the memory-mapped
+canonical columns of csv_ingest (the same parse, column order and date order
+as the in-memory branch), so peak memory is bounded by one chunk plus a
+(features x features) matrix. A missing or stale cache is first built by
+csv_ingest's streaming ingest with the same chunk size, so the source CSV is
+never read whole either:
+
+    pass 1  count, mean and co-moment matrix of the feature columns, merged
+            chunk by chunk (Chan et al. pairwise update) -> StandardScaler
+            statistics and the correlation matrix; its eigendecomposition gives
+            the same components as StandardScaler + PCA fitted in memory.
+    pass 2  each chunk is scaled and projected, written into a memory-mapped
+            .npy file, and every k-th row is kept as a bounded subsample for
+            plotting.
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+from typing import Dict, Iterator
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Data_Loader.csv_ingest import INGEST_CHUNK_ROWS, ingest_csv
+from Data_Loader.dataset_loader import get_loader
+
+
+def feature_columns(file_name, start=None, end=None, chunk_rows: int = INGEST_CHUNK_ROWS) -> Dict[str, np.ndarray]:
+    """
+    Feature columns of a csv_dataset file (every column but Date, loader order)
+    restricted to the inclusive date bounds, as memmap views (no copy).
+    A missing or stale cache is ingested chunk_rows rows at a time first.
+    """
+    loader = get_loader()
+    ingest_csv(loader.resolve(file_name), chunk_rows=chunk_rows)
+    arrays = loader.arrays(file_name)
+    lo, hi = loader.row_range(file_name, start, end)
+    return {name: values[lo:hi] for name, values in arrays.items() if name != "Date"}
+
+
+def iter_numeric_chunks(columns: Dict[str, np.ndarray], chunk_rows: int) -> Iterator[np.ndarray]:
+    """(rows x features) float64 chunks of equal-length columns; only one chunk is materialized."""
+    n_rows = len(next(iter(columns.values()))) if columns else 0
+    for row in range(0, n_rows, chunk_rows):
+        yield np.column_stack([values[row:row + chunk_rows] for values in columns.values()]).astype(np.float64)
+
+
+def _merge_moments(count, mean, comoment, chunk: np.ndarray):
+    """Merge a chunk into running (count, mean, co-moment) statistics."""
+    chunk_count = chunk.shape[0]
+    chunk_mean = chunk.mean(axis=0)
+    centred = chunk - chunk_mean
+    chunk_comoment = centred.T @ centred
+
+    if count == 0:
+        return chunk_count, chunk_mean, chunk_comoment
+
+    total = count + chunk_count
+    delta = chunk_mean - mean
+    mean = mean + delta * (chunk_count / total)
+    comoment = comoment + chunk_comoment + np.outer(delta, delta) * (count * chunk_count / total)
+    return total, mean, comoment
+
+
+def _flip_signs(components: np.ndarray) -> np.ndarray:
+    """sklearn's sign convention: the largest |loading| of each component is positive."""
+    signs = np.sign(components[np.arange(components.shape[0]), np.argmax(np.abs(components), axis=1)])
+    signs[signs == 0] = 1
+    return components * signs[:, None]
+
+
+def chunked_pca(columns: Dict[str, np.ndarray], n_components: int = 2, chunk_rows: int = 100_000,
+                output_path=None, max_samples: int = 5_000) -> Dict[str, np.ndarray]:
+    """
+    Standardize + PCA feature columns in two streaming passes.
+
+    Args:
+        columns: {name: equal-length 1-D array}, e.g. feature_columns(file_name).
+        n_components: Number of principal components.
+        chunk_rows: Rows per chunk (bounds peak memory).
+        output_path: .npy file for the (rows x n_components) projections,
+            memory-mapped while writing. None keeps no projection file.
+        max_samples: Size of the evenly strided subsample kept for plots.
+
+    Returns:
+        dict with components, mean, scale, explained_variance,
+        explained_variance_ratio, n_rows, projections (read-only memmap or None),
+        sample (subsample of projections, every sample_stride-th row) and
+        pc1_stats (mean, max, min).
+    """
+    # === Pass 1: moments ===
+    count, mean, comoment = 0, None, None
+    for chunk in iter_numeric_chunks(columns, chunk_rows):
+        count, mean, comoment = _merge_moments(count, mean, comoment, chunk)
+    if count == 0:
+        raise ValueError("No rows to fit")
+
+    covariance = comoment / count
+    scale = np.sqrt(np.diag(covariance))
+    scale[scale == 0] = 1.0  # StandardScaler leaves constant columns unscaled
+    correlation = covariance / np.outer(scale, scale)
+
+    eigenvalues, eigenvectors = np.linalg.eigh(correlation)
+    order = np.argsort(eigenvalues)[::-1][:n_components]
+    components = _flip_signs(eigenvectors[:, order].T)
+    # PCA reports variances with ddof=1
+    explained_variance = eigenvalues[order] * count / max(count - 1, 1)
+    explained_variance_ratio = eigenvalues[order] / eigenvalues.sum()
+
+    # === Pass 2: project, write memmap, subsample ===
+    projections = None
+    if output_path is not None:
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        projections = np.lib.format.open_memmap(output_path, mode="w+", dtype=np.float64,
+                                                shape=(count, n_components))
+
+    stride = max(1, -(-count // max_samples))
+    samples = []
+    pc1_sum, pc1_max, pc1_min = 0.0, -np.inf, np.inf
+    row = 0
+    for chunk in iter_numeric_chunks(columns, chunk_rows):
+        projected = ((chunk - mean) / scale) @ components.T
+        if projections is not None:
+            projections[row:row + projected.shape[0]] = projected
+
+        first = (-row) % stride
+        samples.append(projected[first::stride])
+        pc1_sum += projected[:, 0].sum()
+        pc1_max = max(pc1_max, projected[:, 0].max())
+        pc1_min = min(pc1_min, projected[:, 0].min())
+        row += projected.shape[0]
+
+    if projections is not None:
+        projections.flush()
+        del projections
+        projections = np.load(output_path, mmap_mode="r")
+
+    return {
+        "components": components,
+        "mean": mean,
+        "scale": scale,
+        "explained_variance": explained_variance,
+        "explained_variance_ratio": explained_variance_ratio,
+        "n_rows": count,
+        "projections": projections,
+        "sample": np.concatenate(samples),
+        "sample_stride": stride,
+        "pc1_stats": (pc1_sum / count, pc1_max, pc1_min),
+    }
+
+
+if __name__ == "__main__":
+    from sklearn.decomposition import PCA
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    # Chunked components must match the in-memory StandardScaler + PCA branch of pca_conversion
+    for file_name in ["AMD.csv", "GOOG.csv", "TSLA.csv", "oil.csv"]:
+        frame = get_loader().load(file_name).reset_index().iloc[:, 1:]
+        pipeline = Pipeline([("scaler", StandardScaler()), ("pca", PCA(n_components=2))])
+        expected = pipeline.fit_transform(frame)
+        components = pipeline.named_steps["pca"].components_
+
+        result = chunked_pca(feature_columns(file_name), 2, chunk_rows=37, output_path=None)
+        # PCA's sign is arbitrary: align each component before comparing
+        signs = np.sign(np.sum(components * result["components"], axis=1))
+        projected = ((frame.to_numpy(dtype=np.float64) - result["mean"]) / result["scale"]) @ result["components"].T
+        component_gap = np.max(np.abs(components - result["components"] * signs[:, None]))
+        projection_gap = np.max(np.abs(expected - projected * signs))
+        print(f"{file_name}: {result['n_rows']} rows, max |component diff| {component_gap:.1e}, "
+              f"max |projection diff| {projection_gap:.1e}")
+        assert component_gap < 1e-8 and projection_gap < 1e-8, file_name
@@ -1,59 +1,68 @@
+import time
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import sys
 from pathlib import Path
-from IPython.display import display
 import seaborn as sns
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
+from typing import Callable
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Data_Loader.dataset_loader import get_loader
+from Plot_Renderer.batch_renderer import line_panel, render_job, render_many, downsample
+from Stock_prediction_model.Chunked_PCA import chunked_pca, feature_columns
+from Machine_Learning_Comp.Reinforcement_Learning.reinforcement_learning import TradingVectorEnv
 
 class Agent:
     def __init__(self, epoch: int = 0):
         self.epoch = epoch
 
     @staticmethod
-    def visualization(file_name: str):
-        """Plot and save all numeric columns from CSV"""
-
-        # === Build safe file path ===
-        csv_path = Path(__file__).resolve().parent.parent / "csv_dataset" / file_name
-        if not csv_path.exists():
-            raise FileNotFoundError(f"File not found: {csv_path}")
+    def visualization(file_name: str, columns: list = None, start=None, end=None, headless: bool = False,
+                      processes: int = None, max_points: int = 4000, force: bool = False):
+        """
+        Plot and save all numeric columns from CSV.
 
-        # === Load data ===
-        df = pd.read_csv(csv_path)
-        display(df.head())
+        Charts go through the batch renderer: non-interactive, downsampled to
+        max_points, skipped when the data is unchanged (force=True redraws) and
+        spread over `processes` workers. headless: no display of the results.
+        """
+        loader = get_loader()
 
-        # Clean column names
-        df.columns = df.columns.str.strip()
+        # === Load data (shared loader, column names already clean) ===
+        df = loader.load(file_name, columns, start, end).reset_index()
+        loader.show(df.head(), headless=headless)
 
         # === Output folder ===
         output_folder = Path(__file__).parent / f"{file_name}_plots"
         output_folder.mkdir(parents=True, exist_ok=True)
 
         # === Plot all numeric columns ===
-        for col in df.columns:
-            if not np.issubdtype(df[col].dtype, np.number):
-                continue
-
-            plt.figure(figsize=(10, 5))
-            plt.plot(df[col])
-            plt.title(f"{col} Over Time")
-            plt.xlabel("Index")
-            plt.ylabel(col)
-
-            output_path = output_folder / f"{col}.png"
-            plt.savefig(output_path, dpi=300, bbox_inches="tight")
-            plt.show()
-            plt.close()
+        jobs = [
+            render_job(output_folder / f"{col}.png",
+                       [line_panel(df[col].to_numpy(), title=f"{col} Over Time", xlabel="Index", ylabel=col)],
+                       figsize=(10, 5), dpi=300, max_points=max_points, force=force)
+            for col in df.columns if np.issubdtype(df[col].dtype, np.number)
+        ]
+        render_many(jobs, processes=processes)
+
+        if not headless:
+            from IPython.display import Image
+            for job in jobs:
+                loader.show(Image(filename=job["output_path"]))
 
     @staticmethod
-    def convert_to_csv(input_file: str, output_name: str):
+    def convert_to_csv(input_file: str, output_name: str, headless: bool = False):
         """
         Converts non-CSV files into CSV and saves to csv_dataset.
-        Currently supports Excel (.xlsx).
+        Currently supports Excel (.xlsx). headless: no confirmation print.
         """
         input_path = Path(input_file)
 
@@ -71,44 +80,61 @@ class Agent:
         output_path = output_folder / f"{output_name}.csv"
         df.to_csv(output_path, index=False)
 
-        print(f"Saved CSV to: {output_path}")
+        get_loader().echo(f"Saved CSV to: {output_path}", headless=headless)
 
     @staticmethod
-    def pca_conversion(file_name: str, n_components: int = 2):
-        """Run PCA and generate plots + dataset"""
-
-        # === Load CSV ===
-        csv_path = Path(__file__).resolve().parent.parent / "csv_dataset" / file_name
-        if not csv_path.exists():
-            raise FileNotFoundError(f"File not found: {csv_path}")
+    def pca_conversion(file_name: str, n_components: int = 2, start=None, end=None, headless: bool = False,
+                       chunk_rows: int = None, max_samples: int = 5_000):
+        """
+        Run PCA and generate plots + dataset (headless: no display/plt.show).
+
+        chunk_rows switches to the out-of-core mode: the memory-mapped columns
+        (same parse, columns, date order and start / end range as the in-memory
+        mode; a cold cache is ingested in chunks too) are streamed in chunks of
+        that many rows, components are written
+        to a memory-mapped .npy instead of CSV, and the plots are built from a
+        max_samples subsample.
+        """
+        loader = get_loader()
 
-        df = pd.read_csv(csv_path)
-        df.columns = df.columns.str.strip()
+        dataset_folder = Path(__file__).parent / f"{file_name}_PCA_Dataset"
+        dataset_folder.mkdir(parents=True, exist_ok=True)
+        columns = [f"PC{i+1}" for i in range(n_components)]
+
+        if chunk_rows is not None:
+            # === Out-of-core: stream chunks, memory-mapped output ===
+            result = chunked_pca(feature_columns(file_name, start, end, chunk_rows), n_components, chunk_rows,
+                                 output_path=dataset_folder / f"{file_name}_PCA.npy", max_samples=max_samples)
+            sample_df = pd.DataFrame(result["sample"], columns=columns)
+            pc1_index, pc1_values = downsample(np.arange(result["n_rows"]), result["projections"][:, 0])
+            pc1_stats = result["pc1_stats"]
+            loader.show(sample_df.head(), headless=headless)
+        else:
+            # === Load data (shared loader: not re-parsed after visualization) ===
+            df = loader.load(file_name, start=start, end=end).reset_index()
 
-        # === Extract numeric data (skip first column like Date) ===
-        df_num = df.iloc[:, 1:]
+            # === Extract numeric data (skip first column like Date) ===
+            df_num = df.iloc[:, 1:]
 
-        # === PCA Pipeline ===
-        pipeline = Pipeline([
-            ("scaler", StandardScaler()),
-            ("pca", PCA(n_components=n_components))
-        ])
+            # === PCA Pipeline ===
+            pipeline = Pipeline([
+                ("scaler", StandardScaler()),
+                ("pca", PCA(n_components=n_components))
+            ])
 
-        principal_comps = pipeline.fit_transform(df_num)
+            principal_comps = pipeline.fit_transform(df_num)
 
-        pca_df = pd.DataFrame(
-            principal_comps,
-            columns=[f"PC{i+1}" for i in range(n_components)]
-        )
+            pca_df = pd.DataFrame(principal_comps, columns=columns)
 
-        display(pca_df.head())
+            loader.show(pca_df.head(), headless=headless)
 
-        # === Save PCA CSV ===
-        dataset_folder = Path(__file__).parent / f"{file_name}_PCA_Dataset"
-        dataset_folder.mkdir(parents=True, exist_ok=True)
+            # === Save PCA CSV ===
+            pca_csv_path = dataset_folder / f"{file_name}_PCA.csv"
+            pca_df.to_csv(pca_csv_path, index=False)
 
-        pca_csv_path = dataset_folder / f"{file_name}_PCA.csv"
-        pca_df.to_csv(pca_csv_path, index=False)
+            sample_df = pca_df
+            pc1_index, pc1_values = pca_df.index.to_numpy(), pca_df["PC1"].to_numpy()
+            pc1_stats = (pca_df["PC1"].mean(), pca_df["PC1"].max(), pca_df["PC1"].min())
 
         # === Plot folder ===
         plot_folder = Path(__file__).parent / f"{file_name}_plots"
@@ -117,8 +143,8 @@ class Agent:
         # --- Scatter + KDE plot ---
         plt.figure(figsize=(10, 6))
         sns.kdeplot(
-            x=pca_df["PC1"],
-            y=pca_df["PC2"],
+            x=sample_df["PC1"],
+            y=sample_df["PC2"],
             fill=True,
             cmap="Blues",
             thresh=0.05,
@@ -127,7 +153,7 @@ class Agent:
         sns.scatterplot(
             x="PC1",
             y="PC2",
-            data=pca_df,
+            data=sample_df,
             s=40
         )
 
@@ -139,10 +165,10 @@ class Agent:
 
         # --- PC1 Line Plot ---
         plt.figure(figsize=(12, 5))
-        sns.lineplot(data=pca_df["PC1"], label="PC1")
-        plt.axhline(pca_df["PC1"].mean(), linestyle="--", label="Mean")
-        plt.axhline(pca_df["PC1"].max(), linestyle=":", label="Max")
-        plt.axhline(pca_df["PC1"].min(), linestyle=":", label="Min")
+        sns.lineplot(x=pc1_index, y=pc1_values, label="PC1")
+        plt.axhline(pc1_stats[0], linestyle="--", label="Mean")
+        plt.axhline(pc1_stats[1], linestyle=":", label="Max")
+        plt.axhline(pc1_stats[2], linestyle=":", label="Min")
 
         plt.title("PC1 Over Time")
         plt.xlabel("Index")
@@ -151,12 +177,52 @@ class Agent:
 
         line_path = plot_folder / f"{file_name}_PC1_line.png"
         plt.savefig(line_path, dpi=300, bbox_inches="tight")
-        plt.show()
+        if not headless:
+            plt.show()
         plt.close()
 
-    def agent_in_action(self):
-        """Agent execution placeholder"""
-        pass
+    def agent_in_action(self, file_name="TSLA.csv", policy: Callable[[np.ndarray], np.ndarray] = None,
+                        num_envs: int = 64, steps: int = 1_000, seed: int = None, headless: bool = False,
+                        **env_kwargs) -> dict:
+        """
+        Run a policy on the batched trading environment of a csv_dataset file.
+
+        Args:
+            file_name: File (or list of files) whose Close prices the episodes sample.
+            policy: Maps the observation batch (num_envs, window + 1) to one
+                action per environment (0 short, 1 flat, 2 long); default random.
+            num_envs: Episodes stepped together.
+            steps: Vector steps to run.
+            seed: Seed of the episode starts and of the random policy.
+            headless: No printed summary.
+            **env_kwargs: Forwarded to TradingVectorEnv (window, episode_length, trading_cost, ...).
+
+        Returns:
+            Dict with the finished episode returns and lengths, their mean
+            return and the environment steps per second.
+        """
+        env = TradingVectorEnv.from_dataset(file_name, num_envs=num_envs, seed=seed, **env_kwargs)
+        obs, _ = env.reset(seed=seed)
+        returns, lengths = [], []
+
+        start = time.perf_counter()
+        for _ in range(steps):
+            actions = env.action_space.sample() if policy is None else policy(obs)
+            obs, _, _, _, infos = env.step(actions)
+            if "episode_stats" in infos:
+                finished = infos["_episode_stats"]
+                returns.append(infos["episode_stats"]["r"][finished])
+                lengths.append(infos["episode_stats"]["l"][finished])
+        elapsed = time.perf_counter() - start
+
+        returns = np.concatenate(returns) if returns else np.zeros(0)
+        lengths = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+        summary = {"episode_returns": returns, "episode_lengths": lengths,
+                   "mean_return": float(returns.mean()) if returns.size else float("nan"),
+                   "steps_per_second": steps * num_envs / elapsed}
+        get_loader().echo(f"{returns.size} episodes, mean return {summary['mean_return']:+.4f}, "
+                          f"{summary['steps_per_second']:,.0f} env steps/s", headless=headless)
+        return summary
 
 
 if __name__ == "__main__":
@@ -1,7 +1,17 @@
 import numpy as np
 import pandas as pd
 import json
+import requests
 from IPython.display import display
+import sys
+from pathlib import Path
+
+MODULE_DIR = Path(__file__).resolve().parent
+if str(MODULE_DIR) not in sys.path:
+    sys.path.append(str(MODULE_DIR))
+
+from http_client import HttpClient, RetryPolicy, get_client
+from json_columnar import Field, decode_pages
 
 """
 ## **Practice Test 1 — Easy**
@@ -17,15 +27,13 @@ Print the Pokémon’s **name** and **base experience**.
 ---
     """
 def practice_1():
-    import requests
-    
     print("practice 1")
     params = {"ability": "static", "limit": 10}
-    requests = requests.get("https://pokeapi.co/api/v2/pokemon/pikachu", params=params)
-    status_code = requests.status_code
+    response = get_client().get("https://pokeapi.co/api/v2/pokemon/pikachu", params=params)
+    status_code = response.status_code
     
     if status_code == 200: 
-        data = requests.json()
+        data = response.json()
         df = pd.json_normalize(data)
         display(df.T)
         
@@ -34,7 +42,7 @@ def practice_1():
         display("base_experience: ", df["base_experience"].at[0])
         print("\n\n")
         
-        header_data = dict(requests.headers)
+        header_data = dict(response.headers)
         df_header = pd.json_normalize(header_data).T
         display(df_header)
     else:
@@ -52,10 +60,8 @@ https://api.agify.io/?name=michael
 Print the JSON result.
     """
 def practice_2():
-    import requests
-    
     print("practice 2")
-    requests_ = requests.get("https://api.agify.io/?name=michael")
+    requests_ = get_client().get("https://api.agify.io/?name=michael")
     
     status_code = requests_.status_code
     
@@ -83,17 +89,15 @@ https://catfact.ninja/fact?max_length=60
 Extract only the `"fact"` string.
     """
 def practice_3():
-    import requests
-    
     print("practice 3")
-    requests = requests.get("https://catfact.ninja/fact?max_length=60")
+    response = get_client().get("https://catfact.ninja/fact?max_length=60")
     
-    status_code = requests.status_code
+    status_code = response.status_code
     
     if status_code == 200:
         print("API request successful.")
         
-        data = requests.json()
+        data = response.json()
         df_data = pd.json_normalize(data)["fact"][0]
         display("fact of the day?: ", df_data)
     else:
@@ -117,8 +121,6 @@ Send JSON data:
 Print the server's response.
 """
 def practice_4():
-    import requests
-    
     print("practice 4")
     url = "https://httpbin.org/post"
     data_json_post = {
@@ -127,7 +129,7 @@ def practice_4():
         "age": 30,
         "city": "New York"
     }
-    response_post = requests.post(url, json=data_json_post)
+    response_post = get_client().post(url, json=data_json_post)
     
     status_code = response_post.status_code
     
@@ -156,18 +158,15 @@ https://jsonplaceholder.typicode.com/posts
 Print the **title** of the first 5 posts.
 """
 def practice_5():
-    import requests
-    
     print("practice 5")
-    requests_call = requests.get("https://jsonplaceholder.typicode.com/posts")
+    requests_call = get_client().get("https://jsonplaceholder.typicode.com/posts")
     status_code = requests_call.status_code
     
     if status_code == 200:
         print("API called successfully")
-        data = requests_call.json()
         header = dict(requests_call.headers)
         
-        df_data = pd.json_normalize(data).iloc[0:5]["title"]
+        df_data = decode_pages([requests_call.content], [Field("title", dtype="str")])["title"].iloc[0:5]
         df_header = pd.json_normalize(header)
         
         display(df_data)
@@ -190,10 +189,8 @@ Return the **current temperature**.
  
 """
 def practice_8():
-    import requests
-    
     print("practice 8")
-    requests_call = requests.get("https://wttr.in/<city>?format=j1")
+    requests_call = get_client().get("https://wttr.in/<city>?format=j1")
 
     
     status_code = requests_call.status_code
@@ -227,37 +224,33 @@ Write Python code that:
 * prints “Failed after retries” if still 500
 """
 def practice_10():
-    import requests
-    
     print("practice 10")
-    status_code = None
-    tries = 0
+    # 3 tries, exponential backoff with jitter (about 1 s, then 2 s) between them
+    client = HttpClient(timeout=2, retry=RetryPolicy(max_attempts=3, base_delay=1.0))
     
     try:
-        while status_code != 200 and tries < 5:
-            requests_call = requests.get("https://httpbin.org/status/500", timeout=2)
-            
-            status_code = requests_call.status_code
-            
-            print("status code: ", status_code)
+        requests_call = client.get("https://httpbin.org/status/500")
+        
+        status_code = requests_call.status_code
+        
+        print("status code: ", status_code)
+        
+        if status_code == 200:
+            requests_header = dict(requests_call.headers)
+            requests_data = requests_call.json()
             
-            if status_code == 200:
-                requests_header = dict(requests_call.headers)
-                requests_data = requests_call.json()
-                
-                df_header = pd.json_normalize(requests_header)
-                df_data = pd.json_normalize(requests_data).T
-                
-                display(df_data)
-                display(df_header.head())
-                
-            tries += 1
+            df_header = pd.json_normalize(requests_header)
+            df_data = pd.json_normalize(requests_data).T
             
-        if status_code != 200:
-            print(f"Failed after {tries} tries.")
+            display(df_data)
+            display(df_header.head())
+        else:
+            print(f"Failed after {client.retry.max_attempts} tries.")
             
     except requests.exceptions.RequestException as e:
         print(f"failed {e}")
+    finally:
+        client.close()
 
 
 
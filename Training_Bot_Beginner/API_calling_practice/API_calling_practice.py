@@ -4,6 +4,15 @@ import numpy as np
 import pandas as pd
 import json
 from IPython.display import display
+import sys
+from pathlib import Path
+
+MODULE_DIR = Path(__file__).resolve().parent
+if str(MODULE_DIR) not in sys.path:
+    sys.path.append(str(MODULE_DIR))
+
+from http_client import get_client
+from json_columnar import decode_pages
 
 """  
 This module contains functions to practice making API calls (GET and POST) and visualizing the responses using pandas DataFrames.
@@ -15,11 +24,11 @@ def basic_get_request_practice(url:str):
     """
     This function makes a basic GET request to the provided URL and returns the response as a pandas DataFrame.
     """
-    import requests
+    client = get_client() #shared session: keep-alive connections, timeouts and retries
 
     #headers = {"accept": "application/json"}
 
-    response = requests.get(url)
+    response = client.get(url)
     
     status_code = response.status_code #200 means successful
     print(f"\n Status Code: {status_code}")
@@ -27,12 +36,11 @@ def basic_get_request_practice(url:str):
     if status_code == 200:
         print("API request successful.")
         headers = response.headers #dictionary format
-        data = response.json() #dictionary format
         
         df_header = pd.DataFrame.from_dict(headers, orient='index')
         display(df_header)
-        df_data = pd.DataFrame.from_dict(data, orient='index').T
-        df_data = df_data["data"].apply(pd.Series).T  # Expand the 'data' column into separate columns
+        # Columns straight from the body's "data" record(s), one row per record
+        df_data = decode_pages([response.content], records_path="data").T
         display(df_data)
         print("\n\n")
     else:
@@ -41,17 +49,15 @@ def basic_get_request_practice(url:str):
     #_________________________________________call API with parameters
     
     parameters = {"statusCode": 200, "limit": 2, "market": "US"} #example parameters, which will filter the API response
-    respose_filtered = requests.get(url, params=parameters)
+    respose_filtered = client.get(url, params=parameters)
     
     status_code = respose_filtered.status_code
     if status_code == 200:
         print("API request with parameters successful.")
         headers = response.headers
-        filtered_data = respose_filtered.json()
-        df = pd.DataFrame.from_dict(filtered_data, orient='index').T
         df_header = pd.DataFrame.from_dict(headers, orient='index')
         display(df_header)
-        df = df["data"].apply(pd.Series).T  # Expand the 'data' column into separate columns
+        df = decode_pages([respose_filtered.content], records_path="data").T
         display(df)
     else:
         print(f"Error: Unable to fetch data from the API with parameters. Status code: {status_code}")
@@ -60,9 +66,7 @@ def POST_API_request_practice(url:str, payload:dict): #for post, status should b
     """
     this function makes a basic POST request to the provided URL with the given payload and returns the response as a pandas DataFrame.
     """
-    import requests
-    
-    response_post = requests.post(url, json=payload)
+    response_post = get_client().post(url, json=payload)
     status_code = response_post.status_code
     print(f"\n Status Code: {status_code}")
     
@@ -0,0 +1,305 @@
+"""
+Persistent HTTP response cache in SQLite, used by HttpClient(cache=...).
+
+- Key: method + canonical URL (lower-cased scheme / host, query string and
+  params merged and sorted), hashed.
+- Freshness: per-endpoint TTL overrides (fnmatch URL patterns) first, then
+  Cache-Control (no-store, no-cache, max-age, s-maxage) and Expires, then
+  default_ttl for responses that carry no freshness information.
+- Stale entries with an ETag / Last-Modified are revalidated with
+  If-None-Match / If-Modified-Since; a 304 refreshes the entry and serves the
+  stored body.
+- Size cap: least recently used entries are evicted once the bodies exceed
+  max_bytes.
+
+The database runs in WAL mode with a busy timeout, so several processes can
+read and update one cache file at the same time; each process (and fork)
+opens its own connection.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import fnmatch
+import threading
+import requests
+from pathlib import Path
+from email.utils import parsedate_to_datetime
+from requests.structures import CaseInsensitiveDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from typing import Dict, NamedTuple, Optional
+
+CACHEABLE_STATUSES = frozenset({200, 203, 300, 301})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key           TEXT PRIMARY KEY,
+    method        TEXT NOT NULL,
+    url           TEXT NOT NULL,
+    status        INTEGER NOT NULL,
+    headers       TEXT NOT NULL,
+    body          BLOB NOT NULL,
+    size          INTEGER NOT NULL,
+    stored_at     REAL NOT NULL,
+    expires_at    REAL NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    last_access   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+"""
+
+
+def canonical_url(url: str, params=None) -> str:
+    """URL with lower-cased scheme / host, no fragment and the query (plus params) sorted."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        items = params.items() if isinstance(params, dict) else params
+        for name, value in items:
+            values = value if isinstance(value, (list, tuple)) else [value]
+            query.extend((str(name), str(v)) for v in values if v is not None)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/",
+                       urlencode(sorted(query)), ""))
+
+
+def cache_key(method: str, url: str, params=None) -> str:
+    return hashlib.sha256(f"{method.upper()} {canonical_url(url, params)}".encode()).hexdigest()
+
+
+def _cache_control(headers) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _http_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class CachedEntry(NamedTuple):
+    key: str
+    url: str
+    status: int
+    headers: dict
+    body: bytes
+    expires_at: float
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def validators(self) -> dict:
+        """Conditional request headers for revalidation."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self) -> requests.Response:
+        response = requests.Response()
+        response.status_code = self.status
+        response.reason = "OK" if self.status == 200 else ""
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.body
+        response.url = self.url
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
+
+
+class ResponseCache:
+    def __init__(self, path, max_bytes: int = 256 * 1024 ** 2,
+                 default_ttl: float = 0.0,
+                 ttl_overrides: Dict[str, float] = None):
+        """
+        Args:
+            path: SQLite database file (created if missing).
+            max_bytes: Cap on the total size of stored bodies.
+            default_ttl: Freshness lifetime (s) of responses without
+                Cache-Control max-age / Expires.
+            ttl_overrides: {fnmatch URL pattern: seconds}; the first matching
+                pattern overrides the response headers (0 = always revalidate).
+        """
+        self.path = Path(path)
+        self.max_bytes = int(max_bytes)
+        self.default_ttl = float(default_ttl)
+        self.ttl_overrides = dict(ttl_overrides or {})
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0,
+                      "bytes_from_cache": 0, "bytes_from_network": 0}
+
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pid = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per process; forked children must not share the parent's
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    # === Freshness ===
+    def _override(self, url: str) -> Optional[float]:
+        for pattern, ttl in self.ttl_overrides.items():
+            if fnmatch.fnmatchcase(url, pattern):
+                return float(ttl)
+        return None
+
+    def lifetime(self, url: str, headers) -> Optional[float]:
+        """Seconds the response stays fresh, or None if it must not be stored."""
+        directives = _cache_control(headers)
+        if "no-store" in directives:
+            return None
+        override = self._override(url)
+        if override is not None:
+            return override
+        if "no-cache" in directives:
+            return 0.0
+        for name in ("s-maxage", "max-age"):
+            if directives.get(name, "").isdigit():
+                return max(float(directives[name]) - float(headers.get("Age", 0) or 0), 0.0)
+        expires = _http_date(headers.get("Expires"))
+        if expires is not None:
+            served = _http_date(headers.get("Date")) or time.time()
+            return max(expires - served, 0.0)
+        return self.default_ttl
+
+    # === Entries ===
+    def lookup(self, method: str, url: str, params=None) -> Optional[CachedEntry]:
+        key = cache_key(method, url, params)
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT key, url, status, headers, body, expires_at, etag, last_modified "
+                "FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return CachedEntry(row[0], row[1], row[2], json.loads(row[3]), bytes(row[4]), row[5], row[6], row[7])
+
+    def serve(self, entry: CachedEntry) -> requests.Response:
+        """Count a hit, mark the entry recently used and return it as a Response."""
+        with self._lock:
+            self._connection().execute("UPDATE responses SET last_access = ? WHERE key = ?",
+                                       (time.time(), entry.key))
+            self.stats["hits"] += 1
+            self.stats["bytes_from_cache"] += len(entry.body)
+        return entry.to_response()
+
+    def store(self, method: str, url: str, params, response: requests.Response) -> bool:
+        """Store a network response if it is cacheable; returns whether it was stored."""
+        with self._lock:
+            self.stats["misses"] += 1
+            self.stats["bytes_from_network"] += len(response.content)
+        if method.upper() != "GET" or response.status_code not in CACHEABLE_STATUSES:
+            return False
+        lifetime = self.lifetime(url, response.headers)
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if lifetime is None or (lifetime <= 0 and not (etag or last_modified)):
+            return False
+        body = response.content
+        if len(body) > self.max_bytes:
+            return False
+
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (cache_key(method, url, params), method.upper(), canonical_url(url, params),
+                              response.status_code, json.dumps(dict(response.headers)), body, len(body),
+                              now, now + lifetime, etag, last_modified, now))
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.stats["stores"] += 1
+        return True
+
+    def revalidated(self, entry: CachedEntry, not_modified: requests.Response) -> requests.Response:
+        """Refresh an entry from a 304 answer and return the stored response."""
+        headers = dict(entry.headers)
+        headers.update({name: value for name, value in not_modified.headers.items()
+                        if name.lower() not in ("content-length", "content-encoding", "transfer-encoding")})
+        lifetime = self.lifetime(entry.url, headers) or 0.0
+        now = time.time()
+        with self._lock:
+            self._connection().execute(
+                "UPDATE responses SET headers = ?, expires_at = ?, etag = ?, last_modified = ?, last_access = ? "
+                "WHERE key = ?", (json.dumps(headers), now + lifetime, headers.get("ETag", entry.etag),
+                                  headers.get("Last-Modified", entry.last_modified), now, entry.key))
+            self.stats["revalidated"] += 1
+            self.stats["bytes_from_cache"] += len(entry.body)
+        return entry._replace(headers=headers, expires_at=now + lifetime).to_response()
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.stats["evictions"] += len(victims)
+
+    # === Maintenance ===
+    def usage(self) -> dict:
+        """Entries and stored body bytes currently in the database (all processes)."""
+        with self._lock:
+            entries, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": size}
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM responses")
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    MODULE_DIR = Path(__file__).resolve().parent
+    if str(MODULE_DIR) not in sys.path:
+        sys.path.append(str(MODULE_DIR))
+    from http_client import HttpClient
+    from stand_in_server import StandInServer
+
+    with tempfile.TemporaryDirectory() as tmp, StandInServer(latency=(0.02, 0.02)) as server:
+        urls = [server.url(f"/quote/SYM{i:03d}") for i in range(100)]
+        for run in range(2):
+            cache = ResponseCache(Path(tmp) / "http_cache.sqlite", default_ttl=300)
+            with HttpClient(concurrency=16, cache=cache) as client:
+                before = server.stats()["requests"]
+                start = time.perf_counter()
+                results = list(client.batch(urls))
+                print(f"run {run + 1}: {sum(r.ok for r in results)} ok in {time.perf_counter() - start:.3f} s, "
+                      f"{server.stats()['requests'] - before} network requests, stats {cache.stats}")
+        print("usage:", cache.usage())
@@ -0,0 +1,442 @@
+"""
+Shared HTTP client layer for the API practice fetchers.
+
+- HttpClient: one requests.Session with a keep-alive connection pool
+  (pool_size connections per host), default timeouts, a per-host rate limit
+  and retries with exponential backoff + full jitter on 429 / 5xx answers,
+  connection errors and timeouts (Retry-After is honoured when it asks for
+  longer). Only idempotent methods are retried unless the RetryPolicy lists
+  others, so a POST that reached the server is never sent twice by default.
+- Fan-out: fetch_as_completed (async iterator) and batch (plain iterator)
+  run many requests with at most `concurrency` in flight, and yield each
+  FetchResult as soon as it completes. Requests go through the pooled
+  session on a thread pool, while the waits (rate limit, backoff) are
+  asyncio sleeps that hold no thread or connection.
+- Optional ResponseCache (http_cache.py): fresh GETs are answered from disk
+  without a round trip (and skip the rate limit), stale ones are revalidated
+  with their ETag / Last-Modified.
+
+Usage:
+    client = HttpClient(concurrency=32, rate_per_host=50)
+    for result in client.batch([f"https://host/quote/{s}" for s in symbols]):
+        print(result.url, result.status, result.data)
+"""
+
+import time
+import queue
+import random
+import asyncio
+import threading
+import requests
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from typing import AsyncIterator, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+
+from http_cache import CachedEntry, ResponseCache
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+# Transport failures worth another attempt; InvalidURL, MissingSchema, ... fail the same way again
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+RequestSpec = Union[str, dict]
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.25, max_delay: float = 8.0,
+                 statuses: Iterable[int] = RETRY_STATUSES, methods: Iterable[str] = IDEMPOTENT_METHODS,
+                 seed: int = None):
+        """
+        Args:
+            max_attempts: Attempts per request, including the first.
+            base_delay: Backoff before the first retry is drawn from [0, base_delay].
+            max_delay: Cap of the exponential backoff window.
+            statuses: Response codes that are retried.
+            methods: HTTP methods that are retried at all; add "POST" / "PATCH"
+                only for endpoints that are safe to repeat (e.g. idempotency keys).
+            seed: Seed of the jitter draws (None = nondeterministic).
+        """
+        self.max_attempts = max(int(max_attempts), 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(method.upper() for method in methods)
+        self._rng = random.Random(seed)
+
+    def retryable(self, method: str, response: Optional[requests.Response],
+                  error: Optional[Exception] = None) -> bool:
+        """A retried method that got a retried status code or a connection error / timeout."""
+        if method.upper() not in self.methods:
+            return False
+        if response is None:
+            return isinstance(error, RETRY_ERRORS)
+        return response.status_code in self.statuses
+
+    def delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Seconds to wait before retry number `attempt` (1-based): full jitter, at least Retry-After."""
+        window = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = self._rng.uniform(0, window)
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None:
+                try:
+                    delay = max(delay, min(float(retry_after), self.max_delay))
+                except ValueError:
+                    pass
+        return delay
+
+
+class HostRateLimiter:
+    """
+    Per-host request rate limit (GCRA token bucket: `rate` requests/s on
+    average, bursts of up to `burst`). reserve() books the next slot and
+    returns how long to wait for it, so callers can sleep in a thread or in
+    asyncio.
+    """
+
+    def __init__(self, rate: float = None, burst: int = 1):
+        self.interval = 0.0 if not rate else 1.0 / rate
+        self.burst = max(int(burst), 1)
+        self._arrival: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, host: str) -> float:
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            arrival = max(self._arrival.get(host, now), now) + self.interval
+            self._arrival[host] = arrival
+        return max(arrival - self.burst * self.interval - now, 0.0)
+
+
+class FetchResult(NamedTuple):
+    index: int                    # position of the request in the batch
+    url: str
+    status: Optional[int]         # None when every attempt failed in transport
+    data: object                  # decoded JSON, else text; None on transport failure
+    error: Optional[str]
+    attempts: int                 # network attempts (0 when served from the cache)
+    elapsed: float                # seconds, including backoff and rate-limit waits
+    from_cache: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and 200 <= self.status < 300
+
+
+def _spec_to_kwargs(spec: RequestSpec) -> dict:
+    if isinstance(spec, str):
+        return {"method": "GET", "url": spec}
+    kwargs = dict(spec)
+    kwargs.setdefault("method", "GET")
+    if "url" not in kwargs:
+        raise ValueError(f"Request spec {spec!r} has no url")
+    return kwargs
+
+
+def _decode(response: requests.Response):
+    if "json" in response.headers.get("Content-Type", ""):
+        try:
+            return response.json()
+        except ValueError:
+            pass
+    return response.text
+
+
+class HttpClient:
+    def __init__(self, concurrency: int = 16,
+                 rate_per_host: float = None,
+                 burst: int = 1,
+                 timeout=(3.05, 10.0),
+                 retry: RetryPolicy = None,
+                 headers: dict = None,
+                 cache: ResponseCache = None):
+        """
+        Args:
+            concurrency: Maximum requests in flight in the fan-out modes; also
+                the keep-alive pool size per host.
+            rate_per_host: Maximum average requests per second to one host (None = unlimited).
+            burst: Requests allowed back to back before the rate limit applies.
+            timeout: requests timeout, seconds or (connect, read).
+            retry: Retry / backoff policy (default RetryPolicy()).
+            headers: Headers sent with every request.
+            cache: Optional persistent response cache for GET requests.
+        """
+        self.concurrency = max(int(concurrency), 1)
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.rate_limiter = HostRateLimiter(rate_per_host, burst)
+        self.cache = cache
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept": "application/json"})
+        if headers:
+            self.session.headers.update(headers)
+        self._executor = None
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def __enter__(self) -> "HttpClient":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # === Single requests (blocking) ===
+    def _cached(self, kwargs: dict) -> Tuple[Optional[CachedEntry], Optional[requests.Response]]:
+        """(stored entry, response to serve without a round trip) for a request."""
+        if self.cache is None or kwargs["method"].upper() != "GET":
+            return None, None
+        entry = self.cache.lookup("GET", kwargs["url"], kwargs.get("params"))
+        if entry is not None and entry.fresh:
+            return entry, self.cache.serve(entry)
+        return entry, None
+
+    def _send_once(self, kwargs: dict, entry: CachedEntry = None) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        if entry is not None:
+            kwargs["headers"] = {**entry.validators(), **(kwargs.get("headers") or {})}
+        response = self.session.request(**kwargs)
+        if self.cache is None:
+            return response
+        if response.status_code == 304 and entry is not None:
+            return self.cache.revalidated(entry, response)
+        self.cache.store(kwargs["method"], kwargs["url"], kwargs.get("params"), response)
+        return response
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        One request with rate limiting and retries.
+
+        Returns the last response, which may still be a 429 / 5xx once the
+        attempts are used up (or at once for a method the policy does not
+        retry); re-raises the transport error if the last attempt got no
+        response.
+        """
+        kwargs = dict(kwargs, method=method, url=url)
+        entry, cached = self._cached(kwargs)
+        if cached is not None:
+            return cached
+        host = urlsplit(url).netloc
+        for attempt in range(1, self.retry.max_attempts + 1):
+            wait = self.rate_limiter.reserve(host)
+            if wait:
+                time.sleep(wait)
+            response, error = None, None
+            try:
+                response = self._send_once(dict(kwargs), entry)
+            except RETRY_ERRORS as exc:
+                error = exc
+            if not self.retry.retryable(method, response, error) or attempt == self.retry.max_attempts:
+                if response is None:
+                    raise error
+                return response
+            time.sleep(self.retry.delay(attempt, response))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    # === Fan-out ===
+    async def _fetch(self, index: int, spec: RequestSpec, slots: asyncio.Semaphore) -> FetchResult:
+        kwargs = _spec_to_kwargs(spec)
+        url = kwargs["url"]
+        host = urlsplit(url).netloc
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        entry, cached = self._cached(kwargs)
+        if cached is not None:
+            return FetchResult(index, url, cached.status_code, _decode(cached), None, 0,
+                               time.perf_counter() - start, True)
+        response, error = None, None
+        async with slots:
+            for attempt in range(1, self.retry.max_attempts + 1):
+                wait = self.rate_limiter.reserve(host)
+                if wait:
+                    await asyncio.sleep(wait)
+                response, error = None, None
+                try:
+                    response = await loop.run_in_executor(self._executor, self._send_once, dict(kwargs), entry)
+                except requests.RequestException as exc:
+                    error = exc
+                if not self.retry.retryable(kwargs["method"], response, error) or attempt == self.retry.max_attempts:
+                    break
+                await asyncio.sleep(self.retry.delay(attempt, response))
+
+        if response is None:
+            return FetchResult(index, url, None, None, f"{type(error).__name__}: {error}", attempt,
+                               time.perf_counter() - start)
+        error = None if response.ok else f"HTTP {response.status_code}"
+        return FetchResult(index, url, response.status_code, _decode(response), error, attempt,
+                           time.perf_counter() - start, getattr(response, "from_cache", False))
+
+    async def fetch_as_completed(self, specs: Iterable[RequestSpec]) -> AsyncIterator[FetchResult]:
+        """
+        Run all requests with at most `concurrency` in flight and yield each
+        FetchResult as it completes (result.index gives its position).
+
+        A spec is a URL (GET) or a dict of requests.Session.request keyword
+        arguments (method, url, params, json, headers, ...).
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix="http")
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.ensure_future(self._fetch(i, spec, slots)) for i, spec in enumerate(specs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def fetch_all(self, specs: Iterable[RequestSpec]) -> list:
+        """All FetchResults in request order."""
+        results = [result async for result in self.fetch_as_completed(specs)]
+        return sorted(results, key=lambda result: result.index)
+
+    def batch(self, specs: Iterable[RequestSpec]) -> Iterator[FetchResult]:
+        """
+        Blocking counterpart of fetch_as_completed: the event loop runs on a
+        background thread and results are yielded here as they complete, so it
+        also works where a loop is already running (e.g. Jupyter).
+        """
+        results: "queue.Queue" = queue.Queue()
+        done = object()
+
+        async def produce():
+            async for result in self.fetch_as_completed(specs):
+                results.put(result)
+
+        def run():
+            try:
+                asyncio.run(produce())
+            except BaseException as exc:
+                results.put(exc)
+            finally:
+                results.put(done)
+
+        worker = threading.Thread(target=run, name="http-batch", daemon=True)
+        worker.start()
+        while True:
+            item = results.get()
+            if item is done:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+        worker.join()
+
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / ".http_cache.sqlite"
+DEFAULT_CACHE_TTL = 300.0
+
+_default_client = None
+
+
+def get_client() -> HttpClient:
+    """
+    Process-wide shared client, so repeated calls reuse its connection pool.
+    Its GETs go through the on-disk cache at DEFAULT_CACHE_PATH, and answers
+    without freshness headers stay fresh for DEFAULT_CACHE_TTL seconds, so a
+    repeated practice run makes no round trips for them.
+    """
+    global _default_client
+    if _default_client is None:
+        _default_client = HttpClient(cache=ResponseCache(DEFAULT_CACHE_PATH, default_ttl=DEFAULT_CACHE_TTL))
+    return _default_client
+
+
+if __name__ == "__main__":
+    from stand_in_server import StandInServer
+
+    symbols = [f"SYM{i:03d}" for i in range(300)]
+    with StandInServer(latency=(0.01, 0.05), failure_rate=0.1, throttle_rate=0.05, seed=0) as server:
+        with HttpClient(concurrency=32, rate_per_host=2000, burst=32,
+                        retry=RetryPolicy(max_attempts=5, base_delay=0.02, seed=0)) as client:
+            start = time.perf_counter()
+            first = None
+            completed = []
+            for result in client.batch([server.url(f"/quote/{symbol}") for symbol in symbols]):
+                first = first or time.perf_counter() - start
+                completed.append(result)
+            elapsed = time.perf_counter() - start
+
+            ok = sum(result.ok for result in completed)
+            retried = sum(result.attempts > 1 for result in completed)
+            print(f"{len(completed)} quotes in {elapsed:.2f} s (first after {first * 1e3:.0f} ms): "
+                  f"{ok} ok, {retried} needed retries, max attempts {max(r.attempts for r in completed)}")
+            print("server:", server.stats())
+
+            # Not idempotent: sent once, even if the stand-in answers 5xx
+            response = client.post(server.url("/echo"), json={"task": "api practice", "status": "start"})
+            print("POST", response.status_code, response.json())
+
+        # Sequential baseline: one new connection per call, no retries
+        start = time.perf_counter()
+        statuses = [requests.get(server.url(f"/quote/{symbol}")).status_code for symbol in symbols[:50]]
+        print(f"sequential requests.get: 50 quotes in {time.perf_counter() - start:.2f} s, "
+              f"{statuses.count(200)} ok")
+
+    # === Behaviour checks against the stand-in server ===
+    fast_retry = dict(max_attempts=3, base_delay=0.001, seed=0)
+
+    # 429 + Retry-After: each retry waits at least Retry-After (the jitter window is 1-4 ms)
+    with StandInServer(throttle_rate=1.0, retry_after=0.2) as server, \
+            HttpClient(retry=RetryPolicy(**fast_retry)) as client:
+        start = time.perf_counter()
+        response = client.get(server.url("/quote/AMD"))
+        blocking_elapsed = time.perf_counter() - start
+        result = next(client.batch([server.url("/quote/AMD")]))
+        assert response.status_code == 429 and result.status == 429 and result.attempts == 3
+        assert server.stats()["throttled"] == 6
+        assert blocking_elapsed >= 2 * 0.2 and result.elapsed >= 2 * 0.2, (blocking_elapsed, result.elapsed)
+    print(f"check 429: 3 attempts, {blocking_elapsed:.2f} s >= 2 x Retry-After 0.2 s")
+
+    # Non-idempotent methods are sent once; GET is retried against the same failures
+    with StandInServer(failure_rate=1.0) as server, HttpClient(retry=RetryPolicy(**fast_retry)) as client:
+        response = client.post(server.url("/echo"), json={"n": 1})
+        assert response.status_code >= 500 and server.stats()["requests"] == 1
+        result = next(client.batch([{"method": "POST", "url": server.url("/echo"), "json": {"n": 2}}]))
+        assert result.attempts == 1 and server.stats()["requests"] == 2
+        assert client.get(server.url("/quote/AMD")).status_code >= 500 and server.stats()["requests"] == 5
+    print("check POST: sent once on 5xx (GET: 3 attempts)")
+
+    # Per-host rate limit: after the burst, one request per 1 / rate seconds
+    n_requests, rate, burst = 40, 50.0, 4
+    with StandInServer() as server, HttpClient(concurrency=16, rate_per_host=rate, burst=burst) as client:
+        start = time.perf_counter()
+        results = list(client.batch([server.url(f"/quote/SYM{i:03d}") for i in range(n_requests)]))
+        elapsed = time.perf_counter() - start
+        assert all(result.ok for result in results) and server.stats()["requests"] == n_requests
+        assert elapsed >= (n_requests - burst) / rate, elapsed
+    print(f"check rate limit: {n_requests} requests in {elapsed:.2f} s "
+          f"({n_requests / elapsed:.0f}/s, limit {rate:.0f}/s after a burst of {burst})")
+
+    # Keep-alive pool: many requests over at most `concurrency` connections
+    n_requests = 200
+    with StandInServer() as server:
+        with HttpClient(concurrency=8) as client:
+            assert all(result.ok for result in client.batch([server.url(f"/quote/S{i}") for i in range(n_requests)]))
+            for i in range(20):
+                assert client.get(server.url(f"/quote/S{i}")).ok
+            pooled = server.stats()["connections"]
+        assert pooled <= client.concurrency, pooled
+        for i in range(20):
+            requests.get(server.url(f"/quote/S{i}"))
+        unpooled = server.stats()["connections"] - pooled
+        assert unpooled == 20, unpooled
+    print(f"check pool: {n_requests + 20} requests over {pooled} connections (requests.get: 20 over {unpooled})")
@@ -0,0 +1,209 @@
+"""
+Local stand-in HTTP server for exercising the API clients without the network.
+
+Runs a ThreadingHTTPServer (HTTP/1.1, keep-alive) on 127.0.0.1 in a background
+thread and injects latency and failures:
+
+    GET  /quote/<symbol>    JSON quote, subject to injected latency / failures
+    GET  /status/<code>     always answers <code>
+    GET  /asset/<name>      JSON with ETag, Last-Modified and Cache-Control
+                            max-age=<max_age>; 304 on a matching If-None-Match
+    POST /echo              201 with the JSON body echoed back
+    GET  /stats             request / connection / failure counters
+
+Usage:
+    with StandInServer(latency=(0.01, 0.05), failure_rate=0.1) as server:
+        requests.get(server.url("/quote/AMD"))
+"""
+
+import sys
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.stand_in._count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload, headers: dict = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        stand_in._count("requests")
+        path, _, _ = self.path.partition("?")
+        parts = path.strip("/").split("/")
+
+        if parts[0] == "stats":
+            self._send_json(200, stand_in.stats())
+        elif parts[0] == "status" and len(parts) == 2 and parts[1].isdigit():
+            self._send_json(int(parts[1]), {"status": int(parts[1])})
+        elif parts[0] == "asset" and len(parts) == 2:
+            etag = f'"{parts[1]}-v{stand_in.asset_version}"'
+            headers = {"ETag": etag, "Last-Modified": "Mon, 05 Jan 2026 00:00:00 GMT",
+                       "Cache-Control": f"max-age={stand_in.max_age}"}
+            if self.headers.get("If-None-Match") == etag:
+                stand_in._count("not_modified")
+                self.send_response(304)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                self._send_json(200, {"name": parts[1], "version": stand_in.asset_version,
+                                      "payload": "x" * stand_in.asset_bytes}, headers)
+        elif parts[0] == "quote" and len(parts) == 2:
+            failure = stand_in._inject()
+            if failure is not None:
+                self._send_json(*failure)
+            else:
+                symbol = parts[1].upper()
+                rng = random.Random(symbol)
+                self._send_json(200, {"symbol": symbol, "price": round(rng.uniform(10, 500), 2),
+                                      "volume": rng.randint(1_000, 1_000_000), "time": time.time()})
+        else:
+            self._send_json(404, {"error": f"unknown path {path}"})
+
+    def do_POST(self):
+        stand_in = self.server.stand_in
+        stand_in._count("requests")
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        if self.path.split("?")[0].rstrip("/") != "/echo":
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        failure = stand_in._inject()
+        if failure is not None:
+            self._send_json(*failure)
+            return
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError:
+            self._send_json(400, {"error": "body is not JSON"})
+            return
+        self._send_json(201, {"id": stand_in.stats()["requests"], "json": payload})
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that time out close the socket before the delayed answer
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StandInServer:
+    def __init__(self, latency: Tuple[float, float] = (0.0, 0.0),
+                 failure_rate: float = 0.0,
+                 throttle_rate: float = 0.0,
+                 retry_after: float = 0.05,
+                 max_age: int = 60,
+                 asset_bytes: int = 1024,
+                 seed: int = 0,
+                 port: int = 0):
+        """
+        Args:
+            latency: (min, max) seconds slept before answering a quote / echo.
+            failure_rate: Probability of a 500 / 502 / 503 answer.
+            throttle_rate: Probability of a 429 answer with Retry-After.
+            retry_after: Retry-After seconds sent with 429 answers.
+            max_age: Cache-Control max-age of /asset answers; bump
+                asset_version to change their ETag.
+            asset_bytes: Padding size of /asset bodies.
+            seed: Seed of the failure / latency draws.
+            port: Port to bind (0 = any free port).
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.max_age = max_age
+        self.asset_bytes = asset_bytes
+        self.asset_version = 1
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "connections": 0, "failures": 0, "throttled": 0,
+                          "not_modified": 0}
+
+        self._server = _QuietServer(("127.0.0.1", port), _Handler)
+        self._server.stand_in = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return self.base_url + "/" + path.lstrip("/")
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _inject(self):
+        """Sleep the injected latency; return (status, payload, headers) of an injected failure or None."""
+        with self._lock:
+            delay = self._rng.uniform(*self.latency)
+            draw = self._rng.random()
+            status = self._rng.choice((500, 502, 503))
+        if delay:
+            time.sleep(delay)
+        if draw < self.throttle_rate:
+            self._count("throttled")
+            return 429, {"error": "rate limited"}, {"Retry-After": str(self.retry_after)}
+        if draw < self.throttle_rate + self.failure_rate:
+            self._count("failures")
+            return status, {"error": "injected failure"}, None
+        return None
+
+
+if __name__ == "__main__":
+    import urllib.request
+
+    with StandInServer(latency=(0.0, 0.01), failure_rate=0.3, seed=1) as server:
+        print("serving on", server.base_url)
+        for symbol in ("AMD", "TSLA", "GOOG", "AMD"):
+            try:
+                with urllib.request.urlopen(server.url(f"/quote/{symbol}")) as response:
+                    print(response.status, response.read().decode())
+            except urllib.error.HTTPError as error:
+                print(error.code, error.read().decode())
+        print(server.stats())
@@ -0,0 +1,98 @@
+"""
+Cross-sectional momentum on a (dates x symbols) price panel.
+
+The score of a symbol at bar t is its return from t - lookback to t - skip
+(lookback=252, skip=21 is the classic 12-1 month momentum: the last month is
+skipped because of short-term reversal). Every rebalance the panel is
+ranked per date, the top quantile is bought and the bottom quantile sold,
+through the engine in simple_factor_investing.
+
+Usage:
+    panel = load_panel(file_names, "Close", missing="ffill")
+    result = momentum_backtest(panel, lookback=252, skip=21, frequency="M", n_quantiles=10)
+    print(result["summary"])
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Union
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Mean_Reversion.Mean_reversion_panel import load_panel
+from Training_Bot_Beginner.Strategy_practice.simple_factor_investing import TRADING_DAYS, factor_backtest
+
+
+def momentum_scores(prices: np.ndarray, lookback: int = 252, skip: int = 21) -> np.ndarray:
+    """
+    prices[t - skip] / prices[t - lookback] - 1 for every bar and symbol.
+
+    Args:
+        prices: (dates x symbols) prices, NaN where a symbol has no bar.
+        lookback: Bars back to the start of the formation window.
+        skip: Most recent bars left out of it (0 = up to t).
+
+    Returns:
+        (dates x symbols) scores, NaN for the first `lookback` bars and
+        wherever either price is missing.
+    """
+    if not 0 <= skip < lookback:
+        raise ValueError("Need 0 <= skip < lookback")
+    prices = np.asarray(prices, dtype=np.float64)
+    n_dates = prices.shape[0]
+    scores = np.full(prices.shape, np.nan)
+    if n_dates > lookback:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores[lookback:] = prices[lookback - skip:n_dates - skip] / prices[:n_dates - lookback] - 1.0
+    return scores
+
+
+def momentum_backtest(panel: pd.DataFrame, lookback: int = 252, skip: int = 21, frequency: Union[str, int] = "M",
+                      n_quantiles: int = 10, long_short: bool = True, gross: float = 1.0,
+                      trading_cost: float = 0.0) -> Dict[str, object]:
+    """
+    Winners-minus-losers momentum portfolio of a price panel.
+
+    Scores use only bars up to each rebalance close; positions earn the
+    returns after it. See simple_factor_investing.factor_backtest for the
+    construction arguments and the returned dict.
+    """
+    scores = momentum_scores(panel.to_numpy(dtype=np.float64), lookback, skip)
+    return factor_backtest(panel, scores, frequency, n_quantiles, long_short, gross, trading_cost)
+
+
+def momentum_csv_dataset(file_names: List[str] = None, price_column: str = "Close", **kwargs) -> Dict[str, object]:
+    """momentum_backtest over csv_dataset files (default: every *.csv), aligned with load_panel."""
+    if file_names is None:
+        file_names = sorted(path.name for path in (ROOT_DIR / "csv_dataset").glob("*.csv"))
+    return momentum_backtest(load_panel(file_names, price_column, missing="ffill"), **kwargs)
+
+
+if __name__ == "__main__":
+    # === 3,000 symbols x 20 years of daily prices with persistent drifts and staggered listings ===
+    n_dates, n_symbols = 20 * TRADING_DAYS, 3_000
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2005-01-03", periods=n_dates)
+    drift = np.cumsum(rng.normal(0.0, 0.000003, (n_dates, n_symbols)), axis=0)
+    prices = 50.0 * np.exp(np.cumsum(drift + rng.normal(0.0, 0.02, (n_dates, n_symbols)), axis=0))
+    prices[np.arange(n_dates)[:, None] < rng.integers(0, n_dates // 2, n_symbols)] = np.nan
+    panel = pd.DataFrame(prices, index=dates, columns=[f"S{i:04d}" for i in range(n_symbols)])
+
+    for frequency in ["M", "W"]:
+        start = time.perf_counter()
+        result = momentum_backtest(panel, frequency=frequency, n_quantiles=10, trading_cost=0.001)
+        elapsed = time.perf_counter() - start
+        summary = result["summary"]
+        print(f"12-1 momentum deciles, {n_symbols} symbols x {n_dates} days, rebalance {frequency}: {elapsed:.2f} s, "
+              f"annual return {summary['annual_return']:+.1%}, Sharpe {summary['sharpe']:.2f}, "
+              f"mean turnover {summary['mean_turnover']:.2f}")
+
+    # === csv_dataset (short files: one-month formation, halves instead of deciles) ===
+    result = momentum_csv_dataset(lookback=21, skip=1, frequency="M", n_quantiles=2)
+    print(result["rebalances"].to_string())
+    print(result["summary"].to_string())
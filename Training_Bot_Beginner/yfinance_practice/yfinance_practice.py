@@ -0,0 +1,66 @@
+"""
+yfinance practice: keep a local bar store up to date instead of re-downloading CSVs.
+
+Usage:
+    python Training_Bot_Beginner/yfinance_practice/yfinance_practice.py AMD TSLA GOOG --start 2018-01-01
+    python Training_Bot_Beginner/yfinance_practice/yfinance_practice.py --offline --symbols 300
+
+The first run downloads the full history (many tickers per yfinance call,
+several calls in parallel); later runs only request the days that are not in
+the store yet. --offline serves synthetic bars instead of Yahoo Finance.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from Data_Loader.market_data_store import STORE_DIR, MarketDataStore, SyntheticProvider, YFinanceProvider
+
+
+def refresh_and_report(store: MarketDataStore, symbols, start, interval: str):
+    start_time = time.perf_counter()
+    stats = store.refresh(symbols, start, interval=interval)
+    print(f"refresh: {time.perf_counter() - start_time:.2f} s, {stats['requests']} requests, "
+          f"{stats['symbols_updated']} symbols updated, {stats['rows_added']:,} rows added")
+    if stats["unanswered"]:
+        print(f"  no data for {len(stats['unanswered'])} symbols: {stats['unanswered'][:5]}")
+    for batch, message in stats["errors"]:
+        print(f"  failed {batch[:5]}{'...' if len(batch) > 5 else ''}: {message}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental yfinance download into the local bar store")
+    parser.add_argument("tickers", nargs="*", default=["AMD", "TSLA", "GOOG"])
+    parser.add_argument("--start", default="2018-01-01")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--store", default=str(STORE_DIR))
+    parser.add_argument("--offline", action="store_true", help="Synthetic bars instead of Yahoo Finance")
+    parser.add_argument("--symbols", type=int, default=0, help="With --offline: number of synthetic tickers")
+    args = parser.parse_args()
+
+    tickers = args.tickers
+    if args.offline:
+        provider = SyntheticProvider(latency=0.05)
+        store_dir = Path(args.store).with_name(Path(args.store).name + "_offline")
+        if args.symbols:
+            tickers = [f"SYN{i:04d}" for i in range(args.symbols)]
+    else:
+        provider = YFinanceProvider()
+        store_dir = Path(args.store)
+    store = MarketDataStore(store_dir, provider=provider)
+
+    refresh_and_report(store, tickers, args.start, args.interval)
+    # Only the unsettled recent tail (e.g. a weekend not yet followed by a bar) is requested again
+    print("second refresh:")
+    refresh_and_report(store, tickers, args.start, args.interval)
+
+    for ticker in tickers[:3]:
+        bars = store.load(ticker, interval=args.interval)
+        print(f"\n{ticker}: {len(bars):,} bars, {bars.index.min()} .. {bars.index.max()}")
+        print(bars.tail(3))
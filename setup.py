@@ -22,6 +22,9 @@ install_requires = [
     "seaborn>=0.11.1",
     "tqdm>=4.60.0",
     "opencv-python>=4.5.0",
+
+    # API practice (json_columnar page parsing)
+    "orjson>=3.8.0",
 ]
 
 extras = {